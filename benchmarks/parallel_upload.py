@@ -0,0 +1,80 @@
+"""Benchmarks multi-connection chunked uploads against the local stand-in server,
+with each connection capped to simulate a high-latency link, e.g.
+
+    python benchmarks/parallel_upload.py --size 64 --stream-rate 8
+"""
+
+import argparse
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+
+os.environ.setdefault("DOXA_CONFIG_DIRECTORY", tempfile.mkdtemp(prefix="doxa-bench-"))
+
+from doxa_cli.resumable import UploadCheckpoint, upload_chunks  # noqa: E402
+from doxa_cli.server import StandInServer  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def benchmark(server: StandInServer, archive_path: str, connections: int) -> dict:
+    # Register an upload slot directly with the stand-in server
+    token = f"bench-{connections}-{time.time_ns()}"
+    with server.lock:
+        server.slots[token] = {"compression": "none", "manifest": None}
+
+    checkpoint = UploadCheckpoint.create(
+        f"bench-{connections}",
+        archive_path,
+        f"{server.storage_url}/upload",
+        token,
+    )
+
+    start = time.perf_counter()
+    upload_chunks(checkpoint, lambda n: None, connections)
+    elapsed = time.perf_counter() - start
+
+    os.unlink(UploadCheckpoint.get_path(checkpoint.key))
+
+    return {
+        "benchmark": "parallel_upload",
+        "connections": connections,
+        "bytes": checkpoint.size,
+        "seconds": round(elapsed, 4),
+        "throughput_mb_s": round(checkpoint.size / elapsed / MB, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=64, help="archive size in MiB")
+    parser.add_argument(
+        "--stream-rate", type=float, default=8, help="per-connection cap in MiB/s"
+    )
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server = StandInServer(port=0, stream_rate=int(args.stream_rate * MB))
+    server.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive_path = os.path.join(directory, "archive.tar")
+        with open(archive_path, "wb") as f:
+            # A valid (uncompressed) tarball, so the server can ingest the upload
+            with tarfile.open(fileobj=f, mode="w|") as tar:
+                data = os.urandom(args.size * MB)
+                tarinfo = tarfile.TarInfo("weights.bin")
+                tarinfo.size = len(data)
+                tar.addfile(tarinfo, io.BytesIO(data))
+
+        for connections in args.connections:
+            print(json.dumps(benchmark(server, archive_path, connections)))
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measures the startup time of the CLI using `python -X importtime`, failing if any
+run exceeds the time budget or imports a dependency that should only be loaded by
+the command that needs it, e.g.
+
+    python benchmarks/startup.py --budget 300
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Modules that must not be imported by `doxa --help` or `doxa version`
+HEAVY_MODULES = (
+    "requests",
+    "requests_toolbelt",
+    "halo",
+    "yaml",
+    "webbrowser",
+    "rich.progress",
+    "doxa_cli.commands.upload",
+    "doxa_cli.commands.login",
+    "doxa_cli.submission",
+)
+
+COMMANDS = (["--help"], ["version"])
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """Maps each imported module to its cumulative import time in microseconds."""
+
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+
+    return modules
+
+
+def benchmark(args: list[str], runs: int) -> dict:
+    import_times, wall_times, heavy = [], [], set()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "doxa_cli", *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            env={**os.environ, "TERM": "dumb"},
+        )
+        wall_times.append(time.perf_counter() - start)
+
+        modules = parse_importtime(result.stderr)
+        import_times.append(modules.get("doxa_cli", 0) / 1000)
+        heavy.update(module for module in HEAVY_MODULES if module in modules)
+
+    return {
+        "benchmark": "startup",
+        "command": " ".join(["doxa", *args]),
+        "runs": runs,
+        "import_ms": round(min(import_times), 1),
+        "median_import_ms": round(sorted(import_times)[runs // 2], 1),
+        "wall_ms": round(min(wall_times) * 1000, 1),
+        "heavy_imports": sorted(heavy),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="fail if importing doxa_cli takes longer than this many milliseconds",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for command in COMMANDS:
+        result = benchmark(command, args.runs)
+        print(json.dumps(result))
+
+        if result["heavy_imports"]:
+            failed = True
+        if args.budget is not None and result["import_ms"] > args.budget:
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
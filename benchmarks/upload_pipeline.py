@@ -0,0 +1,312 @@
+"""Benchmarks the upload pipeline on synthetic submissions: archive throughput,
+compression ratio and peak memory of `compress_submission_directory`, the speed &
+error of the pre-flight estimate of the archive's size, end-to-end `doxa upload`
+time against the local stand-in server, and `doxa --help` startup latency. Results
+are printed as JSON lines (and optionally saved as a single JSON document) so that
+they can be compared between releases, e.g.
+
+    python benchmarks/upload_pipeline.py --scale 0.5 --output results.json
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DOXA_CONFIG_DIRECTORY", tempfile.mkdtemp(prefix="doxa-bench-"))
+
+from doxa_cli.config import CONFIG  # noqa: E402
+from doxa_cli.constants import __version__  # noqa: E402
+from doxa_cli.server import StandInServer  # noqa: E402
+
+from startup import COMMANDS as STARTUP_COMMANDS  # noqa: E402
+from startup import benchmark as benchmark_startup  # noqa: E402
+
+MB = 1000 * 1000
+
+WORDS = (
+    "import numpy as np def forward self return agent state action reward "
+    "for i in range observation model torch tensor class policy"
+).split()
+
+
+def write_text_file(path: str, size: int, rng: random.Random) -> None:
+    # Source-code-like text, which compresses well
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+
+    with open(path, "w") as f:
+        f.write(" ".join(words)[:size])
+
+
+def write_random_file(path: str, size: int) -> None:
+    # Like trained weights, which barely compress at all
+    with open(path, "wb") as f:
+        for offset in range(0, size, 4 * 1024 * 1024):
+            f.write(os.urandom(min(4 * 1024 * 1024, size - offset)))
+
+
+def generate_tree(directory: str, kind: str, scale: float) -> str:
+    """Creates a synthetic submission of the given kind, returning its path."""
+
+    rng = random.Random(0)
+    root = os.path.join(directory, kind)
+    os.makedirs(root)
+
+    with open(os.path.join(root, "doxa.yaml"), "w") as f:
+        f.write("competition: benchmark\nlanguage: python\nentrypoint: run.py\n")
+
+    if kind == "small-files":
+        for i in range(int(5000 * scale)):
+            package = os.path.join(root, f"package{i // 100}")
+            os.makedirs(package, exist_ok=True)
+            write_text_file(os.path.join(package, f"module{i}.py"), 2048, rng)
+    elif kind == "huge-files":
+        for i in range(2):
+            write_text_file(
+                os.path.join(root, f"dataset{i}.csv"), int(64 * MB * scale), rng
+            )
+    elif kind == "incompressible":
+        write_text_file(os.path.join(root, "run.py"), 4096, rng)
+        write_random_file(os.path.join(root, "weights.bin"), int(64 * MB * scale))
+    elif kind == "deep-nesting":
+        path = root
+        for depth in range(64):
+            path = os.path.join(path, f"level{depth}")
+            os.makedirs(path)
+            for i in range(max(int(16 * scale), 1)):
+                write_text_file(os.path.join(path, f"file{i}.py"), 4096, rng)
+    else:
+        raise ValueError(f"Unknown kind of submission `{kind}`.")
+
+    return root
+
+
+class CountingWriter:
+    """Discards the archive, counting its size."""
+
+    def __init__(self) -> None:
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def get_peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None  # not available on Windows
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_archive(directory: str, compression: str, jobs: int) -> dict:
+    """Runs in a fresh process, so that its peak memory usage can be measured."""
+
+    from doxa_cli.submission import compress_submission_directory
+    from doxa_cli.compression import parse_codec
+    from doxa_cli.scanner import scan_submission
+
+    start = time.perf_counter()
+    scan = scan_submission(directory, [])
+    output = CountingWriter()
+    compress_submission_directory(
+        output, scan, show_progress=False, codec=parse_codec(compression), jobs=jobs
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "files": len(scan.files),
+        "bytes": scan.total_size,
+        "archive_bytes": output.size,
+        "seconds": elapsed,
+        "peak_rss_bytes": get_peak_rss(),
+    }
+
+
+def benchmark_archive(directory: str, kind: str, compression: str, jobs: int) -> dict:
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        result = executor.submit(measure_archive, directory, compression, jobs).result()
+
+    return {
+        "benchmark": "archive",
+        "submission": kind,
+        "compression": compression,
+        "jobs": jobs,
+        "files": result["files"],
+        "bytes": result["bytes"],
+        "seconds": round(result["seconds"], 4),
+        "throughput_mb_s": round(result["bytes"] / result["seconds"] / MB, 2),
+        "archive_bytes": result["archive_bytes"],
+        "compression_ratio": round(
+            result["archive_bytes"] / max(result["bytes"], 1), 4
+        ),
+        "peak_rss_mb": (
+            round(result["peak_rss_bytes"] / MB, 1)
+            if result["peak_rss_bytes"]
+            else None
+        ),
+    }
+
+
+def benchmark_estimate(
+    directory: str, kind: str, compression: str, archive_bytes: int
+) -> dict:
+    from doxa_cli.compression import parse_codec
+    from doxa_cli.preflight import estimate_archive_size
+    from doxa_cli.scanner import scan_submission
+
+    # Including the scan, as `doxa upload --dry-run` does
+    start = time.perf_counter()
+    estimate = estimate_archive_size(
+        scan_submission(directory, []), parse_codec(compression)
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "estimate",
+        "submission": kind,
+        "compression": compression,
+        "seconds": round(elapsed, 4),
+        "estimated_bytes": estimate.archive_size,
+        "archive_bytes": archive_bytes,
+        "error": round(estimate.archive_size / max(archive_bytes, 1) - 1, 4),
+    }
+
+
+def benchmark_upload(
+    server: StandInServer, directory: str, kind: str, compression: str, jobs: int
+) -> dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "doxa_cli",
+            "upload",
+            directory,
+            "--compression",
+            compression,
+            "--jobs",
+            str(jobs),
+            "--force",
+            "--no-cache",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "DOXA_BASE_URL": server.api_url},
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "upload",
+        "submission": kind,
+        "compression": compression,
+        "jobs": jobs,
+        "seconds": round(elapsed, 4),
+        "ok": result.returncode == 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplies the size of every tree"
+    )
+    parser.add_argument(
+        "--submissions",
+        nargs="+",
+        default=["small-files", "huge-files", "incompressible", "deep-nesting"],
+    )
+    parser.add_argument("--compression", nargs="+", default=["gzip", "none"])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 0])
+    parser.add_argument("--stream-rate", type=float, default=None, help="MiB/s cap")
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--output", help="also save the results to this JSON file")
+    args = parser.parse_args()
+
+    # The stand-in server accepts any access token
+    CONFIG.update(
+        {
+            "access_token": "benchmark",
+            "refresh_token": "benchmark",
+            "expires_at": datetime.datetime(2099, 1, 1),
+        }
+    )
+
+    results = []
+
+    def report(result: dict) -> None:
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    server = StandInServer(
+        port=0,
+        stream_rate=int(args.stream_rate * 1024 * 1024) if args.stream_rate else None,
+    )
+    server.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for kind in args.submissions:
+                tree = generate_tree(directory, kind, args.scale)
+
+                for compression in args.compression:
+                    for jobs in args.jobs:
+                        archive = benchmark_archive(tree, kind, compression, jobs)
+                        report(archive)
+                        report(benchmark_upload(server, tree, kind, compression, jobs))
+
+                    report(
+                        benchmark_estimate(
+                            tree, kind, compression, archive["archive_bytes"]
+                        )
+                    )
+    finally:
+        server.stop()
+
+    for command in STARTUP_COMMANDS:
+        report(benchmark_startup(command, args.startup_runs))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "doxa_cli": __version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "scale": args.scale,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
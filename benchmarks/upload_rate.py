@@ -0,0 +1,206 @@
+"""Benchmarks upload pacing and buffer sizes against the local stand-in server,
+which runs in a separate process so that only the client's CPU time is measured:
+first, that the throughput achieved tracks `--max-rate`, and then, how the read &
+send buffer sizes affect the number of system calls & CPU time of an upload, e.g.
+
+    python benchmarks/upload_rate.py --size 32 --rates 4 8 16 --buffers 8K 256K 1M
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+MB = 1024 * 1024
+
+os.environ.setdefault("DOXA_CONFIG_DIRECTORY", tempfile.mkdtemp(prefix="doxa-bench-"))
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+PORT = get_free_port()
+os.environ["DOXA_BASE_URL"] = f"http://127.0.0.1:{PORT}/api"
+
+from doxa_cli import pacing  # noqa: E402
+from doxa_cli.submission import (  # noqa: E402
+    get_upload_endpoint,
+    get_upload_slot,
+    upload_agent,
+)
+from doxa_cli.transport import get_session  # noqa: E402
+
+
+def start_server(directory: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "doxa_cli.server",
+            "--port",
+            str(PORT),
+            "--directory",
+            directory,
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("The stand-in server did not start.")
+
+
+def write_archive(path: str, size: int) -> None:
+    # A valid (uncompressed) tarball, so the server can ingest the upload
+    with open(path, "wb") as f, tarfile.open(fileobj=f, mode="w|") as tar:
+        data = os.urandom(size)
+        tarinfo = tarfile.TarInfo("weights.bin")
+        tarinfo.size = len(data)
+        tar.addfile(tarinfo, io.BytesIO(data))
+
+
+def get_read_syscalls() -> int | None:
+    """Counts the read system calls made by this process (on Linux only)."""
+
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+    except OSError:
+        return None
+
+    return int(fields["syscr"])
+
+
+def get_cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def upload(archive_path: str, zero_copy: bool = True) -> dict:
+    session = get_session()
+    session.headers["Authorization"] = "Bearer bench"
+
+    size = os.path.getsize(archive_path)
+    upload_slot = get_upload_slot(
+        session=session,
+        competition="bench",
+        environment=None,
+        metadata={},
+        size=size,
+        compression="none",
+    )
+
+    # The progress callback is called once per block read & sent
+    blocks = 0
+
+    def callback(m):
+        nonlocal blocks
+        blocks += 1
+
+    reads, cpu = get_read_syscalls(), get_cpu_time()
+    start = time.perf_counter()
+    with open(archive_path, "rb", buffering=pacing.get_read_buffer_size()) as f:
+        upload_agent(
+            get_upload_endpoint(upload_slot),
+            upload_slot["token"],
+            f,
+            callback,
+            zero_copy=zero_copy,
+        )
+    elapsed = time.perf_counter() - start
+    cpu = get_cpu_time() - cpu
+    if reads is not None:
+        reads = get_read_syscalls() - reads  # type: ignore[operator]
+
+    return {
+        "bytes": size,
+        "seconds": round(elapsed, 4),
+        "throughput_mb_s": round(size / elapsed / MB, 2),
+        "cpu_seconds": round(cpu, 4),
+        "send_blocks": blocks,
+        "read_syscalls": reads,
+    }
+
+
+def benchmark_rate(archive_path: str, rate: float) -> dict:
+    pacing.configure(max_rate=int(rate * MB))
+    result = upload(archive_path)
+
+    return {
+        "benchmark": "max_rate",
+        "max_rate_mb_s": rate,
+        **result,
+        "ratio": round(result["throughput_mb_s"] / rate, 3),
+    }
+
+
+def benchmark_buffers(archive_path: str, buffer_size: int, runs: int) -> dict:
+    # The archive is read & sent through Python, where the read buffer is used
+    pacing.configure(read_buffer_size=buffer_size, send_buffer_size=buffer_size)
+    results = [upload(archive_path, zero_copy=False) for _ in range(runs)]
+
+    return {
+        "benchmark": "buffer_size",
+        "buffer_size": buffer_size,
+        **min(results, key=lambda result: result["seconds"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=32, help="archive size in MiB")
+    parser.add_argument(
+        "--rates",
+        type=float,
+        nargs="+",
+        default=[4, 8, 16, 32],
+        help="upload caps in MiB/s",
+    )
+    parser.add_argument(
+        "--buffers",
+        type=pacing.parse_byte_size,
+        nargs="+",
+        default=[8 * 1024, 64 * 1024, 256 * 1024, MB],
+        help="read & send buffer sizes",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per buffer size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(os.path.join(directory, "server"))
+
+        try:
+            archive_path = os.path.join(directory, "archive.tar")
+            write_archive(archive_path, args.size * MB)
+
+            for rate in args.rates:
+                print(json.dumps(benchmark_rate(archive_path, rate)), flush=True)
+
+            for buffer_size in args.buffers:
+                print(
+                    json.dumps(benchmark_buffers(archive_path, buffer_size, args.runs)),
+                    flush=True,
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
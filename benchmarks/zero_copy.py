@@ -0,0 +1,69 @@
+"""Benchmarks the zero-copy upload path (`sendfile`) against reading the archive
+through `MultipartEncoder`, uploading to the local stand-in server running in a
+separate process, so that only the client's time & CPU usage are measured, e.g.
+
+    python benchmarks/zero_copy.py --size 256 --runs 3
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from upload_rate import MB, start_server, upload, write_archive
+
+from doxa_cli import pacing
+
+
+def benchmark(archive_path: str, zero_copy: bool, runs: int) -> dict:
+    results = [upload(archive_path, zero_copy=zero_copy) for _ in range(runs)]
+
+    return {
+        "benchmark": "zero_copy",
+        "path": "sendfile" if zero_copy else "multipart_encoder",
+        **min(results, key=lambda result: result["cpu_seconds"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=256, help="archive size in MiB")
+    parser.add_argument("--runs", type=int, default=3, help="runs per upload path")
+    args = parser.parse_args()
+
+    pacing.configure()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(os.path.join(directory, "server"))
+
+        try:
+            archive_path = os.path.join(directory, "archive.tar")
+            write_archive(archive_path, args.size * MB)
+
+            results = {}
+            for zero_copy in (False, True):
+                results[zero_copy] = benchmark(archive_path, zero_copy, args.runs)
+                print(json.dumps(results[zero_copy]), flush=True)
+
+            print(
+                json.dumps(
+                    {
+                        "benchmark": "zero_copy_speedup",
+                        "seconds": round(
+                            results[False]["seconds"] / results[True]["seconds"], 2
+                        ),
+                        "cpu_seconds": round(
+                            results[False]["cpu_seconds"]
+                            / max(results[True]["cpu_seconds"], 1e-6),
+                            2,
+                        ),
+                    }
+                )
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
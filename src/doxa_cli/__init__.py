@@ -1,25 +1,113 @@
-import typer
-
-from doxa_cli.commands.config import config_info
-from doxa_cli.commands.login import login
-from doxa_cli.commands.logout import logout
-from doxa_cli.commands.surprise import surprise
-from doxa_cli.commands.upload import upload
-from doxa_cli.commands.user import user
-from doxa_cli.commands.version import version
-
-main = typer.Typer(
-    name="DOXA AI CLI",
-    no_args_is_help=True,
-    help="This CLI application allows you to interact with the DOXA AI platform: a powerful platform for hosting engaging competitions in artificial intelligence and machine learning.",
-)
-
-main.command()(login)
-main.command()(logout)
-main.command()(user)
-main.command()(version)
-
-main.command(name="config", hidden=True)(config_info)
-main.command(hidden=True)(surprise)
-
-main.command(no_args_is_help=True)(upload)
+from typing import Optional
+
+import click
+import typer
+from typing_extensions import Annotated
+
+from doxa_cli import output
+from doxa_cli.errors import ClientOutdatedError, ConfigError, show_error
+from doxa_cli.lazy import LazyCommand, LazyTyperGroup
+
+
+class DoxaGroup(LazyTyperGroup):
+    # Commands are imported when they are run, keeping the CLI quick to start
+    lazy_commands = {
+        "login": LazyCommand(
+            "doxa_cli.commands.login",
+            "login",
+            "Log in with your DOXA AI platform account.",
+        ),
+        "logout": LazyCommand(
+            "doxa_cli.commands.logout",
+            "logout",
+            "Log out of your DOXA AI platform account.",
+        ),
+        "user": LazyCommand(
+            "doxa_cli.commands.user",
+            "user",
+            "Display DOXA AI account information. You must be logged in.",
+        ),
+        "version": LazyCommand(
+            "doxa_cli.commands.version", "version", "Gives the version of the DOXA CLI."
+        ),
+        "cache": LazyCommand(
+            "doxa_cli.commands.cache",
+            "cache",
+            "Inspect and prune the cache of compressed submissions.",
+        ),
+        "config": LazyCommand(
+            "doxa_cli.commands.config", "config_info", "", hidden=True
+        ),
+        "surprise": LazyCommand(
+            "doxa_cli.commands.surprise",
+            "surprise",
+            "A surprise just for you :-)",
+            hidden=True,
+        ),
+        "upload": LazyCommand(
+            "doxa_cli.commands.upload",
+            "upload",
+            "Upload and submit an agent to the DOXA AI platform.",
+            options={"no_args_is_help": True},
+        ),
+    }
+
+    def invoke(self, ctx: click.Context):
+        exit_code = 0
+        try:
+            return super().invoke(ctx)
+        except click.exceptions.Exit as e:
+            exit_code = e.exit_code
+            raise
+        except click.ClickException as e:
+            exit_code = e.exit_code
+            output.record_error("USAGE_ERROR", e.format_message())
+            raise
+        except (ClientOutdatedError, ConfigError) as e:
+            # Raised by the code shared with the `AsyncDoxaClient` library
+            exit_code = 1
+            show_error(e.message)
+            raise click.exceptions.Exit(exit_code)
+        except BaseException:
+            exit_code = 1
+            raise
+        finally:
+            output.finish(ctx.invoked_subcommand, exit_code)
+
+
+main = typer.Typer(
+    name="DOXA AI CLI",
+    cls=DoxaGroup,
+    no_args_is_help=True,
+    help="This CLI application allows you to interact with the DOXA AI platform: a powerful platform for hosting engaging competitions in artificial intelligence and machine learning.",
+)
+
+
+@main.callback()
+def callback(
+    ctx: typer.Context,
+    trace: Annotated[
+        Optional[str],
+        typer.Option(
+            "--trace",
+            envvar="DOXA_TRACE",
+            metavar="FILE",
+            help="Record a Chrome trace of the phases of the command to FILE.",
+            show_default=False,
+        ),
+    ] = None,
+    output_format: Annotated[
+        output.OutputFormat,
+        typer.Option(
+            "--output",
+            envvar="DOXA_OUTPUT",
+            help="Print progress and results as JSON lines for scripts and CI, instead of text.",
+        ),
+    ] = output.OutputFormat.text,
+):
+    output.set_output_format(output_format)
+
+    if trace:
+        from doxa_cli.tracing import start_tracing
+
+        start_tracing(trace, f"doxa {ctx.invoked_subcommand}")
@@ -1,4 +1,4 @@
-from doxa_cli import main
-
-if __name__ == "__main__":
-    main()
+from doxa_cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import typing
+
+from doxa_cli.compression import Codec, StorePolicy
+from doxa_cli.config import CONFIG
+from doxa_cli.constants import CONFIG_DIRECTORY
+from doxa_cli.locking import FileLock
+from doxa_cli.scanner import SubmissionScan
+
+CACHE_DIRECTORY = os.path.join(CONFIG_DIRECTORY, "cache")
+CACHE_LOCK_NAME = "cache.lock"
+
+# The total size of the cached archives, beyond which the least recently used are
+# deleted, unless set with `doxa cache --max-size`. It is scaled down to half of the
+# free disk space, but no further than the minimum
+DEFAULT_CACHE_SIZE = 20 * 1000 * 1000 * 1000
+MINIMUM_CACHE_SIZE = 1000 * 1000 * 1000
+
+
+def get_fingerprint(
+    scan: SubmissionScan, codec: Codec, store_policy: StorePolicy | None = None
+) -> str:
+    """Identifies the archive that would be built from a submission: any change to the
+    path, size or modification time of an included file, to the ignore rules or to
+    the compression settings produces a different fingerprint."""
+
+    settings: list[typing.Any] = [scan.directory, scan.ignore_files, str(codec)]
+    if store_policy is not None and (store_policy.store or store_policy.compress):
+        settings.append([store_policy.store, store_policy.compress])
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(settings).encode())
+
+    for entry in scan.entries:
+        digest.update(
+            json.dumps(
+                [entry.arcname, entry.size, entry.stat.st_mtime_ns, entry.stat.st_mode]
+            ).encode()
+        )
+
+    return digest.hexdigest()
+
+
+class CachedArchive(typing.NamedTuple):
+    key: str
+    path: str
+    directory: str
+    codec: str
+    size: int
+    last_used: float
+    sha256: str | None
+
+
+class ArchiveCache:
+    """Keeps recently built submission archives in the configuration directory, so that
+    an unchanged submission need not be compressed again, e.g. when retrying an upload
+    or resubmitting to a different environment."""
+
+    def __init__(
+        self, directory: str = CACHE_DIRECTORY, max_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+
+    def _get_paths(self, key: str) -> tuple[str, str]:
+        return (
+            os.path.join(self.directory, f"{key}.archive"),
+            os.path.join(self.directory, f"{key}.json"),
+        )
+
+    def _read_entry(self, key: str) -> CachedArchive | None:
+        archive_path, metadata_path = self._get_paths(key)
+        try:
+            stat = os.stat(archive_path)
+        except OSError:
+            return None
+
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+
+        return CachedArchive(
+            key,
+            archive_path,
+            metadata.get("directory", "?"),
+            metadata.get("codec", "?"),
+            stat.st_size,
+            stat.st_mtime,
+            metadata.get("sha256"),
+        )
+
+    def get(self, key: str) -> CachedArchive | None:
+        """Returns the cached archive, if any, marking it as recently used."""
+
+        archive_path, _ = self._get_paths(key)
+        try:
+            os.utime(archive_path)
+        except OSError:
+            return None
+
+        return self._read_entry(key)
+
+    def put(
+        self,
+        key: str,
+        file_path: str,
+        directory: str,
+        codec: Codec,
+        sha256: str | None = None,
+        keep_source: bool = False,
+    ) -> str | None:
+        """Adds a newly built archive (with the digest of its contents) to the cache,
+        evicting the least recently used archives to make room, and returns its path
+        in the cache. The archive is moved unless `keep_source` is set. Returns None
+        if the archive is too large to cache."""
+
+        if os.path.getsize(file_path) > self.max_size:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        archive_path, metadata_path = self._get_paths(key)
+
+        # Each process writes its own temporary files, which are only moved into
+        # place while holding the lock, so concurrent uploads cannot mix them up
+        fd, temporary_metadata_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f"{key}.", suffix=".tmp"
+        )
+        temporary_archive_path = f"{temporary_metadata_path[:-4]}.archive.tmp"
+
+        try:
+            with open(fd, "w") as f:
+                json.dump(
+                    {"directory": directory, "codec": str(codec), "sha256": sha256}, f
+                )
+
+            if keep_source:
+                # A hard link costs nothing when both are on the same file system
+                try:
+                    os.link(file_path, temporary_archive_path)
+                except OSError:
+                    shutil.copyfile(file_path, temporary_archive_path)
+            else:
+                shutil.move(file_path, temporary_archive_path)
+
+            with FileLock(os.path.join(self.directory, CACHE_LOCK_NAME)):
+                os.replace(temporary_metadata_path, metadata_path)
+                os.replace(temporary_archive_path, archive_path)
+                os.utime(archive_path)
+        except BaseException:
+            # The caller still owns an archive that was to be moved into the cache
+            if not keep_source and os.path.exists(temporary_archive_path):
+                shutil.move(temporary_archive_path, file_path)
+
+            for path in (temporary_metadata_path, temporary_archive_path):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            raise
+
+        self.prune(self.max_size)
+
+        return archive_path
+
+    def entries(self) -> list[CachedArchive]:
+        """Lists the cached archives, most recently used first."""
+
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for name in names:
+            key, extension = os.path.splitext(name)
+            if extension != ".archive":
+                continue
+
+            entry = self._read_entry(key)
+            if entry is not None:
+                entries.append(entry)
+
+        return sorted(entries, key=lambda entry: entry.last_used, reverse=True)
+
+    def remove(self, key: str) -> None:
+        for path in self._get_paths(key):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def prune(self, max_size: int, max_age: float | None = None) -> list[CachedArchive]:
+        """Deletes the least recently used archives until the cache fits in `max_size`
+        bytes, along with any unused for more than `max_age` seconds."""
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        removed = []
+        total_size = 0
+        with FileLock(os.path.join(self.directory, CACHE_LOCK_NAME)):
+            for entry in self.entries():
+                expired = (
+                    max_age is not None and time.time() - entry.last_used > max_age
+                )
+                if expired or total_size + entry.size > max_size:
+                    self.remove(entry.key)
+                    removed.append(entry)
+                else:
+                    total_size += entry.size
+
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def get_default_cache_size(directory: str = CACHE_DIRECTORY) -> int:
+    # The cache directory may not have been created yet
+    while not os.path.isdir(directory) and os.path.dirname(directory) != directory:
+        directory = os.path.dirname(directory)
+
+    try:
+        free_space = shutil.disk_usage(directory).free
+    except OSError:
+        return MINIMUM_CACHE_SIZE
+
+    return min(max(free_space // 2, MINIMUM_CACHE_SIZE), DEFAULT_CACHE_SIZE)
+
+
+def get_archive_cache() -> ArchiveCache:
+    max_size = CONFIG.get("cache_size")
+    if max_size is None:
+        max_size = get_default_cache_size()
+
+    return ArchiveCache(max_size=max_size)
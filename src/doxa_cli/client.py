@@ -0,0 +1,253 @@
+"""An asyncio API for the DOXA AI platform, for programs that submit agents without
+running the CLI, e.g.
+
+    async with AsyncDoxaClient() as client:
+        print(await client.userinfo())
+        await asyncio.gather(*(client.upload(path) for path in submissions))
+
+Unless an access token is given, the credentials stored by `doxa login` are used.
+Errors reported by the platform, or in reading the stored credentials, are raised
+as `DoxaError` subclasses."""
+
+import asyncio
+import concurrent.futures
+import datetime
+import functools
+import os
+import tempfile
+import typing
+
+import requests
+
+from doxa_cli.compression import parse_codec
+from doxa_cli.constants import TOKEN_REFRESH_WINDOW, USER_URL
+from doxa_cli.errors import DoxaError, SessionExpiredError
+from doxa_cli.scanner import scan_submission
+from doxa_cli.submission import (
+    compress_submission_directory,
+    get_store_policy,
+    get_upload_endpoint,
+    get_upload_slot,
+    read_submission_config,
+    upload_agent,
+)
+from doxa_cli.transport import get_session
+from doxa_cli.utils import (
+    check_client_version,
+    force_token_refresh,
+    get_access_token,
+    request_token_refresh,
+)
+
+T = typing.TypeVar("T")
+
+# The number of requests (and compressions) that may run at once
+DEFAULT_MAX_CONNECTIONS = 16
+
+
+class AsyncDoxaClient:
+    """Exposes uploads and account information as coroutines. The blocking work of
+    each call runs on a bounded pool of threads, over a pool of kept-alive
+    connections of the same size, so that many submissions can be made at once from
+    a single event loop."""
+
+    def __init__(
+        self,
+        access_token: str | None = None,
+        refresh_token: str | None = None,
+        expires_at: datetime.datetime | None = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+        self.max_connections = max_connections
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="doxa-client"
+        )
+        self._refresh_lock: asyncio.Lock | None = None
+
+    async def __aenter__(self) -> "AsyncDoxaClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, function: typing.Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs)
+        )
+
+    def _get_session(self, access_token: str | None = None) -> requests.Session:
+        session = get_session(pool_size=self.max_connections)
+        session.hooks["response"].append(check_client_version)
+        if access_token:
+            session.headers.update({"Authorization": f"Bearer {access_token}"})
+
+        return session
+
+    async def get_access_token(self) -> str:
+        """Returns a valid access token, refreshing it first if it is about to expire."""
+
+        if self.access_token is None:
+            # Refreshes of the stored credentials are shared with other processes
+            return await self._run(get_access_token)
+
+        if self.expires_at is not None and self.refresh_token is not None:
+            window = datetime.timedelta(seconds=TOKEN_REFRESH_WINDOW)
+            if datetime.datetime.now() >= self.expires_at - window:
+                return await self.refresh_access_token()
+
+        return self.access_token
+
+    async def refresh_access_token(self) -> str:
+        """Obtains a new access token using the refresh token. Concurrent calls share
+        a single refresh."""
+
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+
+        previous_token = self.access_token
+        async with self._refresh_lock:
+            if self.access_token is None:
+                return await self._run(force_token_refresh)
+
+            if self.access_token != previous_token:
+                return self.access_token  # refreshed while waiting for the lock
+
+            if self.refresh_token is None:
+                raise SessionExpiredError
+
+            now = datetime.datetime.now()
+            try:
+                data = await self._run(
+                    request_token_refresh, self._get_session(), self.refresh_token
+                )
+            except ValueError:
+                raise SessionExpiredError
+
+            self.access_token = data["access_token"]
+            self.refresh_token = data.get("refresh_token") or self.refresh_token
+            self.expires_at = now + datetime.timedelta(seconds=data["expires_in"])
+
+            return self.access_token
+
+    async def userinfo(self) -> dict[str, typing.Any]:
+        """Returns the account information of the signed-in user."""
+
+        session = self._get_session(await self.get_access_token())
+        response = await self._run(session.get, USER_URL, verify=True)
+
+        if response.status_code == requests.codes.unauthorized:
+            raise SessionExpiredError
+
+        try:
+            data = response.json()
+        except ValueError:
+            raise DoxaError("The server returned an invalid response.")
+
+        if not response.ok or "error" in data:
+            raise DoxaError(data.get("error") or "Unable to fetch user information.")
+
+        return data
+
+    async def get_upload_slot(
+        self,
+        competition: str,
+        environment: str | None = None,
+        metadata: dict[str, typing.Any] | None = None,
+        size: int = 0,
+        compression: str = "gzip",
+        manifest: dict[str, typing.Any] | None = None,
+    ) -> dict[str, typing.Any]:
+        """Requests an upload slot, raising `UploadSlotDeniedError` if it is denied."""
+
+        session = self._get_session(await self.get_access_token())
+        return await self._run(
+            get_upload_slot,
+            session=session,
+            competition=competition,
+            environment=environment,
+            metadata=metadata or {},
+            size=size,
+            compression=compression,
+            manifest=manifest,
+        )
+
+    async def upload_archive(
+        self, upload_slot: dict[str, typing.Any], archive_path: str
+    ) -> None:
+        """Uploads a compressed submission to the storage node given by an upload
+        slot, raising `UploadError` if the upload is rejected."""
+
+        def upload():
+            with open(archive_path, "rb") as f:
+                upload_agent(
+                    get_upload_endpoint(upload_slot),
+                    upload_slot["token"],
+                    f,
+                    lambda monitor: None,
+                    session=self._get_session(),
+                )
+
+        await self._run(upload)
+
+    async def upload(
+        self,
+        directory: str,
+        competition: str | None = None,
+        environment: str | None = None,
+        compression: str = "gzip",
+        jobs: int = 1,
+    ) -> dict[str, typing.Any]:
+        """Compresses and uploads the submission in `directory`, configured by its
+        `doxa.yaml` file as with `doxa upload`. Raises `SubmissionConfigError` if the
+        configuration is invalid."""
+
+        directory = os.path.abspath(directory)
+        competition, environment, metadata, ignore_files, upload_config = (
+            await self._run(read_submission_config, directory, competition, environment)
+        )
+        codec = parse_codec(compression)
+
+        def compress() -> tuple[str, str]:
+            f = tempfile.NamedTemporaryFile(
+                suffix=codec.extension, delete=False, mode="w+b"
+            )
+            try:
+                digest = compress_submission_directory(
+                    f,
+                    scan_submission(directory, ignore_files),
+                    show_progress=False,
+                    codec=codec,
+                    jobs=jobs,
+                    store_policy=get_store_policy(upload_config),
+                )
+            except BaseException:
+                os.unlink(f.name)
+                raise
+
+            return f.name, digest
+
+        archive_path, digest = await self._run(compress)
+        try:
+            size = os.path.getsize(archive_path)
+            upload_slot = await self.get_upload_slot(
+                competition, environment, metadata, size, codec.name
+            )
+            await self.upload_archive(upload_slot, archive_path)
+        finally:
+            os.unlink(archive_path)
+
+        return {
+            "directory": directory,
+            "competition": competition,
+            "environment": environment,
+            "size": size,
+            "sha256": digest,
+        }
@@ -0,0 +1,113 @@
+import time
+from typing import Optional
+
+import typer
+from rich.filesize import decimal
+from rich.table import Table
+from typing_extensions import Annotated
+
+from doxa_cli.cache import get_archive_cache
+from doxa_cli.config import CONFIG
+from doxa_cli.errors import show_error
+from doxa_cli.output import make_console, set_result
+
+
+def cache(
+    prune: Annotated[
+        bool,
+        typer.Option(
+            "--prune",
+            help="Delete the least recently used archives until the cache fits within its size limit.",
+            show_default=False,
+        ),
+    ] = False,
+    max_age: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-age",
+            min=0,
+            help="With --prune, also delete archives that have not been used for this many days.",
+            show_default=False,
+        ),
+    ] = None,
+    max_size: Annotated[
+        Optional[int],
+        typer.Option(
+            "--max-size",
+            min=0,
+            help="Set the size limit of the cache in megabytes. By default, the cache may use up to half of the free disk space, and no more than 20 GB.",
+            show_default=False,
+        ),
+    ] = None,
+    clear: Annotated[
+        bool,
+        typer.Option(
+            "--clear", help="Delete every cached archive.", show_default=False
+        ),
+    ] = False,
+):
+    """Inspect and prune the cache of compressed submissions."""
+
+    console = make_console()
+
+    if max_size is not None:
+        CONFIG.update({"cache_size": max_size * 1000 * 1000})
+
+    archive_cache = get_archive_cache()
+
+    try:
+        if clear:
+            archive_cache.clear()
+        elif prune or max_size is not None:
+            removed = archive_cache.prune(
+                archive_cache.max_size,
+                max_age * 24 * 60 * 60 if max_age is not None else None,
+            )
+            set_result(removed=len(removed))
+            console.print(
+                f"\n[bold white]{len(removed)} cached archives ({decimal(sum(entry.size for entry in removed))}) were deleted."
+            )
+
+        entries = archive_cache.entries()
+    except OSError:
+        show_error(
+            "\nAn error occurred while reading the cache of compressed submissions."
+        )
+        raise typer.Exit(1)
+
+    table = Table(
+        title="Cached submission archives",
+        caption=f"Using {decimal(sum(entry.size for entry in entries))} of {decimal(archive_cache.max_size)} in {archive_cache.directory}",
+        expand=True,
+        leading=1,
+    )
+
+    table.add_column("Submission", style="bold white", overflow="fold")
+    table.add_column("Compression", style="bold cyan")
+    table.add_column("Size", justify="right")
+    table.add_column("Last used", justify="right")
+
+    for entry in entries:
+        table.add_row(
+            entry.directory,
+            entry.codec,
+            decimal(entry.size),
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_used)),
+        )
+
+    console.print()
+    console.print(table)
+
+    set_result(
+        directory=str(archive_cache.directory),
+        max_size=archive_cache.max_size,
+        archives=[
+            {
+                "directory": entry.directory,
+                "compression": entry.codec,
+                "size": entry.size,
+                "last_used": entry.last_used,
+            }
+            for entry in entries
+        ],
+    )
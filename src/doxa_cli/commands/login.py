@@ -1,136 +1,151 @@
-import datetime
-import time
-import webbrowser
-
-import click
-import requests
-import typer
-from halo import Halo
-
-from doxa_cli.config import CONFIG
-from doxa_cli.constants import CLIENT_ID, LOGIN_URL, SCOPE, SPINNER, TOKEN_URL
-from doxa_cli.errors import show_error
-from doxa_cli.utils import get_request_client
-
-
-def wait_for_auth(
-    session: requests.Session,
-    device_code: str,
-    interval: int,
-    expires_at: datetime.datetime,
-):
-    while True:
-        now = datetime.datetime.now()
-        if now >= expires_at:
-            yield "EXPIRED", None
-            break
-
-        try:
-            res = session.post(
-                TOKEN_URL,
-                json={
-                    "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
-                    "client_id": CLIENT_ID,
-                    "device_code": device_code,
-                },
-                verify=True,
-            ).json()
-        except:
-            yield "ERROR", None
-            break
-
-        if "error" in res:
-            if res["error"] == "authorization_pending":
-                yield "PENDING", None
-                time.sleep(interval)
-            elif res["error"] == "slow_down":
-                yield "PENDING", None
-                interval += 5
-                time.sleep(interval)
-            else:
-                yield "AUTH_ERROR", res["error"]
-        elif "access_token" in res:
-            yield "SUCCESS", res
-            break
-
-
-def get_device_code(session: requests.Session):
-    result = session.post(
-        LOGIN_URL, json={"client_id": CLIENT_ID, "scope": SCOPE}, verify=True
-    ).json()
-
-    assert "device_code" in result
-    assert "interval" in result
-    assert "verification_uri_complete" in result
-
-    return result
-
-
-def login():
-    """Log in with your DOXA AI platform account."""
-
-    now = datetime.datetime.now()
-    session = get_request_client()
-
-    try:
-        data = get_device_code(session)
-    except:
-        show_error(
-            "\nAn error occurred while initiating the authorisation process. Please try again later."
-        )
-        raise typer.Exit(1)
-
-    click.secho(
-        "\nUse the link below to log into the CLI using your DOXA account:",
-        fg="green",
-        bold=True,
-    )
-    click.secho("\t" + data["verification_uri_complete"])
-
-    try:
-        webbrowser.open(data["verification_uri_complete"], 2, False)
-        click.secho(
-            "\nThe verification link has been opened in your default browser.\n",
-            fg="green",
-            bold=True,
-        )
-    except:
-        typer.echo("\n")
-
-    expires_at = now + datetime.timedelta(seconds=data["expires_in"])
-
-    with Halo(text="Waiting for approval", spinner=SPINNER, enabled=True) as spinner:
-        for state, result in wait_for_auth(
-            session, data["device_code"], data["interval"], expires_at
-        ):
-            if state == "PENDING":
-                continue
-
-            if state == "EXPIRED":
-                spinner.fail(
-                    "The authorisation request has expired. Please rerun this command and try logging in again."
-                )
-            elif state == "ERROR":
-                spinner.fail("A CLI error occurred during the authorisation process.")
-            elif state == "AUTH_ERROR":
-                spinner.fail("An error occurred while attempting to log you in.")
-            elif state == "SUCCESS" and result is not None:
-                try:
-                    CONFIG.update(
-                        {
-                            "access_token": result["access_token"],
-                            "refresh_token": result.get("refresh_token", None),
-                            "expires_at": datetime.datetime.now()
-                            + datetime.timedelta(seconds=result["expires_in"]),
-                        }
-                    )
-                    spinner.succeed(
-                        "Authorisation successful - you have now been logged in!"
-                    )
-                    return
-                except:
-                    spinner.fail("A CLI error occurred while logging you in.")
-            else:
-                spinner.fail("Ooops, a CLI error occurred.")
-
-            raise typer.Exit(1)
+import datetime
+import time
+import webbrowser
+
+import requests
+import typer
+
+from doxa_cli.config import CONFIG
+from doxa_cli.constants import CLIENT_ID, LOGIN_URL, SCOPE, SPINNER, TOKEN_URL
+from doxa_cli.errors import show_error
+from doxa_cli.output import emit, make_console, make_spinner, record_error
+from doxa_cli.tracing import span
+from doxa_cli.utils import get_request_client
+
+
+def wait_for_auth(
+    session: requests.Session,
+    device_code: str,
+    interval: int,
+    expires_at: datetime.datetime,
+):
+    while True:
+        now = datetime.datetime.now()
+        if now >= expires_at:
+            yield "EXPIRED", None
+            break
+
+        try:
+            res = session.post(
+                TOKEN_URL,
+                json={
+                    "grant_type": "urn:ietf:params:oauth:grant-type:device_code",
+                    "client_id": CLIENT_ID,
+                    "device_code": device_code,
+                },
+                verify=True,
+            ).json()
+        except:
+            yield "ERROR", None
+            break
+
+        if "error" in res:
+            if res["error"] == "authorization_pending":
+                yield "PENDING", None
+                time.sleep(interval)
+            elif res["error"] == "slow_down":
+                yield "PENDING", None
+                interval += 5
+                time.sleep(interval)
+            else:
+                yield "AUTH_ERROR", res["error"]
+        elif "access_token" in res:
+            yield "SUCCESS", res
+            break
+
+
+def get_device_code(session: requests.Session):
+    result = session.post(
+        LOGIN_URL, json={"client_id": CLIENT_ID, "scope": SCOPE}, verify=True
+    ).json()
+
+    assert "device_code" in result
+    assert "interval" in result
+    assert "verification_uri_complete" in result
+
+    return result
+
+
+def login():
+    """Log in with your DOXA AI platform account."""
+
+    now = datetime.datetime.now()
+    session = get_request_client()
+
+    try:
+        with span("request_device_code"):
+            data = get_device_code(session)
+    except:
+        show_error(
+            "\nAn error occurred while initiating the authorisation process. Please try again later."
+        )
+        raise typer.Exit(1)
+
+    console = make_console()
+    console.print(
+        "\nUse the link below to log into the CLI using your DOXA account:",
+        style="bold green",
+    )
+    console.print("\t" + data["verification_uri_complete"], highlight=False)
+    emit(
+        "authorisation",
+        verification_uri_complete=data["verification_uri_complete"],
+        expires_in=data["expires_in"],
+    )
+
+    try:
+        webbrowser.open(data["verification_uri_complete"], 2, False)
+        console.print(
+            "\nThe verification link has been opened in your default browser.\n",
+            style="bold green",
+        )
+    except:
+        console.print("\n")
+
+    expires_at = now + datetime.timedelta(seconds=data["expires_in"])
+
+    with make_spinner("Waiting for approval", SPINNER) as spinner, span(
+        "wait_for_approval"
+    ) as trace:
+        trace["polls"] = 0
+        for state, result in wait_for_auth(
+            session, data["device_code"], data["interval"], expires_at
+        ):
+            trace["polls"] += 1
+            trace["state"] = state
+            if state == "PENDING":
+                continue
+
+            if state == "EXPIRED":
+                record_error("AUTHORISATION_EXPIRED", "The request has expired.")
+                spinner.fail(
+                    "The authorisation request has expired. Please rerun this command and try logging in again."
+                )
+            elif state == "ERROR":
+                record_error("ERROR", "The authorisation process failed.")
+                spinner.fail("A CLI error occurred during the authorisation process.")
+            elif state == "AUTH_ERROR":
+                record_error(result, "The authorisation was not granted.")
+                spinner.fail("An error occurred while attempting to log you in.")
+            elif state == "SUCCESS" and result is not None:
+                try:
+                    CONFIG.update(
+                        {
+                            "access_token": result["access_token"],
+                            "refresh_token": result.get("refresh_token", None),
+                            "expires_at": datetime.datetime.now()
+                            + datetime.timedelta(seconds=result["expires_in"]),
+                        }
+                    )
+                    spinner.succeed(
+                        "Authorisation successful - you have now been logged in!"
+                    )
+                    return
+                except:
+                    record_error("ERROR", "The credentials could not be stored.")
+                    spinner.fail("A CLI error occurred while logging you in.")
+            else:
+                record_error("ERROR", "The authorisation process failed.")
+                spinner.fail("Ooops, a CLI error occurred.")
+
+            raise typer.Exit(1)
@@ -1,17 +1,18 @@
-import click
-
-from doxa_cli.config import CONFIG
-from doxa_cli.errors import show_error
-
-
-def logout():
-    """Log out of your DOXA AI platform account."""
-
-    try:
-        CONFIG.clear()
-    except FileNotFoundError:
-        pass
-    except:
-        show_error("\nAn error occurred while logging you out.")
-
-    click.secho("\nGoodbye!", fg="cyan", bold=True)
+from doxa_cli.config import CONFIG
+from doxa_cli.errors import ConfigError, show_error
+from doxa_cli.output import make_console
+
+
+def logout():
+    """Log out of your DOXA AI platform account."""
+
+    try:
+        CONFIG.clear()
+    except FileNotFoundError:
+        pass
+    except ConfigError as e:
+        show_error(e.message)
+    except:
+        show_error("\nAn error occurred while logging you out.")
+
+    make_console().print("\nGoodbye!", style="bold cyan")
@@ -1,352 +1,1584 @@
-import fnmatch
-import os
-import tarfile
-import tempfile
-import typing
-from pathlib import Path
-from typing import Any, Optional
-from urllib.parse import urljoin
-
-import requests
-import typer
-from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
-from rich.console import Console
-from rich.progress import (
-    BarColumn,
-    DownloadColumn,
-    MofNCompleteColumn,
-    Progress,
-    SpinnerColumn,
-    TaskProgressColumn,
-    TextColumn,
-    TransferSpeedColumn,
-)
-from typing_extensions import Annotated
-
-from doxa_cli.constants import (
-    COMPETITION_KEY,
-    DOXA_STORAGE_URL,
-    ENVIRONMENT_KEY,
-    EXCLUDED_FILES,
-    UPLOAD_SLOT_URL,
-    theme,
-)
-from doxa_cli.errors import (
-    SessionExpiredError,
-    SignedOutError,
-    UploadError,
-    UploadSlotDeniedError,
-    show_error,
-)
-from doxa_cli.utils import get_request_client, read_doxa_yaml
-
-
-def upload(
-    directory: Annotated[
-        Path,
-        typer.Argument(
-            exists=True,
-            file_okay=False,
-            dir_okay=True,
-            readable=True,
-            resolve_path=True,
-            help="The path to the directory containing your submission.",
-            show_default=False,
-        ),
-    ],
-    competition: Annotated[
-        Optional[str], typer.Option("--competition", "-c", show_default=False)
-    ] = None,
-    environment: Annotated[
-        Optional[str], typer.Option("--environment", "-e", show_default=False)
-    ] = None,
-):
-    """Upload and submit an agent to the DOXA AI platform."""
-
-    console = Console()
-
-    # Step 0: ensure that the user is logged in!
-
-    try:
-        session = get_request_client(require_auth=True)
-    except SignedOutError:
-        show_error(
-            "You must be logged in to upload a submission to the DOXA AI platform."
-        )
-        raise typer.Exit(1)
-    except SessionExpiredError:
-        show_error("Your session has expired. Please log in again.")
-        raise typer.Exit(1)
-    except Exception:
-        show_error()
-        raise typer.Exit(1)
-
-    # Step 1: read {directory}/doxa.yaml and verify that it is valid, e.g.
-
-    # competition: {competition tag}
-    # environment: {environment tag}
-    # language: python
-    # entrypoint: run.py
-
-    path = str(directory)
-
-    user_config = {}
-    try:
-        user_config = read_doxa_yaml(path)
-    except FileNotFoundError:
-        if not competition:
-            show_error(
-                "\nYour submission folder must contain a `doxa.yaml` file. Please check the DOXA AI website for further guidance."
-            )
-            raise typer.Exit(1)
-    except:
-        show_error(
-            "\nThere was an error reading the `doxa.yaml` file in your submission. Please check its syntax."
-        )
-        raise typer.Exit(1)
-
-    # we can override competition and environment with command-line options,
-    competition = competition or user_config.get(COMPETITION_KEY)
-    environment = environment or user_config.get(ENVIRONMENT_KEY)
-
-    user_config.pop("competition", None)
-    user_config.pop("environment", None)
-
-    if not competition:
-        show_error(
-            "\nYou must specify a competition.\n\nYou can do so by inserting `competition: [COMPETITION TAG]` into the `doxa.yaml` file in your submission folder or by using the --competition/-c command-line option.\n\nRun this command with --help for more information."
-        )
-        raise typer.Exit(1)
-
-    # Step 2: produce tar.gz of {directory} using `tarfile` module
-
-    ignore_files = user_config.get("ignore", [])
-    if not isinstance(ignore_files, list) or not all(
-        isinstance(pattern, str) for pattern in ignore_files
-    ):
-        show_error(
-            "\nIf you specify `ignore` in your `doxa.yaml` file, it must be a list of file name matching patterns."
-        )
-        raise typer.Exit(1)
-
-    try:
-        temporary_file = tempfile.NamedTemporaryFile(
-            suffix=".tar.gz", delete=False, mode="w+b"
-        )
-    except Exception as e:
-        show_error("An error occurred creating a temporary file.")
-        raise typer.Exit(1)
-
-    print()
-
-    try:
-        compress_submission_directory(temporary_file, path, ignore_files)
-    except:
-        os.unlink(temporary_file.name)
-        raise typer.Exit(1)
-
-    size = os.path.getsize(temporary_file.name)
-
-    # Step 3: Get an upload slot
-
-    try:
-        upload_slot = get_upload_slot(
-            session=session,
-            competition=competition,
-            environment=environment,
-            metadata=user_config,
-            size=size,
-        )
-
-        base_url = DOXA_STORAGE_URL or upload_slot["endpoint"]
-        if not base_url.endswith("/"):
-            base_url += "/"
-
-        upload_endpoint = urljoin(base_url, "upload")
-        upload_token = upload_slot["token"]
-    except UploadSlotDeniedError as e:
-        if e.doxa_error_code in (
-            "COMPETITION_TAG_INVALID",
-            "ENVIRONMENT_TAG_INVALID",
-            "COMPETITION_NOT_FOUND",
-            "COMPETITION_CLOSED",
-            "ENROLMENT_NOT_FOUND",
-            "ENVIRONMENT_INVALID",
-            "STORAGE_NODE_NOT_FOUND",
-            "SUBMISSION_TOO_LARGE",
-            "UNKNOWN",
-        ):
-            first_line, *lines = e.doxa_error_message.split("\n")
-            show_error(first_line)
-            if lines:
-                console.print(*lines, sep="\n\n", style="bold white")
-        elif e.doxa_error_code == "UPLOAD_RATE_LIMIT_REACHED":
-            show_error("Your upload could not be processed.")
-            console.print(e.doxa_error_message, style="bold white")
-        elif e.doxa_error_code == "METADATA_INVALID":
-            show_error(
-                "\nThe metadata provided in your `doxa.yaml` file is invalid, so your upload could not be processed."
-            )
-
-            if e.doxa_error_message:
-                console.print(
-                    f"\nThe platform gave the following reason: {e.doxa_error_message}",
-                    style="bold white",
-                )
-        else:
-            show_error(
-                "\nAn error occurred while requesting an upload slot, so your upload could not be processed."
-            )
-
-        os.unlink(temporary_file.name)
-        raise typer.Exit(1)
-    except Exception:
-        show_error(
-            "\nAn error occurred while requesting an upload slot. Please try again later."
-        )
-        os.unlink(temporary_file.name)
-        raise typer.Exit(1)
-
-    # Step 4: upload the tarfile to {endpoint}
-
-    print()
-    try:
-        with open(temporary_file.name, "rb") as f:
-            # show a fancy progress bar of the upload!
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TaskProgressColumn(),
-                "    ",
-                DownloadColumn(),
-                "    ",
-                TransferSpeedColumn(),
-                console=Console(theme=theme),
-            ) as progress:
-                task = progress.add_task("Uploading your submission  ", total=size)
-
-                def callback(m):
-                    progress.update(task, completed=m.bytes_read)
-
-                upload_agent(upload_endpoint, upload_token, f, callback)
-                progress.update(task, completed=size)
-    except UploadError as e:
-        console.print(f"\n  [bold red]ERROR[white]: {e.doxa_error_message}")
-        raise typer.Exit(1)
-    except Exception:
-        show_error("\nOops, there was an error uploading your submission to DOXA.")
-        raise typer.Exit(1)
-    finally:
-        os.unlink(temporary_file.name)
-
-    # Step 5: print success message!
-
-    console.print(
-        "\n  [bold cyan]Your submission has been successfully uploaded to the DOXA AI platform!"
-    )
-
-
-def get_upload_slot(
-    session: requests.Session,
-    competition: str,
-    environment: str | None,
-    metadata: dict[Any, Any],
-    size: int,
-):
-    result = session.post(
-        UPLOAD_SLOT_URL,
-        json={
-            "competition_tag": competition,
-            "environment_tag": environment,
-            "metadata": metadata,
-            "size": size,
-        },
-        verify=True,
-    ).json()
-
-    if "error" in result:
-        raise UploadSlotDeniedError(
-            result["error"].get("code"), result["error"].get("message")
-        )
-
-    assert "endpoint" in result
-    assert "token" in result
-
-    return result
-
-
-def compress_submission_directory(
-    f: typing.IO, directory: str, ignore_files: list[str]
-) -> None:
-    excluded_file_patterns = EXCLUDED_FILES | set(ignore_files)
-
-    def filter_tar(tarinfo: tarfile.TarInfo):
-        # Exclude certain files (e.g. the `doxa.yaml` file, symbolic links, etc)
-        if not (tarinfo.isfile() or tarinfo.isdir()) or any(
-            fnmatch.fnmatch(tarinfo.name, pattern) for pattern in excluded_file_patterns
-        ):
-            return None
-
-        # Reset user & group information
-        tarinfo.uid = tarinfo.gid = 0
-        tarinfo.uname = tarinfo.gname = "root"
-
-        # Normalise permissions
-        tarinfo.mode |= 0o777 if tarinfo.isfile() else 0o775
-
-        return tarinfo
-
-    try:
-        with tarfile.open(fileobj=f, mode="w:gz", format=tarfile.PAX_FORMAT) as tar:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TaskProgressColumn(),
-                "    ",
-                MofNCompleteColumn(),
-                "files",
-                console=Console(theme=theme),
-            ) as progress:
-                for file_name in progress.track(
-                    os.listdir(directory),
-                    description="Compressing your submission",
-                ):
-                    tar.add(
-                        os.path.join(directory, file_name),
-                        arcname=file_name,
-                        filter=filter_tar,
-                    )
-    finally:
-        f.close()
-
-
-def upload_agent(
-    upload_endpoint: str,
-    upload_token: str,
-    file: typing.IO,
-    callback: typing.Callable,
-) -> None:
-    m = MultipartEncoderMonitor(MultipartEncoder(fields={file.name: file}), callback)
-
-    response = requests.post(
-        upload_endpoint,
-        headers={
-            "Authorization": f"Bearer {upload_token}",
-            "Content-Type": m.content_type,
-        },
-        data=m,
-        verify=True,
-    )
-
-    body = response.json()
-    if response.ok and "error" not in body:
-        return
-
-    # New response format: { "error": { "code": "ERROR_CODE", "message": "..." } }
-    if "error" in body:
-        raise UploadError(body["error"].get("code"), body["error"].get("message"))
-
-    # Other error
-    raise UploadError("UNKNOWN", body.get("message"))
+import concurrent.futures
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import typing
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+import typer
+from rich.console import Console
+from rich.filesize import decimal
+from rich.table import Table
+from typing_extensions import Annotated
+
+from doxa_cli import pacing
+from doxa_cli.cache import (
+    ArchiveCache,
+    CachedArchive,
+    get_archive_cache,
+    get_fingerprint,
+)
+from doxa_cli.compression import (
+    Codec,
+    StorePolicy,
+    choose_codec,
+    get_worker_count,
+    parse_codec,
+)
+from doxa_cli.config import CONFIG
+from doxa_cli.errors import (
+    CompressionCancelledError,
+    ConfigError,
+    SessionExpiredError,
+    SignedOutError,
+    SubmissionConfigError,
+    UploadError,
+    UploadSlotDeniedError,
+    show_error,
+)
+from doxa_cli.ledger import UploadLedger, get_layout_digest
+from doxa_cli.manifest import build_manifest, write_delta_archive
+from doxa_cli.output import make_console, record_error, set_result
+from doxa_cli.preflight import (
+    SizeEstimate,
+    estimate_archive_size,
+    get_archive_size_bound,
+    get_size_limit,
+)
+from doxa_cli.resumable import UploadCheckpoint, get_checkpoint_key, upload_chunks
+from doxa_cli.scanner import SubmissionScan, scan_submission
+from doxa_cli.streaming import ChunkPipe, run_in_thread
+from doxa_cli.submission import (
+    TRANSFER_SETTINGS,
+    compress_submission_directory,
+    get_store_policy,
+    get_upload_endpoint,
+    get_upload_slot,
+    make_transfer_progress,
+    read_submission_config,
+    upload_agent,
+    upload_agent_stream,
+)
+from doxa_cli.tracing import span
+from doxa_cli.utils import get_request_client
+
+# The number of submissions uploaded at once in batch mode
+BATCH_UPLOAD_THREADS = 4
+
+
+def upload(
+    directories: Annotated[
+        Optional[list[Path]],
+        typer.Argument(
+            exists=True,
+            file_okay=False,
+            dir_okay=True,
+            readable=True,
+            resolve_path=True,
+            help="The path to the directory containing your submission. Several directories may be given to upload them all as a batch.",
+            show_default=False,
+        ),
+    ] = None,
+    batch_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--batch-file",
+            "-b",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            readable=True,
+            resolve_path=True,
+            help="A file listing submission directories to upload as a batch, one per line.",
+            show_default=False,
+        ),
+    ] = None,
+    competition: Annotated[
+        Optional[str], typer.Option("--competition", "-c", show_default=False)
+    ] = None,
+    environment: Annotated[
+        Optional[str], typer.Option("--environment", "-e", show_default=False)
+    ] = None,
+    stream: Annotated[
+        bool,
+        typer.Option(
+            "--stream",
+            help="Compress and upload your submission at the same time without writing a temporary archive to disk.",
+            show_default=False,
+        ),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            "--jobs",
+            "-j",
+            help="The number of threads used to compress your submission. Use 0 to use every available CPU core.",
+        ),
+    ] = 1,
+    compression: Annotated[
+        str,
+        typer.Option(
+            "--compression",
+            "-z",
+            help="The compression codec and level to use, e.g. `gzip`, `gzip:6`, `zstd:3`, `xz` or `none`. Use `auto` to pick the fastest setting for your submission and connection.",
+        ),
+    ] = "gzip",
+    delta: Annotated[
+        bool,
+        typer.Option(
+            "--delta",
+            help="Only upload the files that the DOXA AI platform does not already have from your previous submissions.",
+            show_default=False,
+        ),
+    ] = False,
+    chunked: Annotated[
+        bool,
+        typer.Option(
+            "--chunked",
+            help="Upload your submission in chunks, so that an interrupted upload can be continued with --resume.",
+            show_default=False,
+        ),
+    ] = False,
+    resume: Annotated[
+        bool,
+        typer.Option(
+            "--resume",
+            help="Continue a previously interrupted chunked upload of this submission.",
+            show_default=False,
+        ),
+    ] = False,
+    connections: Annotated[
+        int,
+        typer.Option(
+            "--connections",
+            min=1,
+            help="The number of parallel connections used to upload chunks of your submission. Implies --chunked.",
+        ),
+    ] = 1,
+    no_cache: Annotated[
+        bool,
+        typer.Option(
+            "--no-cache",
+            help="Always compress your submission afresh, rather than reusing a cached archive of an unchanged submission.",
+            show_default=False,
+        ),
+    ] = False,
+    force: Annotated[
+        bool,
+        typer.Option(
+            "--force",
+            "-f",
+            help="Upload your submission even if an identical submission has already been uploaded to the same competition and environment.",
+            show_default=False,
+        ),
+    ] = False,
+    max_rate: Annotated[
+        Optional[str],
+        typer.Option(
+            "--max-rate",
+            envvar="DOXA_MAX_RATE",
+            help="The maximum upload rate in bytes per second, e.g. `500K` or `10M`, shared by every connection. By default, uploads are not limited.",
+            show_default=False,
+        ),
+    ] = None,
+    read_buffer_size: Annotated[
+        Optional[str],
+        typer.Option(
+            "--read-buffer-size",
+            envvar="DOXA_READ_BUFFER_SIZE",
+            help="The size of the reads from the archive being uploaded, e.g. `1M`.",
+            show_default=False,
+        ),
+    ] = None,
+    send_buffer_size: Annotated[
+        Optional[str],
+        typer.Option(
+            "--send-buffer-size",
+            envvar="DOXA_SEND_BUFFER_SIZE",
+            help="The size of the blocks in which your submission is sent over the network, e.g. `1M`.",
+            show_default=False,
+        ),
+    ] = None,
+    dry_run: Annotated[
+        bool,
+        typer.Option(
+            "--dry-run",
+            help="Estimate the size of your submission once compressed and check it against the competition's limit, without compressing or uploading it.",
+            show_default=False,
+        ),
+    ] = False,
+):
+    """Upload and submit an agent to the DOXA AI platform."""
+
+    console = make_console()
+
+    directories = list(directories or [])
+    if batch_file is not None:
+        try:
+            directories.extend(read_batch_file(batch_file))
+        except (OSError, SubmissionConfigError) as e:
+            show_error(
+                f"\nThe batch file could not be read: {getattr(e, 'message', e)}"
+            )
+            raise typer.Exit(1)
+
+    directories = list(dict.fromkeys(directories))  # drop any duplicates
+    if not directories:
+        show_error("\nYou must specify the directory containing your submission.")
+        raise typer.Exit(1)
+
+    if len(directories) > 1 and (stream or delta or chunked or resume or dry_run):
+        show_error(
+            "\nThe --stream, --delta, --chunked, --resume and --dry-run options cannot be used when uploading several submissions at once."
+        )
+        raise typer.Exit(1)
+
+    # Step 0: ensure that the user is logged in!
+
+    try:
+        session = get_request_client(require_auth=True)
+    except SignedOutError:
+        show_error(
+            "You must be logged in to upload a submission to the DOXA AI platform.",
+            code="SIGNED_OUT",
+        )
+        raise typer.Exit(1)
+    except SessionExpiredError:
+        show_error(
+            "Your session has expired. Please log in again.", code="SESSION_EXPIRED"
+        )
+        raise typer.Exit(1)
+    except Exception:
+        show_error()
+        raise typer.Exit(1)
+
+    transfer_options = {
+        "max_rate": max_rate,
+        "read_buffer_size": read_buffer_size,
+        "send_buffer_size": send_buffer_size,
+    }
+
+    if len(directories) > 1:
+        try:
+            configure_transfer(transfer_options, {})
+        except SubmissionConfigError as e:
+            show_error(e.message, code="SUBMISSION_CONFIG_INVALID")
+            raise typer.Exit(1)
+
+        upload_batch(
+            console,
+            session,
+            [str(directory) for directory in directories],
+            competition,
+            environment,
+            compression,
+            jobs,
+            not no_cache,
+            force,
+        )
+        return
+
+    # Step 1: read {directory}/doxa.yaml and verify that it is valid
+
+    path = str(directories[0])
+
+    try:
+        with span("read_config", directory=path):
+            competition, environment, user_config, ignore_files, upload_config = (
+                read_submission_config(path, competition, environment)
+            )
+            configure_transfer(transfer_options, upload_config)
+            store_policy = get_store_policy(upload_config)
+    except SubmissionConfigError as e:
+        show_error(e.message, code="SUBMISSION_CONFIG_INVALID")
+        raise typer.Exit(1)
+
+    # A delta upload only sends part of the submission and a resumed upload reuses
+    # its archive, so neither is checked against the competition's size limit. The
+    # limit is fetched while the submission is scanned
+    check_size = dry_run or not (delta or resume)
+    if check_size:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="doxa-limit"
+        )
+        size_limit = executor.submit(get_size_limit, session, competition)
+        executor.shutdown(wait=False)
+
+    # Step 2: produce tar.gz of {directory} using `tarfile` module, after walking
+    # the directory once to find every file to include
+
+    try:
+        with span("scan") as trace:
+            scan = scan_submission(path, ignore_files)
+            trace.update(files=len(scan.files), bytes=scan.total_size)
+    except OSError:
+        show_error("\nAn error occurred while reading the files in your submission.")
+        raise typer.Exit(1)
+
+    with span("select_codec", compression=compression) as trace:
+        codec = select_codec(console, scan, compression, jobs, stream)
+        trace["codec"] = codec.name
+
+    set_result(
+        directory=path,
+        competition=competition,
+        environment=environment,
+        compression=str(codec),
+    )
+
+    if check_size:
+        with span("estimate_size") as trace:
+            estimate = estimate_archive_size(scan, codec, store_policy)
+            trace.update(estimate._asdict())
+
+        check_submission_size(console, estimate, size_limit.result(), codec, dry_run)
+
+    if dry_run:
+        set_result(uploaded=False, dry_run=True)
+        console.print(
+            "\n  [bold white]This was a dry run, so your submission has not been compressed or uploaded."
+        )
+        return
+
+    if delta:
+        upload_delta_submission(
+            console,
+            session,
+            scan,
+            competition,
+            environment,
+            user_config,
+            codec,
+            jobs,
+        )
+    elif chunked or resume or connections > 1:
+        upload_resumable_submission(
+            console,
+            session,
+            scan,
+            competition,
+            environment,
+            user_config,
+            codec,
+            jobs,
+            resume,
+            connections,
+            not no_cache,
+            force,
+            store_policy,
+        )
+    elif stream:
+        stream_submission(
+            console,
+            session,
+            scan,
+            competition,
+            environment,
+            user_config,
+            codec,
+            jobs,
+            store_policy,
+        )
+    else:
+        upload_submission(
+            console,
+            session,
+            scan,
+            competition,
+            environment,
+            user_config,
+            codec,
+            jobs,
+            not no_cache,
+            force,
+            store_policy,
+        )
+
+    # Step 5: print success message!
+
+    set_result(uploaded=True)
+    console.print(
+        "\n  [bold cyan]Your submission has been successfully uploaded to the DOXA AI platform!"
+    )
+
+
+def read_batch_file(batch_file: Path) -> list[Path]:
+    directories = []
+    with open(batch_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            # Relative paths are resolved against the location of the batch file
+            directory = (batch_file.parent / line).resolve()
+            if not directory.is_dir():
+                raise SubmissionConfigError(f"`{line}` is not a directory.")
+
+            directories.append(directory)
+
+    return directories
+
+
+def configure_transfer(
+    options: dict[str, str | None], upload_config: dict[str, Any]
+) -> None:
+    """Sets the maximum upload rate & buffer sizes, with command-line options (or
+    their environment variables) taking precedence over `doxa.yaml`."""
+
+    settings = {}
+    for key in TRANSFER_SETTINGS:
+        value = options.get(key)
+        if value is None:
+            value = upload_config.get(key)
+        if value is None:
+            continue
+
+        try:
+            settings[key] = pacing.parse_byte_size(value)
+        except ValueError as e:
+            raise SubmissionConfigError(f"\nThe {key.replace('_', ' ')} {e}")
+
+    pacing.configure(**settings)
+
+
+def compress_batch_item(
+    scan: SubmissionScan,
+    codec: Codec,
+    jobs: int,
+    store_policy: StorePolicy | None = None,
+    use_cache: bool = True,
+) -> tuple[str, str | None, bool]:
+    """Compresses a submission of a batch, unless an archive of it is cached, and
+    returns the path of the archive, the digest of its contents and whether it is a
+    temporary file to delete once uploaded. This runs in a separate process."""
+
+    cache = get_archive_cache() if use_cache else None
+    key = get_fingerprint(scan, codec, store_policy)
+
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached.path, cached.sha256, False
+
+    temporary_file = tempfile.NamedTemporaryFile(
+        suffix=codec.extension, delete=False, mode="w+b"
+    )
+
+    try:
+        digest = compress_submission_directory(
+            temporary_file,
+            scan,
+            show_progress=False,
+            codec=codec,
+            jobs=jobs,
+            store_policy=store_policy,
+        )
+    except:
+        os.unlink(temporary_file.name)
+        raise
+
+    if cache is not None:
+        try:
+            archive_path = cache.put(
+                key, temporary_file.name, scan.directory, codec, digest
+            )
+        except OSError:
+            archive_path = None
+
+        if archive_path is not None:
+            return archive_path, digest, False
+
+    return temporary_file.name, digest, True
+
+
+def upload_batch_item(
+    session: requests.Session,
+    archive_path: str,
+    competition: str,
+    environment: str | None,
+    metadata: dict[str, Any],
+    codec: Codec,
+    callback: typing.Callable,
+    temporary: bool = True,
+) -> None:
+    try:
+        upload_slot = get_upload_slot(
+            session=session,
+            competition=competition,
+            environment=environment,
+            metadata=metadata,
+            size=os.path.getsize(archive_path),
+            compression=codec.name,
+        )
+
+        with open(archive_path, "rb", buffering=pacing.get_read_buffer_size()) as f:
+            upload_agent(
+                get_upload_endpoint(upload_slot),
+                upload_slot["token"],
+                f,
+                callback,
+                session=session,
+            )
+    finally:
+        if temporary:
+            os.unlink(archive_path)
+
+
+def upload_batch(
+    console: Console,
+    session: requests.Session,
+    paths: list[str],
+    competition: str | None,
+    environment: str | None,
+    compression: str,
+    jobs: int,
+    use_cache: bool = True,
+    force: bool = False,
+) -> None:
+    """Uploads several submissions at once: archives are compressed on a pool of
+    processes, and each is uploaded on a pool of threads sharing one authenticated
+    session as soon as it is ready. A summary of the results is shown at the end.
+
+    As for a single submission, cached archives are reused, submissions that are
+    clearly over the size limit are turned away and those already uploaded are
+    skipped unless `force` is set."""
+
+    # With `--compression auto`, the codec of each submission is chosen by sampling it
+    auto = compression.strip().lower() == "auto"
+    codec = None if auto else select_codec(console, None, compression, jobs, False)
+    results: dict[str, tuple[str | None, str | None]] = {}
+    codecs: dict[str, Codec] = {}
+    skipped: set[str] = set()
+    uncached: list[str] = []
+    cache = get_archive_cache() if use_cache else None
+
+    # The cores are shared between the submissions compressed at once
+    cpu_count = os.cpu_count() or 1
+    workers = min(len(paths), cpu_count)
+    jobs = max(min(get_worker_count(jobs), cpu_count // workers), 1)
+
+    console.print()
+
+    with make_transfer_progress() as progress, concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers
+    ) as processes, concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(len(paths), BATCH_UPLOAD_THREADS)
+    ) as threads:
+        compressions, uploads = {}, {}
+
+        for path in paths:
+            try:
+                config = read_submission_config(path, competition, environment)
+                scan = scan_submission(path, config[3])
+            except SubmissionConfigError as e:
+                results[path] = (competition, e.message.strip())
+                continue
+            except OSError:
+                results[path] = (
+                    competition,
+                    "An error occurred while reading the files in this submission.",
+                )
+                continue
+
+            item_competition = config[0]
+            store_policy = get_store_policy(config[4])
+            item_codec = codec or choose_codec(
+                size=scan.total_size,
+                sample=sample_submission_files(scan.file_sizes),
+                throughput=CONFIG.get("upload_throughput"),
+                jobs=jobs,
+                streaming=False,
+            )
+            codecs[path] = item_codec
+
+            limit = get_size_limit(session, item_competition)
+            if limit is not None:
+                estimate = estimate_archive_size(scan, item_codec, store_policy)
+                if estimate.minimum_size > limit:
+                    results[path] = (
+                        item_competition,
+                        f"This submission should compress to about {decimal(estimate.archive_size)}, which is over the {decimal(limit)} limit of this competition.",
+                    )
+                    continue
+
+            task = progress.add_task(
+                f"Compressing {os.path.basename(path)} ({item_codec})",
+                total=None,
+                phase="compress",
+                submission=path,
+            )
+            future = processes.submit(
+                compress_batch_item,
+                scan,
+                item_codec,
+                jobs,
+                store_policy,
+                use_cache,
+            )
+            compressions[future] = (path, task, config, item_codec, scan)
+
+        for future in concurrent.futures.as_completed(compressions):
+            path, task, config, item_codec, scan = compressions[future]
+            item_competition, item_environment, metadata, _, _ = config
+
+            try:
+                archive_path, digest, temporary = future.result()
+            except Exception:
+                progress.update(task, visible=False)
+                results[path] = (
+                    item_competition,
+                    "An error occurred while compressing this submission.",
+                )
+                continue
+
+            if (
+                not force
+                and digest is not None
+                and UploadLedger().find(
+                    digest, item_competition, item_environment, metadata
+                )
+                is not None
+            ):
+                if temporary:
+                    os.unlink(archive_path)
+                progress.update(task, visible=False)
+                results[path] = (item_competition, None)
+                skipped.add(path)
+                continue
+
+            size = os.path.getsize(archive_path)
+            if temporary and cache is not None and size > cache.max_size:
+                uncached.append(path)
+
+            progress.update(
+                task,
+                description=f"Uploading {os.path.basename(path)}",
+                total=size,
+                phase="upload",
+            )
+
+            def callback(m, task=task):
+                progress.update(task, completed=m.bytes_read)
+
+            upload = threads.submit(
+                upload_batch_item,
+                session,
+                archive_path,
+                item_competition,
+                item_environment,
+                metadata,
+                item_codec,
+                callback,
+                temporary,
+            )
+            uploads[upload] = (path, task, config, scan, digest, size)
+
+        for future in concurrent.futures.as_completed(uploads):
+            path, task, config, scan, digest, size = uploads[future]
+            item_competition, item_environment, metadata, _, _ = config
+
+            try:
+                future.result()
+                results[path] = (item_competition, None)
+                progress.update(task, completed=progress.tasks[task].total)
+            except (UploadSlotDeniedError, UploadError) as e:
+                results[path] = (item_competition, e.doxa_error_message)
+                continue
+            except Exception:
+                results[path] = (
+                    item_competition,
+                    "An error occurred while uploading this submission.",
+                )
+                continue
+
+            record_upload(
+                digest, item_competition, item_environment, metadata, scan, size
+            )
+
+    table = Table(title="Batch upload results", expand=True, leading=1)
+    table.add_column("Submission", style="bold white", overflow="fold")
+    table.add_column("Competition", style="bold cyan")
+    table.add_column("Result", overflow="fold")
+
+    for path in paths:
+        item_competition, error = results.get(path, (competition, "Not uploaded."))
+        if path in skipped:
+            result = "[bold yellow]Already uploaded"
+        elif error is None:
+            result = "[bold green]Uploaded"
+        else:
+            result = f"[bold red]{error}"
+        table.add_row(path, item_competition or "", result)
+
+    console.print()
+    console.print(table)
+
+    if uncached and cache is not None:
+        console.print(
+            f"\n  [bold yellow]The archives of {', '.join(uncached)} are larger than the {decimal(cache.max_size)} cache of compressed submissions, so they have not been cached.\n\n  [bold white]Run `doxa cache --max-size` to raise the size limit of the cache."
+        )
+
+    set_result(
+        submissions=[
+            {
+                "directory": path,
+                "competition": results.get(path, (competition,))[0],
+                "compression": str(codecs[path]) if path in codecs else None,
+                "uploaded": path in results
+                and results[path][1] is None
+                and path not in skipped,
+                "skipped": path in skipped,
+                "error": results.get(path, (None, "Not uploaded."))[1],
+            }
+            for path in paths
+        ]
+    )
+
+    failures = sum(1 for _, error in results.values() if error is not None)
+    if failures:
+        show_error(f"{failures} of {len(paths)} submissions could not be uploaded.")
+        raise typer.Exit(1)
+
+    if skipped:
+        console.print(
+            f"\n  [bold yellow]{len(skipped)} of {len(paths)} submissions had already been uploaded to their competition, so they have not been uploaded again.\n\n  [bold white]Run this command with the --force option to upload them anyway."
+        )
+
+    uploaded = len(paths) - len(skipped)
+    if not skipped:
+        console.print(
+            f"\n  [bold cyan]All {uploaded} submissions have been successfully uploaded to the DOXA AI platform!"
+        )
+    elif uploaded:
+        console.print(
+            f"\n  [bold cyan]The other {uploaded} {'submission has' if uploaded == 1 else 'submissions have'} been successfully uploaded to the DOXA AI platform!"
+        )
+
+
+def select_codec(
+    console: Console,
+    scan: SubmissionScan | None,
+    compression: str,
+    jobs: int,
+    streaming: bool,
+) -> Codec:
+    if compression.strip().lower() != "auto":
+        try:
+            return parse_codec(compression)
+        except ValueError as e:
+            show_error(f"\nInvalid --compression option: {e}")
+            raise typer.Exit(1)
+
+    assert scan is not None
+    codec = choose_codec(
+        size=scan.total_size,
+        sample=sample_submission_files(scan.file_sizes),
+        throughput=CONFIG.get("upload_throughput"),
+        jobs=jobs,
+        streaming=streaming,
+    )
+
+    console.print(
+        f"\n  [bold white]Using [bold cyan]{codec}[bold white] compression for your submission."
+    )
+
+    return codec
+
+
+def check_submission_size(
+    console: Console,
+    estimate: SizeEstimate,
+    limit: int | None,
+    codec: Codec,
+    dry_run: bool = False,
+) -> None:
+    """Stops before compression if the archive of a submission would clearly be
+    larger than the competition's size limit. Otherwise, the platform has the final
+    say when the upload slot is requested."""
+
+    set_result(
+        files=estimate.files,
+        bytes=estimate.total_size,
+        estimated_size=estimate.archive_size,
+        size_limit=limit,
+    )
+
+    if dry_run:
+        console.print(
+            f"\n  [bold white]Your submission contains {estimate.files:,} files ({decimal(estimate.total_size)}), which should compress to about [bold cyan]{decimal(estimate.archive_size)}[bold white] using {codec} compression."
+        )
+        if limit is not None:
+            console.print(
+                f"\n  [bold white]Submissions to this competition may be up to {decimal(limit)}."
+            )
+
+    if limit is None or estimate.archive_size <= limit:
+        return
+
+    # The estimate may be too large, so the submission is only turned away if it
+    # would be too large even so
+    if estimate.minimum_size <= limit:
+        console.print(
+            f"\n  [bold yellow]Your submission may be larger than the {decimal(limit)} limit of this competition once compressed."
+        )
+        return
+
+    show_error(
+        f"\nYour submission should compress to about {decimal(estimate.archive_size)}, which is over the {decimal(limit)} limit of this competition.",
+        code="SUBMISSION_TOO_LARGE",
+    )
+    console.print(
+        "Large files that your agent does not need can be excluded using `ignore` in your `doxa.yaml` file.",
+        style="bold white",
+    )
+    raise typer.Exit(1)
+
+
+def record_upload_throughput(size: int, elapsed: float) -> None:
+    if size < 1024 * 1024 or elapsed <= 0:
+        return  # too small to be a meaningful measurement
+
+    # Keep an exponentially-weighted moving average of recent uploads
+    try:
+        previous = CONFIG.get("upload_throughput")
+        throughput = size / elapsed
+        if previous:
+            throughput = 0.5 * previous + 0.5 * throughput
+
+        CONFIG.update({"upload_throughput": throughput})
+    except ConfigError:
+        pass  # the throughput only informs `--compression auto`
+
+
+def request_upload_slot(
+    console: Console,
+    session: requests.Session,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    size: int,
+    codec: Codec,
+    manifest: dict[str, Any] | None = None,
+    reservation: concurrent.futures.Future | None = None,
+) -> dict[str, Any]:
+    try:
+        if reservation is not None:
+            try:
+                return reservation.result()
+            except UploadSlotDeniedError as e:
+                # The reservation was made with an upper bound of the archive's size,
+                # which may be over the limit even if the archive is not, so ask again
+                if e.doxa_error_code != "SUBMISSION_TOO_LARGE":
+                    raise
+            except Exception:
+                pass  # requested again below
+
+        return get_upload_slot(
+            session=session,
+            competition=competition,
+            environment=environment,
+            metadata=metadata,
+            size=size,
+            compression=codec.name,
+            manifest=manifest,
+        )
+    except UploadSlotDeniedError as e:
+        record_error(e.doxa_error_code, e.doxa_error_message)
+
+        if e.doxa_error_code in (
+            "COMPETITION_TAG_INVALID",
+            "ENVIRONMENT_TAG_INVALID",
+            "COMPETITION_NOT_FOUND",
+            "COMPETITION_CLOSED",
+            "ENROLMENT_NOT_FOUND",
+            "ENVIRONMENT_INVALID",
+            "STORAGE_NODE_NOT_FOUND",
+            "SUBMISSION_TOO_LARGE",
+            "UNKNOWN",
+        ):
+            first_line, *lines = e.doxa_error_message.split("\n")
+            show_error(first_line)
+            if lines:
+                console.print(*lines, sep="\n\n", style="bold white")
+        elif e.doxa_error_code == "UPLOAD_RATE_LIMIT_REACHED":
+            show_error("Your upload could not be processed.")
+            console.print(e.doxa_error_message, style="bold white")
+        elif e.doxa_error_code == "METADATA_INVALID":
+            show_error(
+                "\nThe metadata provided in your `doxa.yaml` file is invalid, so your upload could not be processed."
+            )
+
+            if e.doxa_error_message:
+                console.print(
+                    f"\nThe platform gave the following reason: {e.doxa_error_message}",
+                    style="bold white",
+                )
+        else:
+            show_error(
+                "\nAn error occurred while requesting an upload slot, so your upload could not be processed."
+            )
+
+        raise typer.Exit(1)
+    except Exception:
+        show_error(
+            "\nAn error occurred while requesting an upload slot. Please try again later."
+        )
+        raise typer.Exit(1)
+
+
+def reserve_upload_slot(
+    session: requests.Session,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    scan: SubmissionScan,
+    codec: Codec,
+    stop: threading.Event,
+) -> concurrent.futures.Future:
+    """Requests an upload slot on a background thread while the submission is being
+    compressed, declaring the largest the archive can be, as its size is not yet
+    known. If the slot is denied, `stop` is set so that compression can be abandoned
+    at once."""
+
+    size = get_archive_size_bound(scan, codec)
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="doxa-slot"
+    )
+    reservation = executor.submit(
+        get_upload_slot,
+        session=session,
+        competition=competition,
+        environment=environment,
+        metadata=metadata,
+        size=size,
+        compression=codec.name,
+    )
+    executor.shutdown(wait=False)
+
+    def on_done(future: concurrent.futures.Future) -> None:
+        e = future.exception()
+        if (
+            isinstance(e, UploadSlotDeniedError)
+            and e.doxa_error_code != "SUBMISSION_TOO_LARGE"
+        ):
+            stop.set()
+
+    reservation.add_done_callback(on_done)
+    return reservation
+
+
+def get_cached_archive(
+    console: Console, cache: ArchiveCache | None, key: str
+) -> CachedArchive | None:
+    with span("cache_lookup") as trace:
+        cached = cache.get(key) if cache is not None else None
+        trace["hit"] = cached is not None
+
+    if cached is not None:
+        console.print(
+            "\n  [bold white]Your submission has not changed since it was last compressed, so the cached archive will be reused."
+        )
+
+    return cached
+
+
+def cache_archive(
+    console: Console,
+    cache: ArchiveCache,
+    key: str,
+    archive_path: str,
+    scan: SubmissionScan,
+    codec: Codec,
+    digest: str | None,
+    keep_source: bool = False,
+) -> str | None:
+    """Adds a newly built archive to the cache and returns its path there, or None if
+    it was not cached, in which case the caller still owns the archive."""
+
+    size = os.path.getsize(archive_path)
+    if size > cache.max_size:
+        console.print(
+            f"\n  [bold yellow]The archive of your submission ({decimal(size)}) is larger than the {decimal(cache.max_size)} cache of compressed submissions, so it has not been cached.\n\n  [bold white]Run `doxa cache --max-size` to raise the size limit of the cache."
+        )
+        return None
+
+    try:
+        return cache.put(
+            key, archive_path, scan.directory, codec, digest, keep_source=keep_source
+        )
+    except OSError:
+        return None  # the cache is only an optimisation
+
+
+def may_be_uploaded(
+    scan: SubmissionScan,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+) -> bool:
+    """Tells whether `check_upload_ledger` may stop the upload once the submission
+    has been compressed, in which case no upload slot is reserved beforehand."""
+
+    return UploadLedger().has_layout(
+        get_layout_digest(scan), competition, environment, metadata
+    )
+
+
+def check_upload_ledger(
+    console: Console,
+    digest: str | None,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+) -> None:
+    """Stops before an upload slot is requested if an identical submission has
+    already been uploaded to the same competition and environment."""
+
+    if digest is None:
+        return
+
+    entry = UploadLedger().find(digest, competition, environment, metadata)
+    if entry is None:
+        return
+
+    uploaded_at = time.strftime(
+        "%Y-%m-%d %H:%M", time.localtime(entry.get("uploaded_at", 0))
+    )
+    set_result(uploaded=False, skipped=True, previous_upload=entry.get("uploaded_at"))
+    console.print(
+        f"\n  [bold yellow]An identical submission was already uploaded to this competition on {uploaded_at}, so it has not been uploaded again.\n\n  [bold white]Run this command with the --force option to upload it anyway."
+    )
+    raise typer.Exit()
+
+
+def record_upload(
+    digest: str | None,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    scan: SubmissionScan,
+    size: int,
+) -> None:
+    if digest is None:
+        return
+
+    try:
+        UploadLedger().record(
+            digest,
+            competition,
+            environment,
+            metadata,
+            scan.directory,
+            size,
+            get_layout_digest(scan),
+        )
+    except OSError:
+        pass  # the ledger is only an optimisation
+
+
+def upload_submission(
+    console: Console,
+    session: requests.Session,
+    scan: SubmissionScan,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    codec: Codec,
+    jobs: int,
+    use_cache: bool = True,
+    force: bool = False,
+    store_policy: StorePolicy | None = None,
+) -> None:
+    cache = get_archive_cache() if use_cache else None
+    key = get_fingerprint(scan, codec, store_policy)
+
+    cached = get_cached_archive(console, cache, key)
+    temporary_path = None
+    reservation = None
+
+    if cached is not None:
+        archive_path, digest = cached.path, cached.sha256
+    else:
+        try:
+            temporary_file = tempfile.NamedTemporaryFile(
+                suffix=codec.extension, delete=False, mode="w+b"
+            )
+        except Exception as e:
+            show_error("An error occurred creating a temporary file.")
+            raise typer.Exit(1)
+
+        console.print()
+
+        # The upload slot is requested while compressing, so that a denied slot is
+        # reported straight away rather than after compressing the submission, unless
+        # the submission may turn out to have been uploaded already
+        stop = threading.Event()
+        if force or not may_be_uploaded(scan, competition, environment, metadata):
+            reservation = reserve_upload_slot(
+                session, competition, environment, metadata, scan, codec, stop
+            )
+
+        try:
+            digest = compress_submission_directory(
+                temporary_file,
+                scan,
+                codec=codec,
+                jobs=jobs,
+                stop=stop,
+                store_policy=store_policy,
+            )
+        except CompressionCancelledError:
+            os.unlink(temporary_file.name)
+            request_upload_slot(
+                console,
+                session,
+                competition,
+                environment,
+                metadata,
+                scan.total_size,
+                codec,
+                reservation=reservation,
+            )
+            raise typer.Exit(1)
+        except:
+            os.unlink(temporary_file.name)
+            raise typer.Exit(1)
+
+        # Keep the archive, so that it can be reused if the upload slot is denied or
+        # the same submission is uploaded again
+        archive_path = temporary_path = temporary_file.name
+        if cache is not None:
+            archive_path = (
+                cache_archive(console, cache, key, temporary_path, scan, codec, digest)
+                or temporary_path
+            )
+
+            if archive_path != temporary_path:
+                temporary_path = None
+
+    size = os.path.getsize(archive_path)
+    set_result(size=size, sha256=digest)
+
+    # Step 3: Get an upload slot, unless this submission was already uploaded
+
+    try:
+        if not force:
+            check_upload_ledger(console, digest, competition, environment, metadata)
+
+        upload_slot = request_upload_slot(
+            console,
+            session,
+            competition,
+            environment,
+            metadata,
+            size,
+            codec,
+            reservation=reservation,
+        )
+
+        # Step 4: upload the tarfile to {endpoint}
+
+        upload_archive_file(
+            console,
+            get_upload_endpoint(upload_slot),
+            upload_slot["token"],
+            archive_path,
+            size,
+        )
+
+        record_upload(digest, competition, environment, metadata, scan, size)
+    finally:
+        if temporary_path is not None:
+            os.unlink(temporary_path)
+
+
+def upload_archive_file(
+    console: Console,
+    upload_endpoint: str,
+    upload_token: str,
+    file_path: str,
+    size: int,
+) -> None:
+    console.print()
+    try:
+        with open(file_path, "rb", buffering=pacing.get_read_buffer_size()) as f:
+            # show a fancy progress bar of the upload!
+            with make_transfer_progress() as progress:
+                task = progress.add_task(
+                    "Uploading your submission  ", total=size, phase="upload"
+                )
+
+                def callback(m):
+                    progress.update(task, completed=m.bytes_read)
+
+                start = time.perf_counter()
+                upload_agent(upload_endpoint, upload_token, f, callback)
+                elapsed = time.perf_counter() - start
+                progress.update(task, completed=size)
+    except UploadError as e:
+        record_error(e.doxa_error_code, e.doxa_error_message)
+        console.print(f"\n  [bold red]ERROR[white]: {e.doxa_error_message}")
+        raise typer.Exit(1)
+    except Exception:
+        show_error("\nOops, there was an error uploading your submission to DOXA.")
+        raise typer.Exit(1)
+
+    record_upload_throughput(size, elapsed)
+
+
+def upload_delta_submission(
+    console: Console,
+    session: requests.Session,
+    scan: SubmissionScan,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    codec: Codec,
+    jobs: int,
+) -> None:
+    size = scan.total_size
+
+    console.print()
+
+    try:
+        with make_transfer_progress() as progress, span(
+            "hash", files=len(scan.files), bytes=size, jobs=jobs
+        ):
+            task = progress.add_task(
+                "Hashing your submission    ", total=size, phase="hash"
+            )
+
+            manifest = build_manifest(
+                scan.directory,
+                scan.file_sizes,
+                jobs=jobs,
+                callback=lambda n: progress.advance(task, n),
+            )
+    except OSError:
+        show_error("\nAn error occurred while reading the files in your submission.")
+        raise typer.Exit(1)
+
+    # The platform replies with the digests of the files it does not already have
+    upload_slot = request_upload_slot(
+        console, session, competition, environment, metadata, size, codec, manifest
+    )
+
+    if "missing" not in upload_slot:
+        show_error(
+            "\nThe DOXA AI platform does not support incremental uploads for this competition. Please upload your submission without the --delta option."
+        )
+        raise typer.Exit(1)
+
+    missing = set(upload_slot["missing"])
+    missing_size = sum(
+        entry["size"] for entry in manifest["files"] if entry["sha256"] in missing
+    )
+
+    set_result(files=len(manifest["files"]), missing_files=len(missing))
+    console.print(
+        f"\n  [bold white]{len(missing)} of {len(manifest['files'])} files ({missing_size:,} bytes) need to be uploaded."
+    )
+
+    try:
+        temporary_file = tempfile.NamedTemporaryFile(
+            suffix=codec.extension, delete=False, mode="w+b"
+        )
+    except Exception:
+        show_error("An error occurred creating a temporary file.")
+        raise typer.Exit(1)
+
+    try:
+        try:
+            with span("compress", codec=codec.name, jobs=jobs, files=len(missing)):
+                write_delta_archive(
+                    temporary_file,
+                    scan.directory,
+                    manifest,
+                    missing,
+                    codec=codec,
+                    jobs=jobs,
+                )
+        except Exception:
+            show_error("\nAn error occurred while compressing your submission.")
+            raise typer.Exit(1)
+
+        upload_archive_file(
+            console,
+            get_upload_endpoint(upload_slot),
+            upload_slot["token"],
+            temporary_file.name,
+            os.path.getsize(temporary_file.name),
+        )
+    finally:
+        os.unlink(temporary_file.name)
+
+
+def upload_resumable_submission(
+    console: Console,
+    session: requests.Session,
+    scan: SubmissionScan,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    codec: Codec,
+    jobs: int,
+    resume: bool,
+    connections: int,
+    use_cache: bool = True,
+    force: bool = False,
+    store_policy: StorePolicy | None = None,
+) -> None:
+    key = get_checkpoint_key(scan.directory, competition, environment)
+    fingerprint = get_fingerprint(scan, codec, store_policy)
+
+    checkpoint = UploadCheckpoint.load(key)
+    if checkpoint is not None and not resume:
+        checkpoint.delete()  # start afresh, discarding the interrupted upload
+        checkpoint = None
+    elif checkpoint is not None and checkpoint.fingerprint != fingerprint:
+        # The archive of the interrupted upload no longer matches the submission
+        checkpoint.delete()
+        checkpoint = None
+        console.print(
+            "\n  [bold yellow]Your submission (or its compression settings) has changed since its upload was interrupted, so a new upload will be started."
+        )
+    elif checkpoint is None and resume:
+        console.print(
+            "\n  [bold yellow]No interrupted upload of this submission was found, so a new upload will be started."
+        )
+
+    if checkpoint is None:
+        # The archive is kept until the upload completes rather than in a temporary
+        # file, so that it need not be recompressed if the upload is interrupted
+        archive_path = UploadCheckpoint.get_archive_path(key, codec.extension)
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+
+        cache = get_archive_cache() if use_cache else None
+        cached = get_cached_archive(console, cache, fingerprint)
+        reservation = None
+        if cached is not None:
+            # A hard link costs nothing when both are on the same file system
+            try:
+                os.link(cached.path, archive_path)
+            except OSError:
+                shutil.copyfile(cached.path, archive_path)
+            digest = cached.sha256
+        else:
+            console.print()
+
+            stop = threading.Event()
+            if force or not may_be_uploaded(scan, competition, environment, metadata):
+                reservation = reserve_upload_slot(
+                    session, competition, environment, metadata, scan, codec, stop
+                )
+
+            try:
+                digest = compress_submission_directory(
+                    open(archive_path, "wb"),
+                    scan,
+                    codec=codec,
+                    jobs=jobs,
+                    stop=stop,
+                    store_policy=store_policy,
+                )
+            except BaseException as e:
+                if os.path.exists(archive_path):
+                    os.unlink(archive_path)
+
+                if isinstance(e, CompressionCancelledError):
+                    request_upload_slot(
+                        console,
+                        session,
+                        competition,
+                        environment,
+                        metadata,
+                        scan.total_size,
+                        codec,
+                        reservation=reservation,
+                    )
+                raise typer.Exit(1)
+
+            if cache is not None:
+                cache_archive(
+                    console,
+                    cache,
+                    fingerprint,
+                    archive_path,
+                    scan,
+                    codec,
+                    digest,
+                    keep_source=True,
+                )
+
+        try:
+            if not force:
+                check_upload_ledger(console, digest, competition, environment, metadata)
+
+            upload_slot = request_upload_slot(
+                console,
+                session,
+                competition,
+                environment,
+                metadata,
+                os.path.getsize(archive_path),
+                codec,
+                reservation=reservation,
+            )
+        except typer.Exit:
+            os.unlink(archive_path)
+            raise
+
+        checkpoint = UploadCheckpoint.create(
+            key,
+            archive_path,
+            get_upload_endpoint(upload_slot),
+            upload_slot["token"],
+            sha256=digest,
+            fingerprint=fingerprint,
+        )
+    else:
+        console.print(
+            f"\n  [bold white]Resuming the upload of your submission from chunk {len(checkpoint.acknowledged) + 1} of {checkpoint.chunk_count}."
+        )
+
+    console.print()
+    try:
+        with make_transfer_progress() as progress:
+            task = progress.add_task(
+                "Uploading your submission  ",
+                total=checkpoint.size,
+                completed=checkpoint.acknowledged_size,
+                phase="upload",
+            )
+
+            with span(
+                "transfer",
+                bytes=checkpoint.size - checkpoint.acknowledged_size,
+                chunks=checkpoint.chunk_count - len(checkpoint.acknowledged),
+                connections=connections,
+            ):
+                upload_chunks(
+                    checkpoint, lambda n: progress.advance(task, n), connections
+                )
+            progress.update(task, completed=checkpoint.size)
+    except UploadError as e:
+        if e.doxa_error_code == "UPLOAD_TOKEN_INVALID":
+            checkpoint.delete()  # the upload slot has expired, so start again
+
+        record_error(e.doxa_error_code, e.doxa_error_message)
+        console.print(f"\n  [bold red]ERROR[white]: {e.doxa_error_message}")
+        raise typer.Exit(1)
+    except Exception:
+        show_error(
+            "\nOops, there was an error uploading your submission to DOXA. You can continue this upload by running this command again with the --resume option."
+        )
+        raise typer.Exit(1)
+
+    set_result(size=checkpoint.size, sha256=checkpoint.data.get("sha256"))
+    record_upload(
+        checkpoint.data.get("sha256"),
+        competition,
+        environment,
+        metadata,
+        scan,
+        checkpoint.size,
+    )
+    checkpoint.delete()
+
+
+def stream_submission(
+    console: Console,
+    session: requests.Session,
+    scan: SubmissionScan,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    codec: Codec,
+    jobs: int,
+    store_policy: StorePolicy | None = None,
+) -> None:
+    # The final archive size is not known until compression has finished, so the
+    # upload slot is requested with the largest the archive can be
+    size = get_archive_size_bound(scan, codec)
+
+    # Compression starts filling the pipe while the upload slot is requested, and
+    # is abandoned if the slot is denied
+    pipe = ChunkPipe(name=f"submission{codec.extension}")
+    run_in_thread(
+        compress_submission_directory,
+        pipe,
+        scan,
+        show_progress=False,
+        codec=codec,
+        jobs=jobs,
+        store_policy=store_policy,
+    )
+
+    try:
+        upload_slot = request_upload_slot(
+            console, session, competition, environment, metadata, size, codec
+        )
+    except typer.Exit:
+        pipe.cancel()
+        raise
+
+    console.print()
+
+    try:
+        with make_transfer_progress() as progress:
+            task = progress.add_task(
+                "Compressing and uploading your submission  ",
+                total=None,
+                phase="upload",
+            )
+
+            def callback(bytes_sent: int):
+                progress.update(task, completed=bytes_sent)
+
+            upload_agent_stream(
+                get_upload_endpoint(upload_slot), upload_slot["token"], pipe, callback
+            )
+            progress.update(task, total=pipe.bytes_written)
+            set_result(size=pipe.bytes_written)
+    except UploadError as e:
+        record_error(e.doxa_error_code, e.doxa_error_message)
+        console.print(f"\n  [bold red]ERROR[white]: {e.doxa_error_message}")
+        raise typer.Exit(1)
+    except Exception:
+        show_error("\nOops, there was an error uploading your submission to DOXA.")
+        raise typer.Exit(1)
+    finally:
+        pipe.cancel()
+
+
+def sample_submission_files(
+    files: list[tuple[str, int]],
+    samples: int = 16,
+    sample_size: int = 64 * 1024,
+) -> bytes:
+    """Reads a few blocks from files picked in proportion to their size, so that the
+    sample is representative of the bulk of the submission."""
+
+    files = [(file_path, size) for file_path, size in files if size > 0]
+    if not files:
+        return b""
+
+    rng = random.Random(0)
+    picked = rng.choices(files, weights=[size for _, size in files], k=samples)
+
+    sample = bytearray()
+    for file_path, size in picked:
+        try:
+            with open(file_path, "rb") as f:
+                f.seek(rng.randrange(max(size - sample_size, 0) + 1))
+                sample += f.read(sample_size)
+        except OSError:
+            continue
+
+    return bytes(sample)
@@ -1,12 +1,13 @@
-from rich.console import Console
-
-from doxa_cli.constants import __version__
-
-
-def version():
-    """Gives the version of the DOXA CLI."""
-
-    console = Console()
-    console.print(
-        f"\n[bold white]You are running DOXA CLI version [bold cyan]{__version__} 😎"
-    )
+from doxa_cli.constants import __version__
+from doxa_cli.output import make_console, set_result
+
+
+def version():
+    """Gives the version of the DOXA CLI."""
+
+    console = make_console()
+    console.print(
+        f"\n[bold white]You are running DOXA CLI version [bold cyan]{__version__} 😎"
+    )
+
+    set_result(version=__version__)
@@ -0,0 +1,553 @@
+import collections
+import concurrent.futures
+import gzip
+import hashlib
+import lzma
+import os
+import time
+import typing
+import zlib
+
+from doxa_cli.ignore import IgnoreSpec, parse_ignore_lines
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 9
+
+# The modification time given to every archive entry, so that archives of identical
+# submissions are byte-for-byte identical (1980-01-01, the earliest ZIP timestamp)
+ARCHIVE_MTIME = 315532800
+
+# More than the header & trailer of a gzip member, zstd frame or xz stream
+SEGMENT_OVERHEAD = 128
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_BLOCK_SIZE = 128 * 1024
+
+# Assumed upload throughput (in bytes per second) before any upload has been timed
+DEFAULT_UPLOAD_THROUGHPUT = 10 * 1024 * 1024
+
+CODEC_NAMES = ("gzip", "zstd", "xz", "none")
+CODEC_EXTENSIONS = {
+    "gzip": ".tar.gz",
+    "zstd": ".tar.zst",
+    "xz": ".tar.xz",
+    "none": ".tar",
+}
+CODEC_LEVELS = {
+    "gzip": (0, 9, DEFAULT_COMPRESSION_LEVEL),
+    "zstd": (1, 22, 3),
+    "xz": (0, 9, 6),
+    "none": (0, 0, 0),
+}
+
+# Files with these extensions are already compressed (or, like trained weights,
+# barely compress at all), so they are stored rather than compressed
+INCOMPRESSIBLE_EXTENSIONS = frozenset(
+    (
+        ".7z",
+        ".bz2",
+        ".ckpt",
+        ".gz",
+        ".jpeg",
+        ".jpg",
+        ".mp3",
+        ".mp4",
+        ".npz",
+        ".onnx",
+        ".png",
+        ".pt",
+        ".pth",
+        ".rar",
+        ".safetensors",
+        ".tflite",
+        ".tgz",
+        ".webp",
+        ".whl",
+        ".xz",
+        ".zip",
+        ".zst",
+    )
+)
+
+# Other files of at least this size are stored if a sample of their first bytes
+# shrinks by less than `INCOMPRESSIBLE_RATIO` when compressed. Smaller files are
+# always compressed, as storing them would save little time
+STORE_MIN_SIZE = 256 * 1024
+STORE_SAMPLE_SIZE = 16 * 1024
+INCOMPRESSIBLE_RATIO = 0.95
+
+# The settings considered by `--compression auto`
+AUTO_CANDIDATES = (
+    "none",
+    "gzip:1",
+    "gzip:6",
+    "gzip:9",
+    "zstd:1",
+    "zstd:3",
+    "zstd:10",
+    "xz:1",
+    "xz:6",
+)
+
+
+def get_worker_count(jobs: int) -> int:
+    """Resolves the `--jobs` option, where zero or less means every available core."""
+
+    if jobs > 0:
+        return jobs
+
+    return os.cpu_count() or 1
+
+
+def compress_gzip_member(data: bytes, level: int) -> bytes:
+    # `wbits=31` produces a complete gzip member (header, deflate stream & trailer)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def is_zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+class ParallelGzipWriter:
+    """A write-only file-like object that splits its input into blocks, deflates
+    the blocks on a pool of worker threads (zlib releases the GIL) and writes them
+    out in order as a multi-member gzip stream, in the spirit of `pigz`.
+
+    Concatenated gzip members are part of the gzip specification (RFC 1952), so
+    the output can be read by any standard gzip decompressor. As with `GzipFile`,
+    closing the writer does not close the underlying file object."""
+
+    def __init__(
+        self,
+        fileobj: typing.IO,
+        jobs: int,
+        level: int = DEFAULT_COMPRESSION_LEVEL,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+        self.level = level
+        self.block_size = block_size
+
+        self._jobs = get_worker_count(jobs)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._jobs, thread_name_prefix="doxa-gzip"
+        )
+        self._pending: collections.deque = collections.deque()
+        self._buffer = bytearray()
+        self._closed = False
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(
+            self._executor.submit(compress_gzip_member, block, self.level)
+        )
+
+        # Bound the number of blocks in flight so that memory usage stays flat
+        while len(self._pending) > 2 * self._jobs:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data) -> int:
+        if self._closed:
+            raise ValueError("write to closed file")
+
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[: self.block_size]))
+            del self._buffer[: self.block_size]
+
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        try:
+            if self._buffer or not self._pending:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+
+            while self._pending:
+                self.fileobj.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class HashingWriter:
+    """Computes the SHA-256 digest of everything written through it to `fileobj`."""
+
+    def __init__(self, fileobj: typing.IO) -> None:
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+        self.digest = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return self.fileobj.write(data)
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+class _PassthroughWriter:
+    """Used by the store-only codec: writes go straight to the underlying file."""
+
+    def __init__(self, fileobj: typing.IO) -> None:
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+
+    def write(self, data) -> int:
+        return self.fileobj.write(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ZstdStoreWriter:
+    """Writes a zstd frame in which data is stored as raw blocks rather than being
+    compressed, the zstd counterpart of a level 0 gzip member. The frame declares
+    neither its content size nor a checksum, so it can be written as data arrives."""
+
+    def __init__(self, fileobj: typing.IO) -> None:
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+        self._buffer = bytearray()
+        self._closed = False
+
+        # A frame header whose window (and so largest block) is 128 KiB
+        self.fileobj.write(ZSTD_MAGIC + bytes([0x00, 0x38]))
+
+    def _write_block(self, data: bytes, last: bool) -> None:
+        header = len(data) << 3 | int(last)  # block type 0 is a raw block
+        self.fileobj.write(header.to_bytes(3, "little") + data)
+
+    def write(self, data) -> int:
+        if self._closed:
+            raise ValueError("write to closed file")
+
+        self._buffer += data
+
+        # The last block is kept back, as it must be marked as such once closed
+        while len(self._buffer) > ZSTD_BLOCK_SIZE:
+            self._write_block(bytes(self._buffer[:ZSTD_BLOCK_SIZE]), False)
+            del self._buffer[:ZSTD_BLOCK_SIZE]
+
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        self._write_block(bytes(self._buffer), True)
+        self._buffer.clear()
+
+
+class StorePolicy:
+    """Decides which files are stored in the archive without being compressed: files
+    matching a `compress` pattern are always compressed, files matching a `store`
+    pattern are always stored (both using the `.gitignore` syntax of `ignore`) and
+    other files are stored if they appear to be incompressible."""
+
+    def __init__(
+        self, store: typing.Iterable[str] = (), compress: typing.Iterable[str] = ()
+    ) -> None:
+        self.store = list(store)
+        self.compress = list(compress)
+        self._store_spec = IgnoreSpec(parse_ignore_lines(self.store))
+        self._compress_spec = IgnoreSpec(parse_ignore_lines(self.compress))
+
+    @staticmethod
+    def _matches(spec: IgnoreSpec, arcname: str) -> bool:
+        # A pattern may match the file itself or any directory containing it
+        parts = arcname.split("/")
+        return spec.is_ignored(arcname, False) or any(
+            spec.is_ignored("/".join(parts[:i]), True) for i in range(1, len(parts))
+        )
+
+    def decide(self, arcname: str, size: int) -> bool | None:
+        """Decides whether to store a file from its name & size alone, returning
+        `None` if a sample of its contents is needed to tell."""
+
+        if size == 0 or (self.compress and self._matches(self._compress_spec, arcname)):
+            return False
+
+        if self.store and self._matches(self._store_spec, arcname):
+            return True
+
+        if size < STORE_MIN_SIZE:
+            return False
+
+        if os.path.splitext(arcname)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+            return True
+
+        return None
+
+    def should_store(self, arcname: str, size: int, f: typing.IO) -> bool:
+        """Decides whether to store a file, sampling its first bytes from `f` (which
+        is left at the start of the file) if need be."""
+
+        decision = self.decide(arcname, size)
+        if decision is not None:
+            return decision
+
+        sample = f.read(STORE_SAMPLE_SIZE)
+        f.seek(0)
+
+        return is_incompressible(sample)
+
+
+def is_incompressible(sample: bytes) -> bool:
+    return len(zlib.compress(sample, 1)) >= INCOMPRESSIBLE_RATIO * len(sample)
+
+
+class SegmentedWriter:
+    """A write-only file-like object that compresses its input as a sequence of
+    independent segments, i.e. gzip members or zstd frames, which standard tools
+    decompress as a single stream. While `storing`, input is written to segments
+    that store it as it is (e.g. a level 0 gzip member, which is not deflated)
+    rather than being pushed through the compressor. Closing the writer does not
+    close the underlying file object."""
+
+    def __init__(self, fileobj: typing.IO, codec: "Codec", jobs: int = 1) -> None:
+        self.fileobj = fileobj
+        self.name = getattr(fileobj, "name", None)
+        self.codec = codec
+        self.jobs = jobs
+        self.storing = False
+
+        # Each segment is only started once written to, so no empty segments are made
+        self._output: typing.Any = None
+
+    def set_storing(self, storing: bool) -> None:
+        if storing == self.storing:
+            return
+
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+        self.storing = storing
+
+    def write(self, data) -> int:
+        if self._output is None:
+            if self.storing:
+                self._output = self.codec.open_stored(self.fileobj)
+            else:
+                self._output = self.codec.open(self.fileobj, self.jobs)
+
+        return self._output.write(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._output is None:
+            self.write(b"")  # an empty archive is still a valid stream
+
+        self._output.close()
+
+
+class Codec:
+    """A compression format and level used to compress the submission tarball."""
+
+    def __init__(self, name: str, level: int | None = None) -> None:
+        if name not in CODEC_NAMES:
+            raise ValueError(f"Unknown compression codec `{name}`.")
+
+        minimum, maximum, default = CODEC_LEVELS[name]
+        if level is None:
+            level = default
+        elif not minimum <= level <= maximum:
+            raise ValueError(
+                f"The `{name}` compression level must be between {minimum} and {maximum}."
+            )
+
+        if name == "zstd" and not is_zstd_available():
+            raise ValueError(
+                "The `zstandard` package must be installed to use zstd compression, e.g. using `pip install zstandard`."
+            )
+
+        self.name = name
+        self.level = level
+
+    @property
+    def extension(self) -> str:
+        return CODEC_EXTENSIONS[self.name]
+
+    def __str__(self) -> str:
+        return self.name if self.name == "none" else f"{self.name}:{self.level}"
+
+    @property
+    def can_store(self) -> bool:
+        """Whether a stream of this codec can store incompressible data without
+        compressing it. xz streams cannot store data cheaply, and `none` always does."""
+
+        return self.name in ("gzip", "zstd")
+
+    def open_stored(self, fileobj: typing.IO):
+        """Like `open`, but storing the data as it is in a gzip member or zstd frame
+        that standard tools decompress as part of a stream of this codec."""
+
+        if self.name == "zstd":
+            return ZstdStoreWriter(fileobj)
+
+        return Codec(self.name, 0).open(fileobj)
+
+    def open_segmented(self, fileobj: typing.IO, jobs: int = 1):
+        """Like `open`, but returning a `SegmentedWriter` if the codec can store
+        incompressible data without compressing it."""
+
+        if not self.can_store:
+            return self.open(fileobj, jobs)
+
+        return SegmentedWriter(fileobj, self, jobs)
+
+    def open(self, fileobj: typing.IO, jobs: int = 1):
+        """Returns a writable file-like object compressing into `fileobj`. Closing
+        it finishes the compressed stream but leaves `fileobj` open."""
+
+        if self.name == "gzip":
+            if jobs != 1:
+                return ParallelGzipWriter(fileobj, jobs, self.level)
+
+            # A fixed timestamp & no file name keep the gzip header reproducible
+            return gzip.GzipFile(
+                filename="",
+                mode="wb",
+                compresslevel=self.level,
+                fileobj=fileobj,
+                mtime=0,
+            )
+
+        if self.name == "zstd":
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, threads=get_worker_count(jobs) if jobs != 1 else 0
+            )
+            return compressor.stream_writer(fileobj, closefd=False)
+
+        if self.name == "xz":
+            return lzma.LZMAFile(fileobj, mode="wb", preset=self.level)
+
+        return _PassthroughWriter(fileobj)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "gzip":
+            return compress_gzip_member(data, self.level)
+
+        if self.name == "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+        if self.name == "xz":
+            return lzma.compress(data, preset=self.level)
+
+        return data
+
+    def get_size_bound(self, size: int, segments: int = 1) -> int:
+        """Returns the largest that `size` bytes can be once compressed, however
+        incompressible they are, when written as `segments` separate streams (e.g.
+        by a `SegmentedWriter`)."""
+
+        if self.name == "none":
+            return size
+
+        # Incompressible input is stored in blocks with a few bytes of header each,
+        # and every gzip member, zstd frame or xz stream has its own header & trailer
+        return size + size // 256 + segments * SEGMENT_OVERHEAD
+
+
+def parse_codec(spec: str) -> Codec:
+    """Parses a `--compression` value such as `gzip`, `gzip:6` or `zstd:19`."""
+
+    name, _, level = spec.strip().lower().partition(":")
+    if name in ("store", "off"):
+        name = "none"
+
+    if level and not level.isdigit():
+        raise ValueError(f"Invalid compression level `{level}`.")
+
+    return Codec(name, int(level) if level else None)
+
+
+def estimate_total_time(
+    codec: Codec,
+    size: int,
+    sample: bytes,
+    throughput: float,
+    jobs: int,
+    streaming: bool,
+) -> float:
+    """Estimates the time needed to compress and upload `size` bytes with `codec`,
+    extrapolating from the time taken to compress `sample`."""
+
+    start = time.perf_counter()
+    compressed = codec.compress(sample)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+
+    ratio = len(compressed) / max(len(sample), 1)
+
+    # The store-only codec is limited by disk reads rather than the CPU
+    if codec.name == "none":
+        compression_time = 0.0
+    else:
+        workers = 1 if codec.name == "xz" else get_worker_count(jobs)
+        compression_time = size * elapsed / len(sample) / workers
+
+    upload_time = size * ratio / throughput
+
+    # When streaming, compression and upload overlap rather than add up
+    if streaming:
+        return max(compression_time, upload_time)
+
+    return compression_time + upload_time
+
+
+def choose_codec(
+    size: int,
+    sample: bytes,
+    throughput: float | None,
+    jobs: int = 1,
+    streaming: bool = False,
+) -> Codec:
+    """Picks the candidate setting that minimises the estimated compress-plus-upload
+    time for a submission of `size` bytes, given a sample of its contents."""
+
+    if not sample:
+        return Codec("gzip")
+
+    throughput = throughput or DEFAULT_UPLOAD_THROUGHPUT
+    zstd_available = is_zstd_available()
+
+    best_codec, best_time = None, float("inf")
+    for spec in AUTO_CANDIDATES:
+        if spec.startswith("zstd") and not zstd_available:
+            continue
+
+        codec = parse_codec(spec)
+        total_time = estimate_total_time(
+            codec, size, sample, throughput, jobs, streaming
+        )
+
+        if total_time < best_time:
+            best_codec, best_time = codec, total_time
+
+    return best_codec or Codec("gzip")
@@ -1,77 +1,135 @@
-import json
-import os
-import shutil
-from typing import Any
-
-import typer
-
-from doxa_cli.constants import CONFIG_DIRECTORY, CONFIG_PATH, __short_version__
-from doxa_cli.errors import show_error
-
-DEFAULT_PROFILE = "default"
-
-
-class Config:
-    config: dict[str, Any]
-    profile: str
-
-    def __init__(self) -> None:
-        self.config = {}
-        self.profile = DEFAULT_PROFILE
-
-    def _generate_fresh_config(self):
-        return {"version": __short_version__, "profiles": {DEFAULT_PROFILE: {}}}
-
-    def _load(self) -> None:
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                self.config = json.load(f)
-                if self.config.get("version") != __short_version__:
-                    raise ValueError
-
-                self.profile = self.config.get("profile", DEFAULT_PROFILE)
-                assert self.profile in self.config.get("profiles", {})
-        except (json.JSONDecodeError, ValueError):
-            self.clear()  # clear invalid configuration files
-            self.config = self._generate_fresh_config()
-        except FileNotFoundError:
-            self.config = self._generate_fresh_config()
-        except OSError:
-            show_error(
-                f"\nThe DOXA CLI configuration file at `{CONFIG_PATH}` could not be read properly. If this location is not readable, you may specify an alternative configuration directory by setting the `DOXA_CONFIG_DIRECTORY` environment variable."
-            )
-            raise typer.Exit(1)
-
-    def get(self, key: str, default=None):
-        if not self.config:
-            self._load()
-
-        return self.config["profiles"][self.profile].get(key, default)
-
-    def update(self, values: dict[str, Any]):
-        if not self.config:
-            self._load()
-
-        self.config["profiles"][self.profile].update(values)
-
-        try:
-            os.makedirs(CONFIG_DIRECTORY, exist_ok=True)
-            with open(CONFIG_PATH, "w") as f:
-                json.dump(self.config, f, default=str)
-        except OSError:
-            show_error(
-                f"\nThe DOXA CLI configuration file at `{CONFIG_PATH}` could not be written properly. If this location is not writable, you may specify an alternative configuration directory by setting the `DOXA_CONFIG_DIRECTORY` environment variable."
-            )
-            raise typer.Exit(1)
-
-    def clear(self):
-        try:
-            shutil.rmtree(CONFIG_DIRECTORY)
-        except:
-            show_error(
-                f"\nThe DOXA CLI was unable to reset its configuration.\n\nPlease manually delete the file at the following path: {CONFIG_PATH}\n\n",
-            )
-            raise typer.Exit(1)
-
-
-CONFIG = Config()
+import json
+import os
+import shutil
+import tempfile
+from typing import Any
+
+from doxa_cli.constants import CONFIG_DIRECTORY, CONFIG_PATH, __short_version__
+from doxa_cli.errors import ConfigError
+from doxa_cli.locking import FileLock
+
+DEFAULT_PROFILE = "default"
+
+CONFIG_LOCK_PATH = f"{CONFIG_PATH}.lock"
+
+
+class Config:
+    """The configuration file, read once per process and cached in memory.
+
+    Many CLI processes may use the same configuration file at once, so changes are
+    made while holding an advisory lock, against the latest contents of the file,
+    and written to a temporary file which then atomically replaces the original.
+    Readers therefore never see a partially written file."""
+
+    config: dict[str, Any]
+    profile: str
+
+    def __init__(self) -> None:
+        self.config = {}
+        self.profile = DEFAULT_PROFILE
+
+    def _generate_fresh_config(self):
+        return {"version": __short_version__, "profiles": {DEFAULT_PROFILE: {}}}
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                config = json.load(f)
+        except (json.JSONDecodeError, ValueError, FileNotFoundError):
+            # Invalid configuration files are replaced by the next write
+            return self._generate_fresh_config()
+        except OSError:
+            raise ConfigError(
+                f"\nThe DOXA CLI configuration file at `{CONFIG_PATH}` could not be read properly. If this location is not readable, you may specify an alternative configuration directory by setting the `DOXA_CONFIG_DIRECTORY` environment variable."
+            )
+
+        if (
+            not isinstance(config, dict)
+            or config.get("version") != __short_version__
+            or not isinstance(config.get("profiles"), dict)
+            or config.get("profile", DEFAULT_PROFILE) not in config["profiles"]
+        ):
+            return self._generate_fresh_config()
+
+        return config
+
+    def _write(self, config: dict[str, Any]) -> None:
+        data = json.dumps(config, default=str)
+
+        os.makedirs(CONFIG_DIRECTORY, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(
+            dir=CONFIG_DIRECTORY, prefix=".config-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temporary_path, CONFIG_PATH)
+        except BaseException:
+            try:
+                os.unlink(temporary_path)
+            except OSError:
+                pass
+            raise
+
+        # Keep the cached copy exactly as it was written, e.g. with dates as strings
+        self.config = json.loads(data)
+
+    def _load(self) -> None:
+        self.config = self._read()
+        self.profile = self.config.get("profile", DEFAULT_PROFILE)
+
+    def reload(self) -> None:
+        """Discards the cached configuration, e.g. after another process changed it."""
+
+        self._load()
+
+    def get(self, key: str, default=None):
+        if not self.config:
+            self._load()
+
+        return self.config["profiles"][self.profile].get(key, default)
+
+    def compare_and_swap(
+        self, expected: dict[str, Any], values: dict[str, Any]
+    ) -> bool:
+        """Applies `values` only if every key in `expected` still has the expected value
+        in the configuration file, which may have been changed by another process since
+        it was loaded. Returns whether the update was applied; either way, the cached
+        configuration is brought up to date."""
+
+        try:
+            with FileLock(CONFIG_LOCK_PATH):
+                config = self._read()
+                self.profile = config.get("profile", DEFAULT_PROFILE)
+                profile = config["profiles"][self.profile]
+
+                if any(profile.get(key) != value for key, value in expected.items()):
+                    self.config = config
+                    return False
+
+                profile.update(values)
+                self._write(config)
+                return True
+        except OSError:
+            raise ConfigError(
+                f"\nThe DOXA CLI configuration file at `{CONFIG_PATH}` could not be written properly. If this location is not writable, you may specify an alternative configuration directory by setting the `DOXA_CONFIG_DIRECTORY` environment variable."
+            )
+
+    def update(self, values: dict[str, Any]):
+        self.compare_and_swap({}, values)
+
+    def clear(self):
+        try:
+            shutil.rmtree(CONFIG_DIRECTORY)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            raise ConfigError(
+                f"\nThe DOXA CLI was unable to reset its configuration.\n\nPlease manually delete the file at the following path: {CONFIG_PATH}\n\n",
+            )
+
+
+CONFIG = Config()
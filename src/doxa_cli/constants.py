@@ -1,108 +1,128 @@
-import os
-from pathlib import Path
-
-import typer
-from rich.theme import Theme
-
-__version_info__ = (0, 1, 8)
-__version__ = ".".join(map(str, __version_info__))
-__short_version__ = ".".join(map(str, __version_info__[:2]))
-
-IS_DEV = os.environ.get("DOXA_ENV") in ("DEV", "DEVELOPMENT")
-IS_DEBUG = IS_DEV or os.environ.get("DOXA_DEBUG") in ("true", "TRUE")
-
-DOXA_BASE_URL = os.environ.get(
-    "DOXA_BASE_URL", "http://localhost:4002/api" if IS_DEV else "https://api.doxaai.com"
-)
-
-DOXA_STORAGE_URL = (
-    "http://localhost:4002/storage" if IS_DEV else os.environ.get("DOXA_STORAGE_URL")
-)
-
-LOGIN_URL = f"{DOXA_BASE_URL}/oauth/device/authorize"
-TOKEN_URL = f"{DOXA_BASE_URL}/oauth/token"
-USER_URL = f"{DOXA_BASE_URL}/oauth/userinfo"
-UPLOAD_SLOT_URL = f"{DOXA_BASE_URL}/upload/slot"
-
-CLIENT_ID = "eb594ca3-023d-477f-823a-22e48f4e5235"
-SCOPE = "openid profile email agent"
-
-
-def get_config_directory():
-    directory = os.environ.get("DOXA_CONFIG_DIRECTORY")
-    if directory and os.path.isabs(directory):
-        return Path(directory)
-
-    return Path(typer.get_app_dir("doxa")) / __short_version__
-
-
-CONFIG_DIRECTORY = get_config_directory()
-CONFIG_PATH = os.path.join(CONFIG_DIRECTORY, "config.json")
-
-DOXA_YAML = "doxa.yaml"
-COMPETITION_KEY = "competition"
-ENVIRONMENT_KEY = "environment"
-
-EXCLUDED_FILES = {"doxa.yaml", "__pycache__", ".ipynb_checkpoints", ".DS_Store"}
-
-SPINNER = {
-    "interval": 80,
-    "frames": [
-        "▐⠂       ▌",
-        "▐⠈       ▌",
-        "▐ ⠂      ▌",
-        "▐ ⠠      ▌",
-        "▐  ⡀     ▌",
-        "▐  ⠠     ▌",
-        "▐   ⠂    ▌",
-        "▐   ⠈    ▌",
-        "▐    ⠂   ▌",
-        "▐    ⠠   ▌",
-        "▐     ⡀  ▌",
-        "▐     ⠠  ▌",
-        "▐      ⠂ ▌",
-        "▐      ⠈ ▌",
-        "▐       ⠂▌",
-        "▐       ⠠▌",
-        "▐       ⡀▌",
-        "▐      ⠠ ▌",
-        "▐      ⠂ ▌",
-        "▐     ⠈  ▌",
-        "▐     ⠂  ▌",
-        "▐    ⠠   ▌",
-        "▐    ⡀   ▌",
-        "▐   ⠠    ▌",
-        "▐   ⠂    ▌",
-        "▐  ⠈     ▌",
-        "▐  ⠂     ▌",
-        "▐ ⠠      ▌",
-        "▐ ⡀      ▌",
-        "▐⠠       ▌",
-    ],
-}
-
-BOUNCING_BAR = {
-    "interval": 80,
-    "frames": [
-        "[    ]",
-        "[   =]",
-        "[  ==]",
-        "[ ===]",
-        "[====]",
-        "[=== ]",
-        "[==  ]",
-        "[=   ]",
-    ],
-}
-
-theme = Theme(
-    {
-        "bar.pulse": "blue",
-        "bar.complete": "bold green",
-        "bar.finished": "bold green",
-        "progress.description": "bold white",
-        "progress.percentage": "bold white",
-        "progress.download": "white",
-        "progress.data.speed": "bold cyan",
-    }
-)
+import os
+from pathlib import Path
+
+import typer
+from rich.theme import Theme
+
+__version_info__ = (0, 1, 8)
+__version__ = ".".join(map(str, __version_info__))
+__short_version__ = ".".join(map(str, __version_info__[:2]))
+
+IS_DEV = os.environ.get("DOXA_ENV") in ("DEV", "DEVELOPMENT")
+IS_DEBUG = IS_DEV or os.environ.get("DOXA_DEBUG") in ("true", "TRUE")
+
+DOXA_BASE_URL = os.environ.get(
+    "DOXA_BASE_URL", "http://localhost:4002/api" if IS_DEV else "https://api.doxaai.com"
+)
+
+DOXA_STORAGE_URL = (
+    "http://localhost:4002/storage" if IS_DEV else os.environ.get("DOXA_STORAGE_URL")
+)
+
+LOGIN_URL = f"{DOXA_BASE_URL}/oauth/device/authorize"
+TOKEN_URL = f"{DOXA_BASE_URL}/oauth/token"
+USER_URL = f"{DOXA_BASE_URL}/oauth/userinfo"
+UPLOAD_SLOT_URL = f"{DOXA_BASE_URL}/upload/slot"
+UPLOAD_LIMITS_URL = f"{DOXA_BASE_URL}/upload/limits"
+
+
+def get_number_from_environment(name: str, default: float) -> float:
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return default
+
+
+# Access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_WINDOW = get_number_from_environment("DOXA_TOKEN_REFRESH_WINDOW", 300)
+
+# Timeouts (in seconds) for connecting to the DOXA AI platform & awaiting data from it
+CONNECT_TIMEOUT = get_number_from_environment("DOXA_CONNECT_TIMEOUT", 10)
+READ_TIMEOUT = get_number_from_environment("DOXA_READ_TIMEOUT", 120)
+
+# The number of times a failed connection or idempotent request is retried
+REQUEST_RETRIES = int(get_number_from_environment("DOXA_REQUEST_RETRIES", 3))
+
+CLIENT_ID = "eb594ca3-023d-477f-823a-22e48f4e5235"
+SCOPE = "openid profile email agent"
+
+
+def get_config_directory():
+    directory = os.environ.get("DOXA_CONFIG_DIRECTORY")
+    if directory and os.path.isabs(directory):
+        return Path(directory)
+
+    return Path(typer.get_app_dir("doxa")) / __short_version__
+
+
+CONFIG_DIRECTORY = get_config_directory()
+CONFIG_PATH = os.path.join(CONFIG_DIRECTORY, "config.json")
+
+DOXA_YAML = "doxa.yaml"
+COMPETITION_KEY = "competition"
+ENVIRONMENT_KEY = "environment"
+
+# Always excluded from submissions, using the same syntax as `.gitignore` files
+EXCLUDED_FILES = ("/doxa.yaml", "__pycache__/", ".ipynb_checkpoints/", ".DS_Store")
+
+SPINNER = {
+    "interval": 80,
+    "frames": [
+        "▐⠂       ▌",
+        "▐⠈       ▌",
+        "▐ ⠂      ▌",
+        "▐ ⠠      ▌",
+        "▐  ⡀     ▌",
+        "▐  ⠠     ▌",
+        "▐   ⠂    ▌",
+        "▐   ⠈    ▌",
+        "▐    ⠂   ▌",
+        "▐    ⠠   ▌",
+        "▐     ⡀  ▌",
+        "▐     ⠠  ▌",
+        "▐      ⠂ ▌",
+        "▐      ⠈ ▌",
+        "▐       ⠂▌",
+        "▐       ⠠▌",
+        "▐       ⡀▌",
+        "▐      ⠠ ▌",
+        "▐      ⠂ ▌",
+        "▐     ⠈  ▌",
+        "▐     ⠂  ▌",
+        "▐    ⠠   ▌",
+        "▐    ⡀   ▌",
+        "▐   ⠠    ▌",
+        "▐   ⠂    ▌",
+        "▐  ⠈     ▌",
+        "▐  ⠂     ▌",
+        "▐ ⠠      ▌",
+        "▐ ⡀      ▌",
+        "▐⠠       ▌",
+    ],
+}
+
+BOUNCING_BAR = {
+    "interval": 80,
+    "frames": [
+        "[    ]",
+        "[   =]",
+        "[  ==]",
+        "[ ===]",
+        "[====]",
+        "[=== ]",
+        "[==  ]",
+        "[=   ]",
+    ],
+}
+
+theme = Theme(
+    {
+        "bar.pulse": "blue",
+        "bar.complete": "bold green",
+        "bar.finished": "bold green",
+        "progress.description": "bold white",
+        "progress.percentage": "bold white",
+        "progress.download": "white",
+        "progress.data.speed": "bold cyan",
+    }
+)
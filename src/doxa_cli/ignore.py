@@ -0,0 +1,198 @@
+import os
+import re
+import typing
+
+from doxa_cli.constants import EXCLUDED_FILES
+
+IGNORE_FILE = ".doxaignore"
+
+
+def translate_glob(pattern: str) -> str:
+    """Translates a gitignore-style glob (without any leading or trailing slash) into
+    a regular expression, where `*` and `?` never match `/` and `**` matches any
+    number of directories."""
+
+    regex = ""
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            regex += "(?:.*/)?"
+            i += 3
+        elif (
+            pattern.startswith("**", i)
+            and i + 2 == n
+            and (i == 0 or pattern[i - 1] == "/")
+        ):
+            regex += ".*"
+            i += 2
+        elif c == "*":
+            regex += "[^/]*"
+            i += 1
+        elif c == "?":
+            regex += "[^/]"
+            i += 1
+        elif c == "[":
+            # Find the end of the character class, which may start with `!` or `]`
+            j = i + 1
+            if pattern[j : j + 1] in ("!", "^"):
+                j += 1
+            if pattern[j : j + 1] == "]":
+                j += 1
+
+            end = pattern.find("]", j)
+            if end == -1:
+                regex += re.escape(c)
+                i += 1
+                continue
+
+            negated = pattern[i + 1] in ("!", "^")
+            body = pattern[i + 2 if negated else i + 1 : end]
+            body = body.replace("\\", "\\\\").replace("[", "\\[")
+            regex += f"[{'^' if negated else ''}{body}]"
+            i = end + 1
+        elif c == "\\" and i + 1 < n:
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(c)
+            i += 1
+
+    return regex
+
+
+class IgnoreRule:
+    """A single compiled line of a `.doxaignore` file (or `ignore` entry in `doxa.yaml`),
+    following the semantics of `.gitignore` files."""
+
+    def __init__(self, pattern: str, base: str = "") -> None:
+        self.pattern = pattern
+        self.negated = False
+        self.directory_only = False
+
+        if pattern.startswith("!"):
+            self.negated = True
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+
+        if pattern.endswith("/"):
+            self.directory_only = True
+            pattern = pattern.rstrip("/")
+
+        # A pattern containing a slash is relative to the directory of its file,
+        # otherwise it matches a file or directory of that name at any depth
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+
+        prefix = re.escape(f"{base}/") if base else ""
+        if anchored:
+            self.regex = f"{prefix}{translate_glob(pattern)}"
+        else:
+            self.regex = f"{prefix}(?:.*/)?{translate_glob(pattern)}"
+
+        self.compiled = re.compile(f"^{self.regex}$", re.DOTALL)
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+
+        return self.compiled.match(path) is not None
+
+
+def parse_ignore_lines(lines: typing.Iterable[str], base: str = "") -> list[IgnoreRule]:
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip("\r")
+
+        # Trailing spaces are ignored unless escaped with a backslash
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+
+        if not line or line.startswith("#") or line in ("!", "/"):
+            continue
+
+        rules.append(IgnoreRule(line, base))
+
+    return rules
+
+
+class IgnoreSpec:
+    """An ordered list of ignore rules, where the last matching rule wins."""
+
+    def __init__(self, rules: list[IgnoreRule]) -> None:
+        self.rules = rules
+
+        # Without negated rules, any match means a path is ignored, so all of the
+        # patterns can be tested at once using a single combined regular expression
+        self._combined: tuple[re.Pattern, re.Pattern] | None = None
+        if not any(rule.negated for rule in rules):
+            self._combined = (
+                self._combine(rule for rule in rules if not rule.directory_only),
+                self._combine(rules),
+            )
+
+    @staticmethod
+    def _combine(rules: typing.Iterable[IgnoreRule]) -> re.Pattern:
+        alternatives = "|".join(f"(?:{rule.regex})" for rule in rules)
+        return re.compile(f"^(?:{alternatives or '(?!)'})$", re.DOTALL)
+
+    def extend(self, rules: list[IgnoreRule]) -> "IgnoreSpec":
+        return IgnoreSpec(self.rules + rules) if rules else self
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        if self._combined is not None:
+            return self._combined[is_dir].match(path) is not None
+
+        for rule in reversed(self.rules):
+            if rule.matches(path, is_dir):
+                return not rule.negated
+
+        return False
+
+
+def compile_ignore_spec(patterns: typing.Iterable[str] = ()) -> IgnoreSpec:
+    """Compiles the default exclusions followed by the `ignore` patterns of `doxa.yaml`."""
+
+    return IgnoreSpec(parse_ignore_lines([*EXCLUDED_FILES, *patterns]))
+
+
+def read_ignore_file(directory: str, base: str) -> list[IgnoreRule]:
+    try:
+        with open(os.path.join(directory, IGNORE_FILE), "r") as f:
+            return parse_ignore_lines(f, base)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return []
+
+
+def walk_submission(
+    directory: str, spec: IgnoreSpec
+) -> typing.Iterator[tuple[os.DirEntry, str]]:
+    """Yields each directory and regular file to include in the submission, together
+    with its archive name, in a depth-first walk. Excluded directories are pruned
+    without being descended into, and `.doxaignore` files add further rules for the
+    directory containing them. Symbolic links and other special files are skipped."""
+
+    stack = [(directory, "", spec.extend(read_ignore_file(directory, "")))]
+    while stack:
+        path, arcname, spec = stack.pop()
+
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        subdirectories = []
+        for entry in entries:
+            name = f"{arcname}/{entry.name}" if arcname else entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                if not spec.is_ignored(name, True):
+                    yield entry, name
+                    subdirectories.append((entry.path, name))
+            elif entry.is_file(follow_symlinks=False):
+                if not spec.is_ignored(name, False):
+                    yield entry, name
+
+        # Push in reverse, so that subdirectories are visited in alphabetical order
+        for subdirectory, name in reversed(subdirectories):
+            rules = read_ignore_file(subdirectory, name)
+            stack.append((subdirectory, name, spec.extend(rules)))
@@ -0,0 +1,75 @@
+import importlib
+import typing
+
+import click
+import typer
+from typer.core import TyperGroup
+from typer.models import CommandInfo
+
+
+class LazyCommand(typing.NamedTuple):
+    """A subcommand whose module is only imported when the subcommand is run."""
+
+    module: str
+    attribute: str
+    help: str
+    hidden: bool = False
+    options: dict[str, typing.Any] = {}
+
+
+class LazyTyperGroup(TyperGroup):
+    """A command group that imports the module defining a subcommand (and with it,
+    dependencies such as `requests`) only when that subcommand is invoked. Listing
+    the subcommands, e.g. for `--help` or shell completion, uses the summary in
+    `lazy_commands` and imports nothing."""
+
+    lazy_commands: dict[str, LazyCommand] = {}
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._loaded: dict[str, click.Command] = {}
+        self._resolving = False
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_commands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+
+        if self._resolving:
+            return self.load_command(cmd_name)
+
+        if cmd_name in self._loaded:
+            return self._loaded[cmd_name]
+
+        lazy_command = self.lazy_commands[cmd_name]
+        return click.Command(
+            cmd_name, help=lazy_command.help, hidden=lazy_command.hidden
+        )
+
+    def resolve_command(self, ctx: click.Context, args: list[str]):
+        # Only the subcommand actually being run is imported
+        self._resolving = True
+        try:
+            return super().resolve_command(ctx, args)
+        finally:
+            self._resolving = False
+
+    def load_command(self, cmd_name: str) -> click.Command:
+        if cmd_name not in self._loaded:
+            lazy_command = self.lazy_commands[cmd_name]
+            module = importlib.import_module(lazy_command.module)
+
+            self._loaded[cmd_name] = typer.main.get_command_from_info(
+                CommandInfo(
+                    name=cmd_name,
+                    callback=getattr(module, lazy_command.attribute),
+                    hidden=lazy_command.hidden,
+                    **lazy_command.options,
+                ),
+                pretty_exceptions_short=True,
+                rich_markup_mode=self.rich_markup_mode,
+            )
+
+        return self._loaded[cmd_name]
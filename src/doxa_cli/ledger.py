@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import typing
+
+from doxa_cli.constants import CONFIG_DIRECTORY
+from doxa_cli.locking import FileLock
+from doxa_cli.scanner import SubmissionScan
+
+LEDGER_PATH = os.path.join(CONFIG_DIRECTORY, "ledger.json")
+
+# Only the most recent uploads are remembered
+LEDGER_SIZE = 100
+
+
+def get_metadata_digest(metadata: dict[str, typing.Any]) -> str:
+    # `doxa.yaml` is not part of the archive, so its metadata is recorded separately
+    data = json.dumps(metadata, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def get_layout_digest(scan: SubmissionScan) -> str:
+    # The names & sizes of entries are part of the archive, so they tell before it is
+    # built whether a submission may be identical to a recorded upload
+    data = json.dumps([(entry.arcname, entry.size) for entry in scan.entries])
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class UploadLedger:
+    """A local record of the submissions uploaded to each competition & environment,
+    identified by the digest of their (reproducible) archives, so that an identical
+    resubmission can be detected before an upload slot is requested."""
+
+    def __init__(self, path: str = LEDGER_PATH) -> None:
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def _load(self) -> list[dict[str, typing.Any]]:
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)["uploads"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+        return entries if isinstance(entries, list) else []
+
+    def find(
+        self,
+        digest: str,
+        competition: str,
+        environment: str | None,
+        metadata: dict[str, typing.Any],
+    ) -> dict[str, typing.Any] | None:
+        """Returns the record of the last upload of this exact submission, if any."""
+
+        metadata_digest = get_metadata_digest(metadata)
+        for entry in reversed(self._load()):
+            if (
+                entry.get("sha256") == digest
+                and entry.get("competition") == competition
+                and entry.get("environment") == environment
+                and entry.get("metadata_sha256") == metadata_digest
+            ):
+                return entry
+
+        return None
+
+    def has_layout(
+        self,
+        layout_digest: str,
+        competition: str,
+        environment: str | None,
+        metadata: dict[str, typing.Any],
+    ) -> bool:
+        """Returns whether a submission with this layout may have been uploaded, in
+        which case `find` may find it once its archive has been built."""
+
+        metadata_digest = get_metadata_digest(metadata)
+        return any(
+            entry.get("layout_sha256") in (None, layout_digest)
+            and entry.get("competition") == competition
+            and entry.get("environment") == environment
+            and entry.get("metadata_sha256") == metadata_digest
+            for entry in self._load()
+        )
+
+    def record(
+        self,
+        digest: str,
+        competition: str,
+        environment: str | None,
+        metadata: dict[str, typing.Any],
+        directory: str,
+        size: int,
+        layout_digest: str | None = None,
+    ) -> None:
+        entry = {
+            "sha256": digest,
+            "layout_sha256": layout_digest,
+            "competition": competition,
+            "environment": environment,
+            "metadata_sha256": get_metadata_digest(metadata),
+            "directory": directory,
+            "size": size,
+            "uploaded_at": time.time(),
+        }
+
+        # Uploads running at once each add their entry to the latest ledger, which is
+        # written to a temporary file and renamed, so that an interruption never
+        # leaves a truncated ledger behind
+        directory_path = os.path.dirname(self.path)
+        os.makedirs(directory_path, exist_ok=True)
+        with FileLock(self.lock_path):
+            entries = self._load()
+            entries.append(entry)
+
+            fd, temporary_path = tempfile.mkstemp(
+                dir=directory_path, prefix=".ledger-", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"uploads": entries[-LEDGER_SIZE:]}, f)
+                os.replace(temporary_path, self.path)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
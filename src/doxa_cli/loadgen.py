@@ -0,0 +1,206 @@
+"""Drives many concurrent uploads of a submission against a DOXA API, normally the
+local stand-in, and reports the throughput achieved & the latency percentiles of
+each upload (requesting an upload slot, then uploading the archive), e.g.
+
+    DOXA_ENV=DEV python -m doxa_cli.loadgen path/to/agent --uploads 200 \\
+        --concurrency 32 --serve --latency 0.05 --error-rate 0.01
+
+With `--serve`, a stand-in server with the given faults is started at the address
+of `DOXA_BASE_URL`; otherwise, an already running server is used."""
+
+import asyncio
+import collections
+import json
+import math
+import os
+import tempfile
+import time
+import typing
+import urllib.parse
+
+import requests
+import typer
+from typing_extensions import Annotated
+
+from doxa_cli.client import AsyncDoxaClient
+from doxa_cli.compression import parse_codec
+from doxa_cli.constants import DOXA_BASE_URL, IS_DEV
+from doxa_cli.errors import DoxaError, show_error
+from doxa_cli.scanner import scan_submission
+from doxa_cli.server import StandInServer
+from doxa_cli.submission import compress_submission_directory, read_submission_config
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    """Returns the nearest-rank percentile of a sorted list of values."""
+
+    rank = math.ceil(percentile / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+async def run_uploads(
+    client: AsyncDoxaClient,
+    archive_path: str,
+    size: int,
+    competition: str,
+    environment: str | None,
+    metadata: dict[str, typing.Any],
+    compression: str,
+    uploads: int,
+    concurrency: int,
+) -> tuple[list[float], collections.Counter[str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: collections.Counter[str] = collections.Counter()
+
+    async def upload() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                upload_slot = await client.get_upload_slot(
+                    competition, environment, metadata, size, compression
+                )
+                await client.upload_archive(upload_slot, archive_path)
+            except (DoxaError, requests.RequestException, ValueError) as e:
+                errors[getattr(e, "doxa_error_code", None) or type(e).__name__] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(upload() for _ in range(uploads)))
+
+    return sorted(latencies), errors
+
+
+def load(
+    directory: Annotated[str, typer.Argument(help="The submission to upload.")],
+    uploads: Annotated[int, typer.Option(help="The number of uploads to make.")] = 100,
+    concurrency: Annotated[
+        int, typer.Option(help="The number of uploads in progress at once.")
+    ] = 16,
+    compression: Annotated[
+        str, typer.Option(help="The compression codec of the archive.")
+    ] = "gzip",
+    token: Annotated[
+        typing.Optional[str],
+        typer.Option(help="The access token (the stored credentials by default)."),
+    ] = None,
+    serve: Annotated[
+        bool, typer.Option(help="Start a stand-in server at DOXA_BASE_URL.")
+    ] = False,
+    stream_rate: Annotated[
+        typing.Optional[int],
+        typer.Option(help="The maximum rate (bytes/s) of each upload connection."),
+    ] = None,
+    bandwidth: Annotated[
+        typing.Optional[int],
+        typer.Option(help="The maximum total rate (bytes/s) of all uploads."),
+    ] = None,
+    latency: Annotated[
+        float, typer.Option(help="The delay (in seconds) added to every request.")
+    ] = 0.0,
+    error_rate: Annotated[
+        float, typer.Option(help="The fraction of requests that fail with a 503.")
+    ] = 0.0,
+    rate_limit: Annotated[
+        typing.Optional[float],
+        typer.Option(help="The number of requests per second allowed before a 429."),
+    ] = None,
+):
+    """Load-test a DOXA API with concurrent uploads."""
+
+    # Never load-test the live platform by accident
+    if not IS_DEV and "DOXA_BASE_URL" not in os.environ:
+        show_error("Set DOXA_ENV=DEV or DOXA_BASE_URL to choose the server to test.")
+        raise typer.Exit(1)
+
+    server = None
+    if serve:
+        url = urllib.parse.urlsplit(DOXA_BASE_URL)
+        server = StandInServer(
+            url.hostname or "127.0.0.1",
+            url.port or 80,
+            stream_rate=stream_rate,
+            bandwidth=bandwidth,
+            latency=latency,
+            error_rate=error_rate,
+            rate_limit=rate_limit,
+        )
+        server.start()
+
+        # The stand-in server accepts any access token
+        token = token or "load-test"
+
+    directory = os.path.abspath(directory)
+    codec = parse_codec(compression)
+
+    try:
+        competition, environment, metadata, ignore_files, _ = read_submission_config(
+            directory, None, None
+        )
+    except DoxaError as e:
+        show_error(getattr(e, "message", "The submission configuration is invalid."))
+        raise typer.Exit(1)
+
+    # Every upload sends the same archive, so that only the API & transfer are tested
+    f = tempfile.NamedTemporaryFile(suffix=codec.extension, delete=False, mode="w+b")
+    compress_submission_directory(
+        f, scan_submission(directory, ignore_files), False, codec, jobs=0
+    )
+    size = os.path.getsize(f.name)
+
+    async def main() -> tuple[list[float], collections.Counter[str]]:
+        async with AsyncDoxaClient(
+            access_token=token, max_connections=concurrency
+        ) as client:
+            return await run_uploads(
+                client,
+                f.name,
+                size,
+                competition,
+                environment,
+                metadata,
+                codec.name,
+                uploads,
+                concurrency,
+            )
+
+    start = time.perf_counter()
+    try:
+        latencies, errors = asyncio.run(main())
+    finally:
+        elapsed = time.perf_counter() - start
+        os.unlink(f.name)
+        if server is not None:
+            server.stop()
+
+    report: dict[str, typing.Any] = {
+        "uploads": uploads,
+        "concurrency": concurrency,
+        "archive_bytes": size,
+        "succeeded": len(latencies),
+        "failed": sum(errors.values()),
+        "errors": dict(errors),
+        "seconds": round(elapsed, 3),
+        "uploads_per_second": round(len(latencies) / elapsed, 2),
+        "throughput_mb_s": round(len(latencies) * size / elapsed / 1000**2, 2),
+    }
+
+    if latencies:
+        report["latency_ms"] = {
+            f"p{percentile}": round(get_percentile(latencies, percentile) * 1000, 1)
+            for percentile in PERCENTILES
+        }
+        report["latency_ms"]["max"] = round(latencies[-1] * 1000, 1)
+
+    if server is not None:
+        report["server_responses"] = {
+            str(status): count for status, count in sorted(server.responses.items())
+        }
+
+    typer.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(load)
@@ -0,0 +1,56 @@
+import os
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(fd: int) -> None:
+        while True:
+            try:
+                # Retries for up to 10 seconds before raising an error
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(fd: int) -> None:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """An exclusive advisory lock shared between processes, held on `path` (which is
+    created if needed) for the duration of a `with` block."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd: int | None = None
+
+    def __enter__(self) -> "FileLock":
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            _lock_file(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self._fd is None:
+            return
+
+        try:
+            _unlock_file(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,100 @@
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import tarfile
+import typing
+
+from doxa_cli.compression import ARCHIVE_MTIME, Codec, get_worker_count
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+BLOBS_DIRECTORY = "blobs"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str, callback: typing.Callable[[int], None] | None = None) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+            if callback:
+                callback(len(block))
+
+    return digest.hexdigest()
+
+
+def build_manifest(
+    directory: str,
+    files: list[tuple[str, int]],
+    jobs: int = 1,
+    callback: typing.Callable[[int], None] | None = None,
+) -> dict[str, typing.Any]:
+    """Hashes every file in the submission, producing a manifest mapping the relative
+    path of each file to the SHA-256 digest of its contents. `hashlib` releases the
+    GIL while hashing, so files are hashed on a pool of threads."""
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=get_worker_count(jobs), thread_name_prefix="doxa-hash"
+    ) as executor:
+        digests = executor.map(lambda file: hash_file(file[0], callback), files)
+
+        entries = [
+            {
+                "path": os.path.relpath(path, directory).replace(os.sep, "/"),
+                "size": size,
+                "sha256": digest,
+            }
+            for (path, size), digest in zip(files, digests)
+        ]
+
+    return {"version": MANIFEST_VERSION, "files": entries}
+
+
+def _normalise_tarinfo(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = "root"
+    tarinfo.mode = 0o777
+    tarinfo.mtime = ARCHIVE_MTIME
+    return tarinfo
+
+
+def write_delta_archive(
+    f: typing.IO,
+    directory: str,
+    manifest: dict[str, typing.Any],
+    missing: typing.Iterable[str],
+    codec: Codec,
+    jobs: int = 1,
+) -> None:
+    """Writes an archive containing the manifest and only the file contents (blobs)
+    that the platform does not already have, stored as `blobs/{sha256}`."""
+
+    missing = set(missing)
+    output = codec.open(f, jobs)
+
+    try:
+        with tarfile.open(fileobj=output, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            data = json.dumps(manifest).encode()
+            tarinfo = _normalise_tarinfo(tarfile.TarInfo(MANIFEST_NAME))
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+
+            for entry in manifest["files"]:
+                digest = entry["sha256"]
+                if digest not in missing:
+                    continue
+
+                missing.discard(digest)  # identical files are only sent once
+                tar.add(
+                    os.path.join(directory, *entry["path"].split("/")),
+                    arcname=f"{BLOBS_DIRECTORY}/{digest}",
+                    filter=_normalise_tarinfo,
+                )
+    finally:
+        try:
+            output.close()
+        finally:
+            f.close()
@@ -0,0 +1,236 @@
+"""Controls how commands report their progress and results. On an interactive
+terminal, commands draw rich progress bars and spinners. When the output is not a
+terminal (e.g. in CI), progress is instead printed as occasional plain lines, and
+with `doxa --output json`, each command prints only JSON lines: throttled progress
+events followed by a final result object, e.g.
+
+    {"event": "progress", "phase": "upload", "completed": 1048576, "total": 4194304, ...}
+    {"event": "result", "command": "upload", "ok": false, "exit_code": 1,
+     "error": {"code": "COMPETITION_CLOSED", "message": "..."}, ...}
+"""
+
+import enum
+import json
+import sys
+import threading
+import time
+import typing
+
+# Progress is reported at most this often (in seconds) for each phase, and only
+# once at least this fraction of the phase has been completed since last reported
+PROGRESS_INTERVAL = {"text": 5.0, "json": 1.0}
+PROGRESS_STEP = {"text": 0.1, "json": 0.01}
+
+
+class OutputFormat(str, enum.Enum):
+    text = "text"
+    json = "json"
+
+
+_format = OutputFormat.text
+_result: dict[str, typing.Any] = {}
+_error: dict[str, typing.Any] | None = None
+_lock = threading.Lock()
+
+
+def set_output_format(output_format: OutputFormat) -> None:
+    global _format
+    _format = output_format
+
+
+def is_json_output() -> bool:
+    return _format == OutputFormat.json
+
+
+def is_interactive() -> bool:
+    """Whether progress bars & spinners should be drawn."""
+
+    return _format == OutputFormat.text and sys.stdout.isatty()
+
+
+def emit(event: str, **fields: typing.Any) -> None:
+    """Prints an event as a line of JSON, if JSON output is enabled."""
+
+    if not is_json_output():
+        return
+
+    line = json.dumps({"event": event, **fields}, default=str)
+    with _lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def make_console(**kwargs: typing.Any):
+    """Returns a rich console for human-readable output, which is silenced when
+    printing JSON."""
+
+    from rich.console import Console
+
+    return Console(quiet=is_json_output(), **kwargs)
+
+
+def set_result(**fields: typing.Any) -> None:
+    """Adds details of the outcome of the command to its final result object."""
+
+    _result.update(fields)
+
+
+def record_error(code: str | None, message: str | None) -> None:
+    """Records why the command failed. The first (most specific) error is kept."""
+
+    global _error
+    if _error is None:
+        _error = {"code": code or "ERROR", "message": (message or "").strip()}
+
+
+def finish(command: str | None, exit_code: int) -> None:
+    """Prints the final result object of the command when printing JSON."""
+
+    ok = exit_code == 0 and _error is None
+    emit(
+        "result",
+        command=command,
+        ok=ok,
+        exit_code=exit_code,
+        **_result,
+        error=_error,
+    )
+
+
+class ProgressTask:
+    def __init__(
+        self,
+        description: str,
+        total: float | None,
+        completed: float,
+        fields: dict[str, typing.Any],
+    ) -> None:
+        self.description = description.strip()
+        self.total = total
+        self.completed = completed
+        self.fields = fields
+        self.started_at = self.reported_at = time.monotonic()
+        self.reported = completed
+
+
+class ProgressEvents:
+    """A replacement for a rich `Progress` (supporting `add_task`, `update` and
+    `advance`) that reports progress occasionally rather than redrawing a bar on
+    every update, as JSON events or plain lines depending on the output format.
+    Extra fields of a task, e.g. `phase`, are included in its events."""
+
+    def __init__(self, disable: bool = False) -> None:
+        self.disable = disable
+        self.interval = PROGRESS_INTERVAL[_format.value]
+        self.step = PROGRESS_STEP[_format.value]
+        self.tasks: list[ProgressTask] = []
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "ProgressEvents":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        for task in self.tasks:
+            if task.completed != task.reported and task.fields.get("visible", True):
+                self.report(task)
+
+    def add_task(
+        self,
+        description: str,
+        total: float | None = None,
+        completed: float = 0,
+        **fields: typing.Any,
+    ) -> int:
+        with self.lock:
+            self.tasks.append(ProgressTask(description, total, completed, fields))
+            return len(self.tasks) - 1
+
+    def update(
+        self,
+        task_id: int,
+        total: float | None = None,
+        completed: float | None = None,
+        advance: float | None = None,
+        description: str | None = None,
+        **fields: typing.Any,
+    ) -> None:
+        task = self.tasks[task_id]
+        with self.lock:
+            task.fields.update(fields)
+            if description is not None:
+                task.description = description.strip()
+            if total is not None:
+                task.total = total
+            if completed is not None:
+                task.completed = completed
+            if advance is not None:
+                task.completed += advance
+
+            now = time.monotonic()
+            if now - task.reported_at < self.interval:
+                return
+
+            if task.completed - task.reported < self.step * (task.total or 0):
+                return
+
+            task.reported_at = now
+
+        self.report(task)
+
+    def advance(self, task_id: int, advance: float = 1) -> None:
+        self.update(task_id, advance=advance)
+
+    def report(self, task: ProgressTask) -> None:
+        task.reported = task.completed
+        if self.disable:
+            return
+
+        if is_json_output():
+            emit(
+                "progress",
+                **{
+                    key: value for key, value in task.fields.items() if key != "visible"
+                },
+                completed=task.completed,
+                total=task.total,
+                elapsed=round(time.monotonic() - task.started_at, 3),
+            )
+        elif task.total:
+            print(
+                f"{task.description}: {task.completed / task.total:.0%} ({int(task.completed):,} of {int(task.total):,} bytes)",
+                flush=True,
+            )
+        else:
+            print(f"{task.description}: {int(task.completed):,} bytes", flush=True)
+
+
+class PlainSpinner:
+    """A replacement for a `Halo` spinner that only prints its final message."""
+
+    def __init__(self, text: str = "") -> None:
+        self.console = make_console()
+        self.console.print(text)
+
+    def __enter__(self) -> "PlainSpinner":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        pass
+
+    def succeed(self, text: str) -> None:
+        self.console.print(f"✔ {text}", style="green")
+
+    def fail(self, text: str) -> None:
+        self.console.print(f"✖ {text}", style="red")
+
+
+def make_spinner(text: str, spinner: dict[str, typing.Any] | str | None = None):
+    """Returns a `Halo` spinner on an interactive terminal, or otherwise a stand-in
+    that does not animate."""
+
+    if not is_interactive():
+        return PlainSpinner(text)
+
+    from halo import Halo
+
+    return Halo(text=text, spinner=spinner, enabled=True)
@@ -0,0 +1,144 @@
+"""Paces uploads to a maximum rate and controls the size of the reads & sends used
+to upload a submission. The settings apply to every upload in the process, so
+that concurrent uploads (e.g. of chunks or of a batch) share the same cap."""
+
+import re
+import threading
+import time
+import typing
+
+# The size of the reads from the archive being uploaded
+DEFAULT_READ_BUFFER_SIZE = 256 * 1024
+
+# The size of the blocks in which request bodies are sent over the connection
+DEFAULT_SEND_BUFFER_SIZE = 256 * 1024
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_byte_size(value: typing.Any) -> int:
+    """Parses a number of bytes with an optional K, M or G suffix, e.g. `10M`."""
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        size = value
+    else:
+        match = re.fullmatch(
+            r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?\s*", str(value), re.IGNORECASE
+        )
+        if match is None:
+            raise ValueError(f"`{value}` is not a valid size, e.g. 512K or 10M.")
+
+        size = int(float(match[1]) * SIZE_UNITS[match[2].upper()])
+
+    if size <= 0:
+        raise ValueError(f"`{value}` must be greater than zero.")
+
+    return size
+
+
+class TokenBucket:
+    """Allows `rate` bytes per second on average, in bursts of up to `capacity`
+    bytes. Consuming more tokens than are available blocks until they have been
+    replenished, so the bucket may be shared by several threads."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate / 10
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+            # Tokens may be borrowed, with the debt repaid by waiting
+            self.tokens -= amount
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PacedReader:
+    """Wraps a file-like request body, e.g. a `MultipartEncoderMonitor`, so that it
+    is read (and so sent) no faster than the upload rate allows."""
+
+    def __init__(self, fileobj: typing.Any, bucket: TokenBucket) -> None:
+        self.fileobj = fileobj
+        self.bucket = bucket
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.bucket.consume(len(data))
+        return data
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # e.g. `len`, `tell` & `seek`, which are used to send & retry the body
+        return getattr(self.fileobj, name)
+
+
+_bucket: TokenBucket | None = None
+_read_buffer_size = DEFAULT_READ_BUFFER_SIZE
+_send_buffer_size = DEFAULT_SEND_BUFFER_SIZE
+
+
+def configure(
+    max_rate: int | None = None,
+    read_buffer_size: int | None = None,
+    send_buffer_size: int | None = None,
+) -> None:
+    """Sets the maximum upload rate (in bytes per second) and buffer sizes."""
+
+    global _bucket, _read_buffer_size, _send_buffer_size
+
+    _read_buffer_size = read_buffer_size or DEFAULT_READ_BUFFER_SIZE
+    _send_buffer_size = send_buffer_size or DEFAULT_SEND_BUFFER_SIZE
+
+    # A burst must fit at least one send, or every send would wait
+    _bucket = (
+        TokenBucket(max_rate, max(max_rate / 10, _send_buffer_size))
+        if max_rate
+        else None
+    )
+
+
+def get_read_buffer_size() -> int:
+    return _read_buffer_size
+
+
+def get_send_buffer_size() -> int:
+    return _send_buffer_size
+
+
+def pace(amount: int) -> None:
+    """Waits until `amount` bytes may be sent at the maximum upload rate."""
+
+    if _bucket is not None:
+        _bucket.consume(amount)
+
+
+def pace_body(body: typing.Any) -> typing.Any:
+    """Returns a file-like request body paced to the maximum upload rate."""
+
+    return body if _bucket is None else PacedReader(body, _bucket)
+
+
+def pace_chunks(chunks: typing.Iterable[bytes]) -> typing.Iterable[bytes]:
+    """Paces a request body sent with chunked transfer encoding."""
+
+    if _bucket is None:
+        return chunks
+
+    bucket = _bucket
+
+    def paced() -> typing.Iterator[bytes]:
+        for chunk in chunks:
+            bucket.consume(len(chunk))
+            yield chunk
+
+    return paced()
@@ -0,0 +1,251 @@
+"""Estimates the size of a submission's archive before it is built, so that a
+submission over its competition's size limit can be turned away before any time is
+spent compressing it. The estimate takes the size of the tar stream from the scan
+and compresses a few blocks spread across the files to predict how well the rest
+will compress, so it costs a few reads however large the submission is. The limit
+of each competition is cached for a day."""
+
+import bisect
+import itertools
+import random
+import tarfile
+import time
+import typing
+
+import requests
+
+from doxa_cli.compression import (
+    STORE_SAMPLE_SIZE,
+    Codec,
+    StorePolicy,
+    is_incompressible,
+)
+from doxa_cli.config import CONFIG
+from doxa_cli.constants import UPLOAD_LIMITS_URL
+from doxa_cli.scanner import ScannedEntry, SubmissionScan
+from doxa_cli.tracing import span
+
+# The sample compressed to estimate the size of the archive
+ESTIMATE_SAMPLES = 32
+ESTIMATE_SAMPLE_SIZE = 16 * 1024
+
+# The number of large files whose first bytes are read to tell if they are stored
+ESTIMATE_HEADS = 64
+
+# Long-range matches between files, which zstd & xz find using their large windows,
+# are missed in a sample, so their estimates may be too large by this fraction
+ESTIMATE_MARGINS = {"gzip": 0.25, "zstd": 1.0, "xz": 1.0}
+
+# Competition size limits are fetched again after this many seconds
+LIMITS_TTL = 24 * 60 * 60
+
+TAR_BLOCK_SIZE = 512
+TAR_RECORD_SIZE = 20 * TAR_BLOCK_SIZE
+
+# Larger files do not fit in the size field of a ustar header
+TAR_MAX_SIZE = 8**11
+
+
+class SizeEstimate(typing.NamedTuple):
+    files: int
+    total_size: int  # of the files, uncompressed
+    tar_size: int  # of the uncompressed tar stream
+    archive_size: int  # estimated, once compressed
+    minimum_size: int  # the smallest the archive is likely to be
+    stored_size: int  # estimated bytes of files stored without compression
+
+
+def get_tar_size(scan: SubmissionScan) -> int:
+    """Returns the size of the uncompressed tar stream of a submission."""
+
+    size = 2 * TAR_BLOCK_SIZE  # the end-of-archive marker
+    for entry in scan.entries:
+        # Only long or non-ASCII names (and huge files) need a PAX header, whose
+        # size depends on its contents, so other headers are not built
+        name = entry.arcname
+        if name.isascii() and len(name) < 100 and entry.size < TAR_MAX_SIZE:
+            size += TAR_BLOCK_SIZE
+        else:
+            size += len(make_header(entry))
+
+        size += -(-entry.size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+
+    return -(-size // TAR_RECORD_SIZE) * TAR_RECORD_SIZE
+
+
+def get_archive_size_bound(scan: SubmissionScan, codec: Codec) -> int:
+    """Returns the largest that the archive of a submission can be, however
+    incompressible its files are."""
+
+    # Each file may start a new segment (see `SegmentedWriter`)
+    return codec.get_size_bound(get_tar_size(scan), len(scan.files) + 1)
+
+
+def make_header(entry: ScannedEntry) -> bytes:
+    """Builds a tar header of the same size as `compress_submission_directory` writes
+    for an entry."""
+
+    tarinfo = tarfile.TarInfo(entry.arcname)
+    tarinfo.type = tarfile.DIRTYPE if entry.is_dir else tarfile.REGTYPE
+    tarinfo.size = entry.size
+    return tarinfo.tobuf(tarfile.PAX_FORMAT)
+
+
+def estimate_archive_size(
+    scan: SubmissionScan, codec: Codec, store_policy: StorePolicy | None = None
+) -> SizeEstimate:
+    """Estimates the size of the archive of a submission compressed with `codec`,
+    treating incompressible files as `compress_submission_directory` would."""
+
+    tar_size = get_tar_size(scan)
+    if codec.name == "none":
+        return SizeEstimate(
+            len(scan.files),
+            scan.total_size,
+            tar_size,
+            tar_size,
+            tar_size,
+            scan.total_size,
+        )
+
+    store_policy = store_policy or StorePolicy()
+    decisions = [
+        (entry, store_policy.decide(entry.arcname, entry.size))
+        for entry in scan.files
+        if entry.size > 0
+    ]
+
+    # As when compressing, undecided files are stored if their first bytes are
+    # incompressible. Only the largest are checked, as they make up most of the
+    # bytes. Codecs that cannot store files (i.e. xz) barely shrink them either way
+    undecided = sorted(
+        (entry for entry, decision in decisions if decision is None),
+        key=lambda entry: entry.size,
+        reverse=True,
+    )
+    stored_paths = set()
+    for entry in undecided[:ESTIMATE_HEADS]:
+        try:
+            with open(entry.path, "rb") as f:
+                if is_incompressible(f.read(STORE_SAMPLE_SIZE)):
+                    stored_paths.add(entry.path)
+        except OSError:
+            continue
+
+    stored_size = 0
+    compressed_files = []
+    for entry, decision in decisions:
+        if decision or entry.path in stored_paths:
+            stored_size += entry.size
+        else:
+            compressed_files.append(entry)
+
+    # Tar headers & padding, which are mostly zeros, compress far better than the
+    # files themselves, so they are estimated separately
+    compressed_size = 0.0
+    for sample, size in (
+        (sample_files(compressed_files), scan.total_size - stored_size),
+        (sample_headers(scan), tar_size - scan.total_size),
+    ):
+        if sample:
+            compressed_size += size * len(codec.compress(sample)) / len(sample)
+
+    return SizeEstimate(
+        len(scan.files),
+        scan.total_size,
+        tar_size,
+        stored_size + round(compressed_size),
+        stored_size + round(compressed_size / (1 + ESTIMATE_MARGINS[codec.name])),
+        stored_size,
+    )
+
+
+def sample_files(files: list[ScannedEntry]) -> bytes:
+    """Reads distinct blocks at offsets spread uniformly across the bytes of `files`
+    (in order), or every byte if there are few enough. Unlike picking files with
+    replacement, no block is read twice, which would flatter codecs like xz."""
+
+    total_size = sum(entry.size for entry in files)
+    block_count = total_size // ESTIMATE_SAMPLE_SIZE
+    if block_count <= ESTIMATE_SAMPLES:
+        offsets = [0]
+        sample_size = total_size
+    else:
+        rng = random.Random(0)
+        blocks = sorted(rng.sample(range(block_count), ESTIMATE_SAMPLES))
+        offsets = [block * ESTIMATE_SAMPLE_SIZE for block in blocks]
+        sample_size = ESTIMATE_SAMPLE_SIZE
+
+    ends = list(itertools.accumulate(entry.size for entry in files))
+    sample = bytearray()
+    for offset in offsets:
+        index = bisect.bisect_right(ends, offset)
+        position = offset - (ends[index - 1] if index else 0)
+        remaining = sample_size
+
+        # A block may run on into the following files
+        while remaining > 0 and index < len(files):
+            try:
+                with open(files[index].path, "rb") as f:
+                    f.seek(position)
+                    block = f.read(remaining)
+            except OSError:
+                break
+
+            sample += block
+            remaining -= len(block)
+            index, position = index + 1, 0
+
+    return bytes(sample)
+
+
+def sample_headers(scan: SubmissionScan) -> bytes:
+    """Builds the tar headers & padding of entries spread evenly across the scan."""
+
+    step = max(len(scan.entries) // ESTIMATE_SAMPLES, 1)
+    sample = bytearray()
+    for entry in scan.entries[::step]:
+        sample += make_header(entry)
+        sample += bytes(-entry.size % TAR_BLOCK_SIZE)
+
+    return bytes(sample)
+
+
+def get_size_limit(session: requests.Session, competition: str) -> int | None:
+    """Returns the largest archive (in bytes) that may be submitted to a competition,
+    or `None` if it is unlimited or unknown."""
+
+    limits = CONFIG.get("competition_limits") or {}
+    cached = limits.get(competition)
+    if cached is not None and time.time() - cached["fetched_at"] < LIMITS_TTL:
+        return cached["max_submission_size"]
+
+    with span("get_size_limit", competition=competition) as trace:
+        try:
+            response = session.get(
+                UPLOAD_LIMITS_URL, params={"competition_tag": competition}
+            )
+            body = response.json() if response.ok else {}
+        except (requests.RequestException, ValueError):
+            return None  # the limit is still enforced when the upload slot is requested
+
+        # A client error (e.g. from a platform without this endpoint) is cached too,
+        # so that it is not requested again before every upload
+        if response.status_code >= 500:
+            return None
+
+        limit = body.get("max_submission_size")
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            limit = None
+        trace["limit"] = limit
+
+    CONFIG.update(
+        {
+            "competition_limits": {
+                **(CONFIG.get("competition_limits") or {}),
+                competition: {"max_submission_size": limit, "fetched_at": time.time()},
+            }
+        }
+    )
+
+    return limit
@@ -0,0 +1,237 @@
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import time
+import typing
+
+import requests
+
+from doxa_cli.constants import CONFIG_DIRECTORY
+from doxa_cli.errors import UploadError
+from doxa_cli.pacing import pace_body
+from doxa_cli.transport import get_session
+from doxa_cli.utils import handle_upload_response
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+UPLOADS_DIRECTORY = os.path.join(CONFIG_DIRECTORY, "uploads")
+
+
+def get_checkpoint_key(directory: str, competition: str, environment: str | None):
+    identity = json.dumps([directory, competition, environment])
+    return hashlib.sha256(identity.encode()).hexdigest()[:16]
+
+
+class UploadCheckpoint:
+    """Records the progress of a chunked upload on disk, so that an interrupted upload
+    can be continued by `doxa upload --resume`. The compressed archive is kept in the
+    configuration directory until the upload completes."""
+
+    def __init__(self, key: str, data: dict[str, typing.Any]) -> None:
+        self.key = key
+        self.data = data
+
+    @staticmethod
+    def get_path(key: str) -> str:
+        return os.path.join(UPLOADS_DIRECTORY, f"{key}.json")
+
+    @staticmethod
+    def get_archive_path(key: str, extension: str) -> str:
+        return os.path.join(UPLOADS_DIRECTORY, f"{key}{extension}")
+
+    @classmethod
+    def load(cls, key: str) -> "UploadCheckpoint | None":
+        try:
+            with open(cls.get_path(key), "r") as f:
+                checkpoint = cls(key, json.load(f))
+        except (OSError, ValueError):
+            return None
+
+        if not os.path.exists(checkpoint.archive_path):
+            checkpoint.delete()
+            return None
+
+        return checkpoint
+
+    @classmethod
+    def create(
+        cls,
+        key: str,
+        archive_path: str,
+        upload_endpoint: str,
+        upload_token: str,
+        chunk_size: int = CHUNK_SIZE,
+        sha256: str | None = None,
+        fingerprint: str | None = None,
+    ) -> "UploadCheckpoint":
+        checkpoint = cls(
+            key,
+            {
+                "archive_path": archive_path,
+                "upload_endpoint": upload_endpoint,
+                "upload_token": upload_token,
+                "size": os.path.getsize(archive_path),
+                "chunk_size": chunk_size,
+                "acknowledged": [],
+                "sha256": sha256,
+                "fingerprint": fingerprint,
+                "created_at": time.time(),
+            },
+        )
+        checkpoint.save()
+        return checkpoint
+
+    @property
+    def archive_path(self) -> str:
+        return self.data["archive_path"]
+
+    @property
+    def fingerprint(self) -> str | None:
+        return self.data.get("fingerprint")
+
+    @property
+    def size(self) -> int:
+        return self.data["size"]
+
+    @property
+    def chunk_count(self) -> int:
+        return max(-(-self.size // self.data["chunk_size"]), 1)
+
+    @property
+    def acknowledged(self) -> set[int]:
+        return set(self.data["acknowledged"])
+
+    @property
+    def acknowledged_size(self) -> int:
+        return sum(self.get_chunk_range(index)[1] for index in self.acknowledged)
+
+    def get_chunk_range(self, index: int) -> tuple[int, int]:
+        offset = index * self.data["chunk_size"]
+        return offset, min(self.data["chunk_size"], self.size - offset)
+
+    def acknowledge(self, index: int) -> None:
+        self.data["acknowledged"] = sorted(self.acknowledged | {index})
+        self.save()
+
+    def save(self) -> None:
+        # Write to a temporary file and rename it, so that an interruption never
+        # leaves a truncated checkpoint behind
+        os.makedirs(UPLOADS_DIRECTORY, exist_ok=True)
+        path = self.get_path(self.key)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def delete(self) -> None:
+        for path in (self.get_path(self.key), self.data.get("archive_path")):
+            try:
+                if path:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def get_acknowledged_chunks(
+    session: requests.Session, checkpoint: UploadCheckpoint
+) -> set[int] | None:
+    """Asks the storage node which chunks it holds, or returns None if it can't say."""
+
+    try:
+        response = session.get(
+            f"{checkpoint.data['upload_endpoint']}/chunks",
+            headers={"Authorization": f"Bearer {checkpoint.data['upload_token']}"},
+            verify=True,
+        )
+        body = handle_upload_response(response)
+    except (requests.RequestException, ValueError, UploadError):
+        return None
+
+    return set(body.get("chunks", []))
+
+
+def upload_chunk(
+    session: requests.Session, checkpoint: UploadCheckpoint, index: int, data: bytes
+) -> None:
+    response = session.put(
+        f"{checkpoint.data['upload_endpoint']}/chunks/{index}",
+        headers={
+            "Authorization": f"Bearer {checkpoint.data['upload_token']}",
+            "Content-Type": "application/octet-stream",
+            "X-Chunk-SHA256": hashlib.sha256(data).hexdigest(),
+        },
+        # As a file, the chunk is sent in blocks of the send buffer size (and paced)
+        data=pace_body(io.BytesIO(data)),
+        verify=True,
+    )
+
+    handle_upload_response(response)
+
+
+def complete_upload(session: requests.Session, checkpoint: UploadCheckpoint) -> None:
+    response = session.post(
+        f"{checkpoint.data['upload_endpoint']}/complete",
+        headers={"Authorization": f"Bearer {checkpoint.data['upload_token']}"},
+        json={"chunks": checkpoint.chunk_count, "size": checkpoint.size},
+        verify=True,
+    )
+
+    handle_upload_response(response)
+
+
+def read_and_upload_chunk(
+    session: requests.Session, checkpoint: UploadCheckpoint, index: int
+) -> int:
+    offset, length = checkpoint.get_chunk_range(index)
+    with open(checkpoint.archive_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+
+    # Chunks are uploaded with idempotent PUT requests, which the transport retries
+    upload_chunk(session, checkpoint, index, data)
+    return len(data)
+
+
+def upload_chunks(
+    checkpoint: UploadCheckpoint,
+    callback: typing.Callable[[int], None],
+    connections: int = 1,
+) -> None:
+    """Uploads every chunk not yet acknowledged by the storage node over up to
+    `connections` concurrent connections, recording each acknowledgement in the
+    checkpoint, before asking the node to reassemble the chunks in order."""
+
+    with get_session(pool_size=connections) as session:
+        remote = get_acknowledged_chunks(session, checkpoint)
+        if remote is not None and remote != checkpoint.acknowledged:
+            checkpoint.data["acknowledged"] = sorted(checkpoint.acknowledged & remote)
+            checkpoint.save()
+
+        pending = [
+            index
+            for index in range(checkpoint.chunk_count)
+            if index not in checkpoint.acknowledged
+        ]
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=connections, thread_name_prefix="doxa-upload"
+        )
+        try:
+            futures = {
+                executor.submit(
+                    read_and_upload_chunk, session, checkpoint, index
+                ): index
+                for index in pending
+            }
+
+            # Acknowledgements are only recorded on this thread, as chunks complete
+            for future in concurrent.futures.as_completed(futures):
+                length = future.result()
+                checkpoint.acknowledge(futures[future])
+                callback(length)
+        finally:
+            # Don't keep uploading the remaining chunks if one of them failed
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        complete_upload(session, checkpoint)
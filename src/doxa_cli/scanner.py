@@ -0,0 +1,52 @@
+import os
+import stat
+import typing
+
+from doxa_cli.ignore import compile_ignore_spec, walk_submission
+
+
+class ScannedEntry(typing.NamedTuple):
+    path: str
+    arcname: str
+    stat: os.stat_result
+
+    @property
+    def is_dir(self) -> bool:
+        return stat.S_ISDIR(self.stat.st_mode)
+
+    @property
+    def size(self) -> int:
+        return 0 if self.is_dir else self.stat.st_size
+
+
+class SubmissionScan:
+    """The result of walking a submission directory once: every directory and file
+    to be archived, with the `stat` result of each, so that the archiver and the
+    progress display need not touch the file system again."""
+
+    def __init__(
+        self,
+        directory: str,
+        entries: list[ScannedEntry],
+        ignore_files: list[str] | None = None,
+    ) -> None:
+        self.directory = directory
+        self.entries = entries
+        self.ignore_files = ignore_files or []
+        self.files = [entry for entry in entries if not entry.is_dir]
+        self.total_size = sum(entry.size for entry in self.files)
+
+    @property
+    def file_sizes(self) -> list[tuple[str, int]]:
+        return [(entry.path, entry.size) for entry in self.files]
+
+
+def scan_submission(directory: str, ignore_files: list[str]) -> SubmissionScan:
+    entries = [
+        ScannedEntry(entry.path, arcname, entry.stat(follow_symlinks=False))
+        for entry, arcname in walk_submission(
+            directory, compile_ignore_spec(ignore_files)
+        )
+    ]
+
+    return SubmissionScan(directory, entries, ignore_files)
@@ -0,0 +1,812 @@
+"""A lightweight local stand-in for the DOXA AI platform API and storage node, used
+to exercise and benchmark the CLI offline, e.g.
+
+    python -m doxa_cli.server --port 4002
+
+followed by `DOXA_ENV=DEV doxa login` & `DOXA_ENV=DEV doxa upload ...` in another
+shell. Latency, bandwidth caps, rate limits & server errors can be injected to see
+how the CLI copes with a congested platform (see `python -m doxa_cli.loadgen`)."""
+
+import collections
+import hashlib
+import json
+import os
+import random
+import secrets
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import typer
+from typing_extensions import Annotated
+
+from doxa_cli.manifest import BLOBS_DIRECTORY, MANIFEST_NAME
+
+READ_SIZE = 256 * 1024
+
+
+class Throttle:
+    """Paces a shared resource, e.g. bandwidth, to `rate` units per second across all
+    of the threads using it."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.available_at = 0.0
+
+    def reserve(self, amount: int) -> float:
+        """Reserves `amount` units, returning how long to wait before using them."""
+
+        with self.lock:
+            now = time.perf_counter()
+            start = max(self.available_at, now)
+            self.available_at = start + amount / self.rate
+
+        return start - now
+
+
+class RateLimiter:
+    """A token bucket allowing `rate` requests per second, in bursts of up to one
+    second's worth of requests."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            now = time.perf_counter()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 4002,
+        directory: str | None = None,
+        stream_rate: int | None = None,
+        bandwidth: int | None = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float | None = None,
+        token_lifetime: int = 3600,
+        approval_delay: float = 0.0,
+        closed_competitions: typing.Iterable[str] = (),
+        max_submission_size: int | None = None,
+    ) -> None:
+        super().__init__((host, port), StandInRequestHandler)
+
+        # Caps the rate (in bytes per second) at which each request body is read,
+        # simulating the per-connection throughput limit of a high-latency link
+        self.stream_rate = stream_rate
+
+        # Caps the total rate (in bytes per second) of all uploads, as if they all
+        # shared the same link
+        self.bandwidth = Throttle(bandwidth) if bandwidth else None
+
+        # Every request is delayed by `latency` seconds, after which a fraction
+        # `error_rate` of requests fail with a 503 error & any request beyond
+        # `rate_limit` requests per second is rejected with a 429 error
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+        # Device authorisations are approved automatically after `approval_delay`
+        # seconds, issuing access tokens that expire after `token_lifetime` seconds
+        self.token_lifetime = token_lifetime
+        self.approval_delay = approval_delay
+        self.device_codes: dict[str, float] = {}
+        self.access_tokens: dict[str, float] = {}
+        self.refresh_tokens: set[str] = set()
+
+        # Upload slots for these competitions are denied
+        self.closed_competitions = set(closed_competitions)
+
+        # Upload slots for archives larger than this many bytes are denied
+        self.max_submission_size = max_submission_size
+
+        self.directory = directory or tempfile.mkdtemp(prefix="doxa-server-")
+        self.blobs_directory = os.path.join(self.directory, BLOBS_DIRECTORY)
+        self.chunks_directory = os.path.join(self.directory, "chunks")
+        self.uploads_directory = os.path.join(self.directory, "uploads")
+        os.makedirs(self.blobs_directory, exist_ok=True)
+        os.makedirs(self.chunks_directory, exist_ok=True)
+        os.makedirs(self.uploads_directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.slots: dict[str, dict[str, typing.Any]] = {}
+        self.uploads: list[dict[str, typing.Any]] = []
+
+        # The number of responses sent with each status code
+        self.responses: collections.Counter[int] = collections.Counter()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api"
+
+    @property
+    def storage_url(self) -> str:
+        return f"{self.url}/storage"
+
+    def issue_tokens(self) -> dict[str, typing.Any]:
+        access_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+
+        with self.lock:
+            self.access_tokens[access_token] = time.time() + self.token_lifetime
+            self.refresh_tokens.add(refresh_token)
+
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "Bearer",
+            "expires_in": self.token_lifetime,
+        }
+
+    def is_authorised(self, access_token: str | None) -> bool:
+        """Accepts access tokens issued by this server until they expire, as well as
+        any other token, so that the CLI can be used without logging in."""
+
+        if not access_token:
+            return False
+
+        with self.lock:
+            expires_at = self.access_tokens.get(access_token)
+
+        return expires_at is None or time.time() < expires_at
+
+    def has_blob(self, digest: str) -> bool:
+        return os.path.exists(os.path.join(self.blobs_directory, digest))
+
+    def store_blob(self, digest: str, fileobj: typing.IO) -> bool:
+        """Stores a blob after verifying that its contents match its digest."""
+
+        fd, temporary_path = tempfile.mkstemp(dir=self.blobs_directory)
+        hasher = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            while block := fileobj.read(READ_SIZE):
+                hasher.update(block)
+                f.write(block)
+
+        if hasher.hexdigest() != digest:
+            os.unlink(temporary_path)
+            return False
+
+        os.replace(temporary_path, os.path.join(self.blobs_directory, digest))
+        return True
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+    def send_json(
+        self,
+        status: int,
+        body: dict[str, typing.Any],
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+        with self.server.lock:
+            self.server.responses[status] += 1
+
+    def send_error_json(
+        self,
+        status: int,
+        code: str,
+        message: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_json(status, {"error": {"code": code, "message": message}}, headers)
+
+    def send_oauth_error(self, status: int, error: str) -> None:
+        self.send_json(status, {"error": error})
+
+    def inject_faults(self) -> bool:
+        """Delays the request and possibly fails it, as configured, returning whether
+        an error response was sent."""
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # Only the API is rate limited, not the storage nodes
+        rate_limiter = self.server.rate_limiter
+        if (
+            rate_limiter is not None
+            and self.path.startswith("/api/")
+            and not rate_limiter.allow()
+        ):
+            self.discard_body()
+            self.send_error_json(
+                429, "RATE_LIMITED", "Too many requests.", {"Retry-After": "1"}
+            )
+            return True
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.discard_body()
+            self.send_error_json(
+                503, "SERVICE_UNAVAILABLE", "The service is temporarily unavailable."
+            )
+            return True
+
+        return False
+
+    def iter_body(self) -> typing.Iterator[bytes]:
+        stream_rate, bandwidth = self.server.stream_rate, self.server.bandwidth
+        if not stream_rate and bandwidth is None:
+            yield from self.iter_raw_body()
+            return
+
+        start = time.perf_counter()
+        received = 0
+        for data in self.iter_raw_body():
+            received += len(data)
+
+            delay = 0.0
+            if stream_rate:
+                delay = received / stream_rate - (time.perf_counter() - start)
+            if bandwidth is not None:
+                delay = max(delay, bandwidth.reserve(len(data)))
+
+            if delay > 0:
+                time.sleep(delay)
+
+            yield data
+
+    def discard_body(self) -> None:
+        for _ in self.iter_raw_body():
+            pass
+
+    def iter_raw_body(self) -> typing.Iterator[bytes]:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                length = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if length == 0:
+                    # skip any trailers up to the final empty line
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+
+                remaining = length
+                while remaining:
+                    data = self.rfile.read(min(remaining, READ_SIZE))
+                    if not data:
+                        return
+                    remaining -= len(data)
+                    yield data
+
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                data = self.rfile.read(min(remaining, READ_SIZE))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
+    def read_json(self) -> dict[str, typing.Any]:
+        return json.loads(b"".join(self.iter_body()) or b"{}")
+
+    def get_bearer_token(self) -> str | None:
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer "):
+            return None
+
+        return authorization[len("Bearer ") :]
+
+    def send_not_found(self) -> None:
+        self.discard_body()
+        self.send_error_json(404, "NOT_FOUND", "Not found.")
+
+    def get_slot(self) -> dict[str, typing.Any] | None:
+        with self.server.lock:
+            return self.server.slots.get(self.get_bearer_token() or "")
+
+    def do_GET(self) -> None:
+        if self.inject_faults():
+            return
+
+        if self.path == "/api/oauth/userinfo":
+            self.handle_userinfo()
+        elif urlsplit(self.path).path == "/api/upload/limits":
+            self.handle_upload_limits()
+        elif self.path == "/storage/upload/chunks":
+            self.handle_list_chunks()
+        else:
+            self.send_not_found()
+
+    def do_PUT(self) -> None:
+        if self.inject_faults():
+            return
+
+        if self.path.startswith("/storage/upload/chunks/"):
+            self.handle_upload_chunk(self.path.rpartition("/")[2])
+        else:
+            self.send_not_found()
+
+    def do_POST(self) -> None:
+        if self.inject_faults():
+            return
+
+        if self.path == "/api/oauth/device/authorize":
+            self.handle_device_authorize()
+        elif self.path == "/api/oauth/token":
+            self.handle_token()
+        elif self.path == "/api/upload/slot":
+            self.handle_upload_slot()
+        elif self.path == "/storage/upload":
+            self.handle_upload()
+        elif self.path == "/storage/upload/complete":
+            self.handle_complete_upload()
+        else:
+            self.send_not_found()
+
+    def handle_device_authorize(self) -> None:
+        self.read_json()
+
+        device_code = secrets.token_hex(16)
+        user_code = secrets.token_hex(4).upper()
+        with self.server.lock:
+            self.server.device_codes[device_code] = time.time()
+
+        self.send_json(
+            200,
+            {
+                "device_code": device_code,
+                "user_code": user_code,
+                "verification_uri": f"{self.server.url}/device",
+                "verification_uri_complete": f"{self.server.url}/device?user_code={user_code}",
+                "expires_in": 600,
+                "interval": 1,
+            },
+        )
+
+    def handle_token(self) -> None:
+        body = self.read_json()
+        grant_type = body.get("grant_type")
+
+        error = None
+
+        with self.server.lock:
+            if grant_type == "urn:ietf:params:oauth:grant-type:device_code":
+                requested_at = self.server.device_codes.get(body.get("device_code"))
+                if requested_at is None:
+                    error = "invalid_grant"
+                elif time.time() < requested_at + self.server.approval_delay:
+                    error = "authorization_pending"
+                else:
+                    del self.server.device_codes[body["device_code"]]
+            elif grant_type == "refresh_token":
+                # Refresh tokens may only be used once
+                if body.get("refresh_token") in self.server.refresh_tokens:
+                    self.server.refresh_tokens.remove(body["refresh_token"])
+                else:
+                    error = "invalid_grant"
+            else:
+                error = "unsupported_grant_type"
+
+        if error is not None:
+            self.send_oauth_error(400, error)
+        else:
+            self.send_json(200, self.server.issue_tokens())
+
+    def handle_userinfo(self) -> None:
+        if not self.server.is_authorised(self.get_bearer_token()):
+            self.send_oauth_error(401, "invalid_token")
+            return
+
+        self.send_json(
+            200,
+            {
+                "sub": "stand-in",
+                "preferred_username": "stand-in",
+                "email": "stand-in@localhost",
+            },
+        )
+
+    def handle_upload_limits(self) -> None:
+        if not self.server.is_authorised(self.get_bearer_token()):
+            self.send_error_json(401, "UNAUTHORISED", "You must be logged in.")
+            return
+
+        query = parse_qs(urlsplit(self.path).query)
+        self.send_json(
+            200,
+            {
+                "competition_tag": query.get("competition_tag", [None])[0],
+                "max_submission_size": self.server.max_submission_size,
+            },
+        )
+
+    def handle_upload_slot(self) -> None:
+        body = self.read_json()
+        if not self.server.is_authorised(self.get_bearer_token()):
+            self.send_error_json(401, "UNAUTHORISED", "You must be logged in.")
+            return
+
+        if not body.get("competition_tag"):
+            self.send_error_json(
+                400, "COMPETITION_TAG_INVALID", "The competition tag is invalid."
+            )
+            return
+
+        if body["competition_tag"] in self.server.closed_competitions:
+            self.send_error_json(
+                403, "COMPETITION_CLOSED", "This competition is closed to submissions."
+            )
+            return
+
+        limit = self.server.max_submission_size
+        if limit is not None and (body.get("size") or 0) > limit:
+            self.send_error_json(
+                413,
+                "SUBMISSION_TOO_LARGE",
+                f"Submissions to this competition may be at most {limit} bytes.",
+            )
+            return
+
+        token = secrets.token_hex(16)
+        slot = {
+            "competition": body["competition_tag"],
+            "environment": body.get("environment_tag"),
+            "compression": body.get("compression", "gzip"),
+            "manifest": body.get("manifest"),
+            "size": body.get("size"),
+        }
+
+        with self.server.lock:
+            self.server.slots[token] = slot
+
+        response = {"endpoint": self.server.storage_url, "token": token}
+        if slot["manifest"] is not None:
+            response["missing"] = sorted(
+                {
+                    entry["sha256"]
+                    for entry in slot["manifest"]["files"]
+                    if not self.server.has_blob(entry["sha256"])
+                }
+            )
+
+        self.send_json(200, response)
+
+    def handle_upload(self) -> None:
+        with self.server.lock:
+            slot = self.server.slots.pop(self.get_bearer_token() or "", None)
+
+        content_type = self.headers.get("Content-Type", "")
+        if slot is None or "boundary=" not in content_type:
+            self.discard_body()
+
+            if slot is None:
+                self.send_error_json(
+                    401, "UPLOAD_TOKEN_INVALID", "The upload token is invalid."
+                )
+            else:
+                self.send_error_json(
+                    400, "UPLOAD_INVALID", "Expected a multipart/form-data body."
+                )
+            return
+
+        boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+        path = os.path.join(self.server.uploads_directory, secrets.token_hex(8))
+
+        with open(path, "wb") as f:
+            received = receive_multipart_file(self.iter_body(), boundary, f)
+
+        try:
+            blobs = ingest_archive(self.server, path, slot)
+        except (tarfile.TarError, OSError, ValueError) as e:
+            self.send_error_json(400, "UPLOAD_INVALID", str(e))
+            return
+
+        with self.server.lock:
+            self.server.uploads.append(
+                {"path": path, "size": received, "blobs": blobs, **slot}
+            )
+
+        self.send_json(200, {"size": received, "blobs": blobs})
+
+    def get_chunks_directory(self) -> str:
+        return os.path.join(self.server.chunks_directory, self.get_bearer_token() or "")
+
+    def handle_list_chunks(self) -> None:
+        if self.get_slot() is None:
+            self.send_error_json(
+                401, "UPLOAD_TOKEN_INVALID", "The upload token is invalid."
+            )
+            return
+
+        directory = self.get_chunks_directory()
+        chunks = (
+            sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+            if os.path.isdir(directory)
+            else []
+        )
+        self.send_json(200, {"chunks": chunks})
+
+    def handle_upload_chunk(self, index: str) -> None:
+        data = b"".join(self.iter_body())
+
+        if self.get_slot() is None:
+            self.send_error_json(
+                401, "UPLOAD_TOKEN_INVALID", "The upload token is invalid."
+            )
+            return
+
+        if not index.isdigit():
+            self.send_error_json(400, "CHUNK_INVALID", "The chunk index is invalid.")
+            return
+
+        digest = self.headers.get("X-Chunk-SHA256")
+        if digest and hashlib.sha256(data).hexdigest() != digest:
+            self.send_error_json(400, "CHUNK_CORRUPT", "The chunk is corrupt.")
+            return
+
+        directory = self.get_chunks_directory()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{index}.tmp"), "wb") as f:
+            f.write(data)
+        os.replace(
+            os.path.join(directory, f"{index}.tmp"),
+            os.path.join(directory, str(int(index))),
+        )
+
+        self.send_json(200, {"chunk": int(index), "size": len(data)})
+
+    def handle_complete_upload(self) -> None:
+        body = self.read_json()
+
+        with self.server.lock:
+            slot = self.server.slots.pop(self.get_bearer_token() or "", None)
+
+        if slot is None:
+            self.send_error_json(
+                401, "UPLOAD_TOKEN_INVALID", "The upload token is invalid."
+            )
+            return
+
+        directory = self.get_chunks_directory()
+        path = os.path.join(self.server.uploads_directory, secrets.token_hex(8))
+
+        try:
+            with open(path, "wb") as f:
+                for index in range(int(body["chunks"])):
+                    with open(os.path.join(directory, str(index)), "rb") as chunk:
+                        shutil.copyfileobj(chunk, f)
+
+            if os.path.getsize(path) != body.get("size", os.path.getsize(path)):
+                raise ValueError("The assembled upload has the wrong size.")
+
+            blobs = ingest_archive(self.server, path, slot)
+        except (KeyError, tarfile.TarError, OSError, ValueError) as e:
+            self.send_error_json(400, "UPLOAD_INVALID", str(e))
+            return
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        size = os.path.getsize(path)
+        with self.server.lock:
+            self.server.uploads.append(
+                {"path": path, "size": size, "blobs": blobs, **slot}
+            )
+
+        self.send_json(200, {"size": size, "blobs": blobs})
+
+
+def receive_multipart_file(
+    chunks: typing.Iterable[bytes], boundary: bytes, f: typing.IO
+) -> int:
+    """Streams the contents of the first file in a `multipart/form-data` body into
+    `f` without holding the whole body in memory, returning its size."""
+
+    delimiter = b"\r\n--" + boundary
+    buffer = b""
+    in_body = False
+    received = 0
+    done = False
+
+    for chunk in chunks:
+        if done:
+            continue  # drain the rest of the request
+
+        buffer += chunk
+        if not in_body:
+            end = buffer.find(b"\r\n\r\n")
+            if end == -1:
+                continue
+
+            buffer = buffer[end + 4 :]
+            in_body = True
+
+        end = buffer.find(delimiter)
+        if end != -1:
+            f.write(buffer[:end])
+            received += end
+            done = True
+        elif len(buffer) > len(delimiter):
+            keep = len(delimiter)
+            f.write(buffer[:-keep])
+            received += len(buffer) - keep
+            buffer = buffer[-keep:]
+
+    if not done:
+        raise ValueError("The multipart body ended unexpectedly.")
+
+    return received
+
+
+def open_archive(path: str, compression: str) -> tarfile.TarFile:
+    if compression == "zstd":
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return tarfile.open(fileobj=reader, mode="r|")
+
+    return tarfile.open(path, mode="r:*")
+
+
+def ingest_archive(
+    server: StandInServer, path: str, slot: dict[str, typing.Any]
+) -> int:
+    """Adds the contents of an uploaded archive to the blob store, so that later
+    incremental uploads only need to include files that have changed."""
+
+    manifest = slot.get("manifest")
+    blobs = 0
+
+    with open_archive(path, slot["compression"]) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+
+            fileobj = tar.extractfile(member)
+            assert fileobj is not None
+
+            if manifest is not None:
+                if member.name == MANIFEST_NAME:
+                    continue
+
+                digest = member.name.rpartition("/")[2]
+                if not server.store_blob(digest, fileobj):
+                    raise ValueError(f"The contents of blob {digest} are corrupt.")
+            else:
+                hasher = hashlib.sha256()
+                with tempfile.SpooledTemporaryFile() as copy:
+                    while block := fileobj.read(READ_SIZE):
+                        hasher.update(block)
+                        copy.write(block)
+
+                    copy.seek(0)
+                    server.store_blob(hasher.hexdigest(), copy)
+
+            blobs += 1
+
+    if manifest is not None:
+        missing = [
+            entry["path"]
+            for entry in manifest["files"]
+            if not server.has_blob(entry["sha256"])
+        ]
+        if missing:
+            raise ValueError(f"The upload is missing {len(missing)} file(s).")
+
+    return blobs
+
+
+def serve(
+    host: Annotated[str, typer.Option(help="The address to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="The port to listen on.")] = 4002,
+    directory: Annotated[
+        typing.Optional[str],
+        typer.Option(help="Where to store uploads (a temporary directory by default)."),
+    ] = None,
+    stream_rate: Annotated[
+        typing.Optional[int],
+        typer.Option(help="The maximum rate (bytes/s) of each upload connection."),
+    ] = None,
+    bandwidth: Annotated[
+        typing.Optional[int],
+        typer.Option(help="The maximum total rate (bytes/s) of all uploads."),
+    ] = None,
+    latency: Annotated[
+        float, typer.Option(help="The delay (in seconds) added to every request.")
+    ] = 0.0,
+    error_rate: Annotated[
+        float, typer.Option(help="The fraction of requests that fail with a 503.")
+    ] = 0.0,
+    rate_limit: Annotated[
+        typing.Optional[float],
+        typer.Option(help="The number of requests per second allowed before a 429."),
+    ] = None,
+    token_lifetime: Annotated[
+        int, typer.Option(help="The lifetime (in seconds) of access tokens.")
+    ] = 3600,
+    approval_delay: Annotated[
+        float,
+        typer.Option(help="The delay (in seconds) before logins are approved."),
+    ] = 0.0,
+    closed_competition: Annotated[
+        typing.Optional[list[str]],
+        typer.Option(help="A competition whose upload slots are denied."),
+    ] = None,
+    max_submission_size: Annotated[
+        typing.Optional[int],
+        typer.Option(help="The largest archive (in bytes) that may be uploaded."),
+    ] = None,
+):
+    """Run a local stand-in for the DOXA AI platform."""
+
+    server = StandInServer(
+        host,
+        port,
+        directory,
+        stream_rate=stream_rate,
+        bandwidth=bandwidth,
+        latency=latency,
+        error_rate=error_rate,
+        rate_limit=rate_limit,
+        token_lifetime=token_lifetime,
+        approval_delay=approval_delay,
+        closed_competitions=closed_competition or (),
+        max_submission_size=max_submission_size,
+    )
+    typer.echo(f"Serving a stand-in DOXA API at {server.api_url} ({server.directory})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if directory is None:
+            shutil.rmtree(server.directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    typer.run(serve)
@@ -0,0 +1,146 @@
+import queue
+import threading
+import typing
+import uuid
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_CHUNKS = 32
+
+
+class PipeClosedError(Exception):
+    pass
+
+
+class ChunkPipe:
+    """A bounded, thread-safe pipe that turns a writable file-like object (e.g. the
+    output of `tarfile`) into an iterator of fixed-size chunks. Writers block once
+    `max_chunks` chunks are waiting to be consumed, so memory usage stays bounded."""
+
+    def __init__(
+        self,
+        name: str = "submission.tar.gz",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_chunks: int = DEFAULT_MAX_CHUNKS,
+    ) -> None:
+        self.name = name
+        self.chunk_size = chunk_size
+        self.bytes_written = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_chunks)
+        self._buffer = bytearray()
+        self._closed = False
+        self._cancelled = threading.Event()
+        self._error: BaseException | None = None
+
+    def _put(self, item) -> None:
+        while True:
+            if self._cancelled.is_set():
+                raise PipeClosedError("The reading end of the pipe was closed.")
+
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data) -> int:
+        if self._closed:
+            raise PipeClosedError("Cannot write to a closed pipe.")
+
+        self._buffer += data
+        self.bytes_written += len(data)
+
+        while len(self._buffer) >= self.chunk_size:
+            self._put(bytes(self._buffer[: self.chunk_size]))
+            del self._buffer[: self.chunk_size]
+
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """Called once the writer is done to signal the end of the stream."""
+
+        self._error = error
+        self._closed = True
+        try:
+            self._put(None)
+        except PipeClosedError:
+            pass
+
+    def cancel(self) -> None:
+        """Called by the reader to unblock (and fail) any pending writes."""
+
+        self._cancelled.set()
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                if self._error is not None:
+                    raise self._error
+                return
+
+            yield chunk
+
+
+def multipart_stream(
+    field_name: str,
+    file_name: str,
+    chunks: typing.Iterable[bytes],
+    callback: typing.Callable[[int], None] | None = None,
+) -> tuple[str, typing.Iterator[bytes]]:
+    """Wraps an iterable of file chunks in a `multipart/form-data` body, returning
+    the content type and a generator suitable for a chunked transfer."""
+
+    boundary = uuid.uuid4().hex
+    preamble = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{file_name}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    trailer = f"\r\n--{boundary}--\r\n".encode()
+
+    def generate():
+        yield preamble
+
+        sent = 0
+        for chunk in chunks:
+            yield chunk
+
+            sent += len(chunk)
+            if callback:
+                callback(sent)
+
+        yield trailer
+
+    return f"multipart/form-data; boundary={boundary}", generate()
+
+
+def run_in_thread(
+    target: typing.Callable[..., None], pipe: ChunkPipe, *args, **kwargs
+) -> threading.Thread:
+    """Runs a producer writing into `pipe` on a background thread, forwarding any
+    exception it raises to the consumer of the pipe."""
+
+    def run():
+        try:
+            target(pipe, *args, **kwargs)
+        except BaseException as e:
+            pipe.finish(e)
+        else:
+            pipe.finish()
+
+    thread = threading.Thread(target=run, name="doxa-compress", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,363 @@
+import stat
+import tarfile
+import threading
+import typing
+from typing import Any
+from urllib.parse import urljoin
+
+import requests
+from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    SpinnerColumn,
+    TaskProgressColumn,
+    TextColumn,
+    TransferSpeedColumn,
+)
+
+from doxa_cli import pacing
+from doxa_cli.compression import (
+    ARCHIVE_MTIME,
+    Codec,
+    HashingWriter,
+    SegmentedWriter,
+    StorePolicy,
+)
+from doxa_cli.constants import (
+    COMPETITION_KEY,
+    DOXA_STORAGE_URL,
+    ENVIRONMENT_KEY,
+    UPLOAD_SLOT_URL,
+    theme,
+)
+from doxa_cli.errors import (
+    CompressionCancelledError,
+    SubmissionConfigError,
+    UploadSlotDeniedError,
+)
+from doxa_cli.output import ProgressEvents, is_interactive
+from doxa_cli.scanner import ScannedEntry, SubmissionScan
+from doxa_cli.streaming import ChunkPipe, multipart_stream
+from doxa_cli.tracing import span
+from doxa_cli.transport import get_session
+from doxa_cli.utils import handle_upload_response, read_doxa_yaml
+from doxa_cli.zerocopy import MultipartFileBody, can_send_file
+
+# The settings that may be given in the `upload` section of `doxa.yaml`
+TRANSFER_SETTINGS = ("max_rate", "read_buffer_size", "send_buffer_size")
+STORE_SETTINGS = ("store", "compress")
+
+
+def read_submission_config(
+    path: str, competition: str | None, environment: str | None
+) -> tuple[str, str | None, dict[str, Any], list[str], dict[str, Any]]:
+    """Reads & validates `{path}/doxa.yaml`, which looks something like this:
+
+        competition: {competition tag}
+        environment: {environment tag}
+        language: python
+        entrypoint: run.py
+        upload:
+          max_rate: 10M
+
+    Returns the competition, environment, remaining metadata, ignore patterns and
+    upload settings, which are not sent to the platform."""
+
+    user_config = {}
+    try:
+        user_config = read_doxa_yaml(path)
+    except FileNotFoundError:
+        if not competition:
+            raise SubmissionConfigError(
+                "\nYour submission folder must contain a `doxa.yaml` file. Please check the DOXA AI website for further guidance."
+            )
+    except:
+        raise SubmissionConfigError(
+            "\nThere was an error reading the `doxa.yaml` file in your submission. Please check its syntax."
+        )
+
+    # we can override competition and environment with command-line options,
+    competition = competition or user_config.get(COMPETITION_KEY)
+    environment = environment or user_config.get(ENVIRONMENT_KEY)
+
+    user_config.pop("competition", None)
+    user_config.pop("environment", None)
+    upload_config = user_config.pop("upload", None) or {}
+
+    if not competition:
+        raise SubmissionConfigError(
+            "\nYou must specify a competition.\n\nYou can do so by inserting `competition: [COMPETITION TAG]` into the `doxa.yaml` file in your submission folder or by using the --competition/-c command-line option.\n\nRun this command with --help for more information."
+        )
+
+    ignore_files = user_config.get("ignore", [])
+    if not isinstance(ignore_files, list) or not all(
+        isinstance(pattern, str) for pattern in ignore_files
+    ):
+        raise SubmissionConfigError(
+            "\nIf you specify `ignore` in your `doxa.yaml` file, it must be a list of file name matching patterns (using the same syntax as `.gitignore` files)."
+        )
+
+    settings = TRANSFER_SETTINGS + STORE_SETTINGS
+    if not isinstance(upload_config, dict) or not set(upload_config).issubset(settings):
+        raise SubmissionConfigError(
+            f"\nIf you specify `upload` in your `doxa.yaml` file, it may only contain the settings {', '.join(f'`{key}`' for key in settings)}."
+        )
+
+    for key in STORE_SETTINGS:
+        patterns = upload_config.get(key, [])
+        if not isinstance(patterns, list) or not all(
+            isinstance(pattern, str) for pattern in patterns
+        ):
+            raise SubmissionConfigError(
+                f"\nIf you specify `upload.{key}` in your `doxa.yaml` file, it must be a list of file name matching patterns (using the same syntax as `ignore`)."
+            )
+
+    return competition, environment, user_config, ignore_files, upload_config
+
+
+def get_store_policy(upload_config: dict[str, Any]) -> StorePolicy:
+    """Reads which files to store without compression from `doxa.yaml`, e.g.
+
+    upload:
+      store: ["checkpoints/"]
+      compress: ["*.npz"]
+    """
+
+    return StorePolicy(
+        upload_config.get("store", []), upload_config.get("compress", [])
+    )
+
+
+def get_upload_endpoint(upload_slot: dict[str, Any]) -> str:
+    base_url = DOXA_STORAGE_URL or upload_slot["endpoint"]
+    if not base_url.endswith("/"):
+        base_url += "/"
+
+    return urljoin(base_url, "upload")
+
+
+def make_transfer_progress(disable: bool = False) -> Progress | ProgressEvents:
+    # Redrawing a progress bar on every update is only worthwhile on a terminal
+    if not is_interactive():
+        return ProgressEvents(disable=disable)
+
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        "    ",
+        DownloadColumn(),
+        "    ",
+        TransferSpeedColumn(),
+        console=Console(theme=theme),
+        disable=disable,
+    )
+
+
+def get_upload_slot(
+    session: requests.Session,
+    competition: str,
+    environment: str | None,
+    metadata: dict[Any, Any],
+    size: int,
+    compression: str = "gzip",
+    manifest: dict[str, Any] | None = None,
+):
+    body = {
+        "competition_tag": competition,
+        "environment_tag": environment,
+        "metadata": metadata,
+        "size": size,
+        "compression": compression,
+    }
+
+    if manifest is not None:
+        body["manifest"] = manifest
+
+    with span("get_upload_slot", size=size, compression=compression):
+        result = session.post(UPLOAD_SLOT_URL, json=body, verify=True).json()
+
+    if "error" in result:
+        raise UploadSlotDeniedError(
+            result["error"].get("code"), result["error"].get("message")
+        )
+
+    assert "endpoint" in result
+    assert "token" in result
+
+    return result
+
+
+class ProgressReader:
+    """Wraps a file, reporting the number of bytes read from it to `callback`."""
+
+    def __init__(self, f: typing.IO, callback: typing.Callable[[int], None]) -> None:
+        self.f = f
+        self.callback = callback
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.callback(len(data))
+        return data
+
+
+def make_tarinfo(entry: ScannedEntry) -> tarfile.TarInfo:
+    # Built from the stat result collected by the scanner, rather than `stat`-ing
+    # every file again as `TarFile.add` would. Timestamps and ownership are fixed,
+    # so that identical submissions produce identical archives
+    tarinfo = tarfile.TarInfo(entry.arcname)
+    tarinfo.type = tarfile.DIRTYPE if entry.is_dir else tarfile.REGTYPE
+    tarinfo.size = entry.size
+    tarinfo.mtime = ARCHIVE_MTIME
+
+    # Reset user & group information
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = "root"
+
+    # Normalise permissions
+    tarinfo.mode = stat.S_IMODE(entry.stat.st_mode) | (0o775 if entry.is_dir else 0o777)
+
+    return tarinfo
+
+
+def compress_submission_directory(
+    f: typing.IO,
+    scan: SubmissionScan,
+    show_progress: bool = True,
+    codec: Codec | None = None,
+    jobs: int = 1,
+    stop: threading.Event | None = None,
+    store_policy: StorePolicy | None = None,
+) -> str:
+    """Archives the scanned submission into `f`, returning the SHA-256 digest of the
+    uncompressed tar stream, which is the same for identical submissions whichever
+    codec is used. Entries are written in the (sorted) order of the scan, with
+    incompressible files stored as they are (see `StorePolicy`). Setting `stop`
+    abandons compression, raising `CompressionCancelledError`."""
+
+    # The tar stream is written uncompressed into the codec's writer, which may
+    # compress it on several cores
+    codec = codec or Codec("gzip")
+    store_policy = store_policy or StorePolicy()
+
+    with span(
+        "compress",
+        codec=codec.name,
+        jobs=jobs,
+        files=len(scan.files),
+        bytes=scan.total_size,
+    ) as trace:
+        output = codec.open_segmented(f, jobs)
+        stored_files = stored_bytes = 0
+        hashing_output = HashingWriter(output)
+
+        try:
+            # The stream mode of `tarfile` never seeks, so it can write into a pipe
+            with tarfile.open(
+                fileobj=hashing_output,
+                mode="w|",
+                format=tarfile.PAX_FORMAT,
+            ) as tar:
+                with make_transfer_progress(disable=not show_progress) as progress:
+                    task = progress.add_task(
+                        "Compressing your submission",
+                        total=scan.total_size,
+                        phase="compress",
+                    )
+
+                    def callback(n: int):
+                        if stop is not None and stop.is_set():
+                            raise CompressionCancelledError()
+
+                        progress.advance(task, n)
+
+                    for entry in scan.entries:
+                        if stop is not None and stop.is_set():
+                            raise CompressionCancelledError()
+
+                        tarinfo = make_tarinfo(entry)
+                        if entry.is_dir:
+                            tar.addfile(tarinfo)
+                            continue
+
+                        with open(entry.path, "rb") as file:
+                            if isinstance(output, SegmentedWriter):
+                                storing = store_policy.should_store(
+                                    entry.arcname, entry.size, file
+                                )
+                                output.set_storing(storing)
+                                if storing:
+                                    stored_files += 1
+                                    stored_bytes += entry.size
+
+                            tar.addfile(tarinfo, ProgressReader(file, callback))
+        finally:
+            try:
+                output.close()
+            finally:
+                f.close()
+
+        trace.update(stored_files=stored_files, stored_bytes=stored_bytes)
+
+    return hashing_output.hexdigest()
+
+
+def upload_agent(
+    upload_endpoint: str,
+    upload_token: str,
+    file: typing.IO,
+    callback: typing.Callable,
+    session: requests.Session | None = None,
+    zero_copy: bool = True,
+) -> None:
+    # An archive on disk is sent without being read into Python (see `zerocopy`)
+    zero_copy = zero_copy and can_send_file(file)
+    if zero_copy:
+        m = body = MultipartFileBody(file, callback)
+    else:
+        m = MultipartEncoderMonitor(
+            MultipartEncoder(fields={file.name: file}), callback
+        )
+        body = pacing.pace_body(m)
+
+    # The upload token replaces any API authorisation header on a shared session
+    with span("transfer", bytes=m.len, zero_copy=zero_copy):
+        response = (session or get_session()).post(
+            upload_endpoint,
+            headers={
+                "Authorization": f"Bearer {upload_token}",
+                "Content-Type": m.content_type,
+            },
+            data=body,
+            verify=True,
+        )
+
+    handle_upload_response(response)
+
+
+def upload_agent_stream(
+    upload_endpoint: str,
+    upload_token: str,
+    pipe: ChunkPipe,
+    callback: typing.Callable[[int], None],
+) -> None:
+    # Passing a generator makes `requests` use chunked transfer encoding
+    content_type, body = multipart_stream(pipe.name, pipe.name, pipe, callback)
+
+    with span("transfer", streaming=True) as trace:
+        response = get_session().post(
+            upload_endpoint,
+            headers={
+                "Authorization": f"Bearer {upload_token}",
+                "Content-Type": content_type,
+            },
+            data=pacing.pace_chunks(body),
+            verify=True,
+        )
+        trace["bytes"] = pipe.bytes_written
+
+    handle_upload_response(response)
@@ -0,0 +1,134 @@
+"""Records how long each phase of a command takes as a Chrome trace, which can be
+loaded into chrome://tracing, Perfetto or speedscope. Tracing is enabled with
+`doxa --trace FILE ...` or the `DOXA_TRACE` environment variable, e.g.
+
+    DOXA_TRACE=upload.json doxa upload path/to/agent
+
+Phases are recorded with `span`, whose arguments (e.g. byte & file counts) are
+shown alongside the span, together with the peak memory usage of the process."""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import typing
+
+from doxa_cli.constants import __version__
+
+
+def get_peak_rss() -> int | None:
+    """Returns the peak resident set size of this process in bytes, if known."""
+
+    try:
+        import resource
+    except ImportError:
+        return None  # not available on Windows
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Tracer:
+    def __init__(self, path: str, name: str) -> None:
+        self.path = path
+        self.name = name
+        self.start = time.perf_counter_ns()
+        self.events: list[dict[str, typing.Any]] = []
+        self.threads: dict[int, str] = {}
+        self.lock = threading.Lock()
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        start: int,
+        end: int,
+        args: dict[str, typing.Any],
+    ) -> None:
+        peak_rss = get_peak_rss()
+        if peak_rss is not None:
+            args["peak_rss_mb"] = round(peak_rss / 1024**2, 1)
+
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self.start) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+
+        with self.lock:
+            self.events.append(event)
+            self.threads[thread.ident or 0] = thread.name
+
+    def save(self) -> None:
+        self.add(self.name, "command", self.start, time.perf_counter_ns(), {})
+
+        threads = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": ident,
+                "args": {"name": name},
+            }
+            for ident, name in self.threads.items()
+        ]
+
+        with open(self.path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": threads + self.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {"version": __version__},
+                },
+                f,
+                default=str,
+            )
+
+
+_tracer: Tracer | None = None
+
+
+def start_tracing(path: str, name: str) -> None:
+    """Records spans until the process exits, when they are written to `path`."""
+
+    global _tracer
+    if _tracer is not None:
+        return
+
+    _tracer = Tracer(os.path.abspath(path), name)
+    atexit.register(_tracer.save)
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+@contextlib.contextmanager
+def span(
+    name: str, category: str = "doxa", **args: typing.Any
+) -> typing.Iterator[dict[str, typing.Any]]:
+    """Records the duration of the `with` block, yielding a dictionary to which
+    details of the phase can be added."""
+
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        tracer.add(name, category, start, time.perf_counter_ns(), args)
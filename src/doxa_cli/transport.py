@@ -0,0 +1,177 @@
+import atexit
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from doxa_cli.constants import (
+    CONNECT_TIMEOUT,
+    IS_DEBUG,
+    READ_TIMEOUT,
+    REQUEST_RETRIES,
+    __version__,
+)
+from doxa_cli.pacing import get_send_buffer_size
+from doxa_cli.tracing import is_tracing, span
+from doxa_cli.zerocopy import FileRegion
+
+# The number of connections kept open to each host
+DEFAULT_POOL_SIZE = 10
+
+_adapters: list[HTTPAdapter] = []
+_adapter_lock = threading.Lock()
+
+
+class TransportSession(requests.Session):
+    """A session applying the configured connect & read timeouts to every request
+    that does not specify its own, so that no request can hang forever."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        if not is_tracing():
+            return super().request(method, url, **kwargs)
+
+        with span(f"{method} {urlsplit(url).path}", "http", url=url) as trace:
+            response = super().request(method, url, **kwargs)
+
+            body = response.request.body
+            if isinstance(body, (bytes, str)):
+                trace["bytes_sent"] = len(body)
+            elif hasattr(body, "len"):
+                trace["bytes_sent"] = body.len  # e.g. a `MultipartEncoder`
+
+            retries = getattr(response.raw, "retries", None)
+            trace["status"] = response.status_code
+            trace["retries"] = len(retries.history) if retries is not None else 0
+
+            return response
+
+    def close(self) -> None:
+        pass  # the connection pools are shared with other sessions
+
+
+class UploadConnectionMixin:
+    """Sends file-like request bodies in blocks of the configured send buffer size,
+    rather than the 8 KiB blocks used by `http.client`, which take many more system
+    calls to upload a large archive, and sends any `FileRegion` of a request body
+    straight from its file."""
+
+    def request(self, *args, **kwargs):
+        # Set on every request, as kept-alive connections outlive a configuration
+        self.blocksize = get_send_buffer_size()
+        return super().request(*args, **kwargs)
+
+    def send(self, data):
+        if isinstance(data, FileRegion):
+            data.send_to(self.sock)
+        else:
+            super().send(data)
+
+
+class BufferedHTTPConnection(UploadConnectionMixin, HTTPConnection):
+    pass
+
+
+class BufferedHTTPSConnection(UploadConnectionMixin, HTTPSConnection):
+    pass
+
+
+class BufferedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = BufferedHTTPConnection
+
+
+class BufferedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = BufferedHTTPSConnection
+
+
+class TransportAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": BufferedHTTPConnectionPool,
+            "https": BufferedHTTPSConnectionPool,
+        }
+
+
+def make_retry() -> Retry:
+    # Failed connections are always retried, as nothing was sent. Otherwise, only
+    # idempotent requests (e.g. GET & PUT, but not POST) are retried
+    return Retry(
+        total=REQUEST_RETRIES,
+        connect=REQUEST_RETRIES,
+        read=REQUEST_RETRIES,
+        status=REQUEST_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def get_adapter(pool_size: int = DEFAULT_POOL_SIZE) -> HTTPAdapter:
+    """Returns the adapter (and so the connection pools) shared by every session in
+    this process, growing its pools to at least `pool_size` connections per host."""
+
+    with _adapter_lock:
+        if not _adapters or pool_size > _adapters[-1]._pool_maxsize:
+            if not _adapters and IS_DEBUG:
+                atexit.register(print_transport_stats)
+
+            _adapters.append(
+                TransportAdapter(
+                    pool_connections=4,
+                    pool_maxsize=max(pool_size, DEFAULT_POOL_SIZE),
+                    max_retries=make_retry(),
+                )
+            )
+
+        return _adapters[-1]
+
+
+def get_session(pool_size: int = DEFAULT_POOL_SIZE) -> TransportSession:
+    """Returns a session for requests to the API or a storage node. Sessions share
+    one pool of kept-alive connections, so that a connection can be reused, e.g.
+    between requesting an upload slot and uploading to the storage node, while each
+    session has its own headers."""
+
+    adapter = get_adapter(pool_size)
+
+    session = TransportSession()
+    session.headers.update({"User-Agent": f"DOXA-CLI/{__version__}"})
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_transport_stats() -> dict[str, int]:
+    """Counts the requests made and connections opened by the shared pools."""
+
+    requests_made = connections = 0
+    for adapter in _adapters:
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_made += pool.num_requests
+                connections += pool.num_connections
+
+    return {
+        "requests": requests_made,
+        "connections": connections,
+        "reused": max(requests_made - connections, 0),
+    }
+
+
+def print_transport_stats() -> None:
+    from rich.console import Console
+
+    stats = get_transport_stats()
+    if stats["requests"]:
+        Console(stderr=True).print(
+            f"\n[dim]HTTP: {stats['requests']} requests over {stats['connections']} connections ({stats['reused']} reused)"
+        )
@@ -1,101 +1,223 @@
-import datetime
-import os
-
-import requests
-import typer
-import yaml
-
-from doxa_cli.config import CONFIG
-from doxa_cli.constants import DOXA_YAML, SCOPE, TOKEN_URL, __version__
-from doxa_cli.errors import SessionExpiredError, SignedOutError, show_error
-
-
-def _handle_outdated_cli(r, *args, **kwargs):
-    if r.status_code == requests.codes.bad_request:
-        body = r.json()
-        if (
-            "error" in body
-            and isinstance(body["error"], dict)
-            and body["error"].get("code") == "CLIENT_OUTDATED"
-        ):
-            show_error(
-                body["error"].get(
-                    "message",
-                    "The version of the DOXA CLI you have installed is outdated. Please install the latest version.",
-                )
-            )
-            raise typer.Exit(1)
-
-
-def get_request_client(require_auth: bool = False) -> requests.Session:
-    session = requests.Session()
-    session.headers.update({"User-Agent": f"DOXA-CLI/{__version__}"})
-    session.hooks["response"].append(_handle_outdated_cli)
-
-    if require_auth:
-        token = get_access_token()
-        if not token:
-            raise SignedOutError
-
-        session.headers.update({"Authorization": f"Bearer {token}"})
-
-    return session
-
-
-def refresh_oauth_token(refresh_token: str) -> str:
-    now = datetime.datetime.now()
-    data = (
-        get_request_client()
-        .post(
-            TOKEN_URL,
-            json={
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token,
-                "scope": SCOPE,
-            },
-            verify=True,
-        )
-        .json()
-    )
-
-    if "error" in data:
-        raise ValueError("Unable to get a refreshed access token")
-
-    CONFIG.update(
-        {
-            "access_token": data["access_token"],
-            "refresh_token": data.get("refresh_token") or refresh_token,
-            "expires_at": now + datetime.timedelta(seconds=data["expires_in"]),
-        }
-    )
-
-    return data["access_token"]
-
-
-def get_access_token() -> str:
-    access_token = CONFIG.get("access_token")
-    token_expiry = CONFIG.get("expires_at")
-
-    if not access_token or not token_expiry:
-        raise SignedOutError
-
-    if datetime.datetime.now() < datetime.datetime.strptime(
-        token_expiry, "%Y-%m-%d %H:%M:%S.%f"
-    ):
-        return access_token
-
-    refresh_token = CONFIG.get("refresh_token")
-    if refresh_token:
-        try:
-            return refresh_oauth_token(refresh_token)
-        except:
-            # The refresh token has expired, so clear the config
-            CONFIG.clear()
-
-    raise SessionExpiredError
-
-
-def read_doxa_yaml(directory: str) -> dict:
-    path = os.path.join(directory, DOXA_YAML)
-    with open(path, "r") as file:
-        return yaml.safe_load(file)
+import datetime
+import functools
+import os
+import threading
+
+import requests
+import typer
+import yaml
+
+from doxa_cli.config import CONFIG
+from doxa_cli.constants import (
+    CONFIG_DIRECTORY,
+    DOXA_YAML,
+    SCOPE,
+    TOKEN_REFRESH_WINDOW,
+    TOKEN_URL,
+)
+from doxa_cli.errors import (
+    ClientOutdatedError,
+    ConfigError,
+    SessionExpiredError,
+    SignedOutError,
+    UploadError,
+    show_error,
+)
+from doxa_cli.locking import FileLock
+from doxa_cli.tracing import span
+from doxa_cli.transport import get_session
+
+TOKEN_LOCK_PATH = os.path.join(CONFIG_DIRECTORY, "token.lock")
+
+# Serialises token refreshes between the threads of this process; `TOKEN_LOCK_PATH`
+# does the same between processes
+_refresh_lock = threading.Lock()
+
+
+def check_client_version(r, *args, **kwargs):
+    if r.status_code == requests.codes.bad_request:
+        body = r.json()
+        if (
+            "error" in body
+            and isinstance(body["error"], dict)
+            and body["error"].get("code") == "CLIENT_OUTDATED"
+        ):
+            raise ClientOutdatedError(
+                body["error"].get(
+                    "message",
+                    "The version of the DOXA CLI you have installed is outdated. Please install the latest version.",
+                )
+            )
+
+
+def _handle_outdated_cli(r, *args, **kwargs):
+    try:
+        check_client_version(r)
+    except ClientOutdatedError as e:
+        show_error(e.message)
+        raise typer.Exit(1)
+
+
+def get_request_client(require_auth: bool = False) -> requests.Session:
+    session = get_session()
+    session.hooks["response"].append(_handle_outdated_cli)
+
+    if require_auth:
+        try:
+            token = get_access_token()
+        except (ClientOutdatedError, ConfigError) as e:
+            show_error(e.message)
+            raise typer.Exit(1)
+
+        if not token:
+            raise SignedOutError
+
+        session.headers.update({"Authorization": f"Bearer {token}"})
+
+    return session
+
+
+def request_token_refresh(session: requests.Session, refresh_token: str) -> dict:
+    """Exchanges a refresh token for a new access token (and possibly a new refresh
+    token), returning the response of the token endpoint."""
+
+    data = session.post(
+        TOKEN_URL,
+        json={
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "scope": SCOPE,
+        },
+        verify=True,
+    ).json()
+
+    if "error" in data:
+        raise ValueError("Unable to get a refreshed access token")
+
+    return data
+
+
+def refresh_oauth_token(refresh_token: str) -> str:
+    now = datetime.datetime.now()
+    with span("refresh_token"):
+        session = get_session()
+        session.hooks["response"].append(check_client_version)
+        data = request_token_refresh(session, refresh_token)
+
+    # Only store the new tokens if no other process has refreshed them meanwhile
+    CONFIG.compare_and_swap(
+        {"refresh_token": refresh_token},
+        {
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token") or refresh_token,
+            "expires_at": now + datetime.timedelta(seconds=data["expires_in"]),
+        },
+    )
+
+    return data["access_token"]
+
+
+@functools.lru_cache(maxsize=8)
+def parse_token_expiry(expires_at: str) -> datetime.datetime | None:
+    try:
+        return datetime.datetime.fromisoformat(expires_at)
+    except ValueError:
+        return None
+
+
+def get_token_state() -> tuple[str | None, datetime.datetime | None]:
+    """Returns the stored access token and its (parsed) expiry time."""
+
+    access_token = CONFIG.get("access_token")
+    expires_at = CONFIG.get("expires_at")
+    if not access_token or not isinstance(expires_at, str):
+        return None, None
+
+    return access_token, parse_token_expiry(expires_at)
+
+
+def get_access_token(refresh_window: float = TOKEN_REFRESH_WINDOW) -> str:
+    """Returns a valid access token, refreshing it if it expires within the next
+    `refresh_window` seconds. When several processes notice this at once, only one
+    of them refreshes the token while the others wait to use its result."""
+
+    access_token, expires_at = get_token_state()
+    if access_token is None or expires_at is None:
+        raise SignedOutError
+
+    window = datetime.timedelta(seconds=refresh_window)
+    if datetime.datetime.now() < expires_at - window:
+        return access_token
+
+    with _refresh_lock, FileLock(TOKEN_LOCK_PATH):
+        # Another process may have refreshed the token while this one was waiting
+        CONFIG.reload()
+        access_token, expires_at = get_token_state()
+        if access_token is None or expires_at is None:
+            raise SignedOutError
+
+        now = datetime.datetime.now()
+        if now < expires_at - window:
+            return access_token
+
+        refresh_token = CONFIG.get("refresh_token")
+        if refresh_token:
+            try:
+                return refresh_oauth_token(refresh_token)
+            except (ClientOutdatedError, ConfigError):
+                raise
+            except:
+                # A proactive refresh may fail without the current token expiring
+                if now < expires_at:
+                    return access_token
+
+                # The refresh token has expired, so sign out, unless another process
+                # has since stored a new one
+                if CONFIG.compare_and_swap(
+                    {"refresh_token": refresh_token},
+                    {"access_token": None, "refresh_token": None, "expires_at": None},
+                ):
+                    raise SessionExpiredError
+
+                access_token, expires_at = get_token_state()
+                if access_token is not None and expires_at is not None:
+                    return access_token
+
+        if now < expires_at:
+            return access_token
+
+    raise SessionExpiredError
+
+
+def force_token_refresh() -> str:
+    """Refreshes the stored access token now, whatever its expiry time."""
+
+    with _refresh_lock, FileLock(TOKEN_LOCK_PATH):
+        CONFIG.reload()
+        refresh_token = CONFIG.get("refresh_token")
+        if not refresh_token:
+            raise SignedOutError
+
+        try:
+            return refresh_oauth_token(refresh_token)
+        except ValueError:
+            raise SessionExpiredError
+
+
+def read_doxa_yaml(directory: str) -> dict:
+    path = os.path.join(directory, DOXA_YAML)
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def handle_upload_response(response: requests.Response) -> dict:
+    body = response.json()
+    if response.ok and "error" not in body:
+        return body
+
+    # New response format: { "error": { "code": "ERROR_CODE", "message": "..." } }
+    if "error" in body:
+        raise UploadError(body["error"].get("code"), body["error"].get("message"))
+
+    # Other error
+    raise UploadError("UNKNOWN", body.get("message"))
@@ -0,0 +1,114 @@
+"""Uploads an archive without copying it through Python. The multipart preamble and
+trailer are written directly, and the file in between is sent with `sendfile`, so
+that the kernel copies it from the page cache straight to the socket. Over TLS,
+where `sendfile` cannot be used, the file is memory-mapped and sent from the
+mapping instead of being read into a new bytes object for every block."""
+
+import mmap
+import os
+import socket
+import ssl
+import stat
+import typing
+import uuid
+
+from doxa_cli.pacing import get_send_buffer_size, pace
+
+
+class FileRegion:
+    """Part of a request body to be sent straight from a file by the connection (see
+    `doxa_cli.transport`), reporting the number of bytes sent to `callback`."""
+
+    def __init__(
+        self,
+        f: typing.IO,
+        offset: int,
+        count: int,
+        callback: typing.Callable[[int], None],
+    ) -> None:
+        self.file = f
+        self.offset = offset
+        self.count = count
+        self.callback = callback
+
+    def __len__(self) -> int:
+        return self.count
+
+    def send_to(self, sock: typing.Any) -> None:
+        block_size = get_send_buffer_size()
+
+        # Any wrapped socket, e.g. for TLS, is sent from a memory mapping instead
+        if not isinstance(sock, socket.socket) or isinstance(sock, ssl.SSLSocket):
+            end = self.offset + self.count
+            with mmap.mmap(
+                self.file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped, memoryview(mapped) as view:
+                for start in range(self.offset, end, block_size):
+                    with view[start : min(start + block_size, end)] as block:
+                        pace(len(block))
+                        sock.sendall(block)
+                        self.callback(len(block))
+            return
+
+        # Sent in blocks so that progress is reported & the upload rate is paced
+        offset, remaining = self.offset, self.count
+        while remaining > 0:
+            count = min(block_size, remaining)
+            pace(count)
+            sent = sock.sendfile(self.file, offset, count)
+            if sent == 0:
+                raise EOFError("The file was truncated while it was being uploaded.")
+
+            offset += sent
+            remaining -= sent
+            self.callback(sent)
+
+
+class MultipartFileBody:
+    """A `multipart/form-data` request body holding a single file, laid out exactly
+    as by `MultipartEncoder`. Like a `MultipartEncoderMonitor`, it is passed to
+    `callback` as the upload progresses, with the bytes sent in `bytes_read`."""
+
+    def __init__(
+        self,
+        f: typing.IO,
+        callback: typing.Callable[["MultipartFileBody"], None],
+    ) -> None:
+        self.file = f
+        self.callback = callback
+        self.offset = f.tell()
+        self.size = os.fstat(f.fileno()).st_size - self.offset
+
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.preamble = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{f.name}"\r\n\r\n'
+        ).encode()
+        self.trailer = f"\r\n--{boundary}--\r\n".encode()
+
+        self.len = len(self.preamble) + self.size + len(self.trailer)
+        self.bytes_read = 0
+
+    def __len__(self) -> int:
+        return self.len
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        # A fresh iterator is made whenever the request is (re)sent
+        self.bytes_read = len(self.preamble)
+        yield self.preamble
+        yield FileRegion(self.file, self.offset, self.size, self.advance)
+        yield self.trailer
+
+    def advance(self, sent: int) -> None:
+        self.bytes_read += sent
+        self.callback(self)
+
+
+def can_send_file(f: typing.IO) -> bool:
+    """Whether `f` is a regular file, which can be sent without being read."""
+
+    try:
+        return stat.S_ISREG(os.fstat(f.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False  # e.g. an in-memory file
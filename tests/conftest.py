@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from doxa_cli.constants import __short_version__
+from doxa_cli.server import StandInServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A stand-in DOXA server on a free port, served from a background thread."""
+
+    server = StandInServer(port=0, directory=str(tmp_path / "server"))
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture
+def config_directory(tmp_path):
+    return tmp_path / "config"
+
+
+@pytest.fixture
+def cli_environment(server, config_directory):
+    """The environment of a CLI process using `server` and its own configuration."""
+
+    environment = os.environ.copy()
+    environment.pop("DOXA_ENV", None)
+    environment.pop("DOXA_STORAGE_URL", None)
+    environment.update(
+        {
+            "DOXA_BASE_URL": server.api_url,
+            "DOXA_CONFIG_DIRECTORY": str(config_directory),
+            "DOXA_OUTPUT": "json",
+        }
+    )
+
+    return environment
+
+
+@pytest.fixture
+def write_config(config_directory):
+    """Writes the given settings to the default profile of the configuration."""
+
+    def write_config(**settings) -> None:
+        os.makedirs(config_directory, exist_ok=True)
+        with open(config_directory / "config.json", "w") as f:
+            json.dump(
+                {"version": __short_version__, "profiles": {"default": settings}},
+                f,
+                default=str,
+            )
+
+    return write_config
+
+
+@pytest.fixture
+def run_python(cli_environment):
+    """Starts a Python process running `code` in the CLI's environment."""
+
+    def run_python(code: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-c", code],
+            env=cli_environment,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    return run_python
+
+
+@pytest.fixture
+def run_cli(cli_environment):
+    """Runs a `doxa` command, returning its JSON result object."""
+
+    def run_cli(*args: str) -> dict:
+        process = subprocess.run(
+            [sys.executable, "-m", "doxa_cli", *args],
+            env=cli_environment,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        events = [json.loads(line) for line in process.stdout.splitlines() if line]
+        result = events[-1]
+        assert result["event"] == "result", process.stderr
+        assert result["exit_code"] == process.returncode
+        return result
+
+    return run_cli
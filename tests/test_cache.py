@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import types
+
+import pytest
+
+from doxa_cli import cache
+from doxa_cli.cache import (
+    CACHE_LOCK_NAME,
+    DEFAULT_CACHE_SIZE,
+    MINIMUM_CACHE_SIZE,
+    ArchiveCache,
+    get_default_cache_size,
+    get_fingerprint,
+)
+from doxa_cli.compression import StorePolicy, parse_codec
+from doxa_cli.locking import FileLock
+from doxa_cli.scanner import scan_submission
+
+CODEC = parse_codec("gzip:1")
+
+
+@pytest.fixture
+def archive_cache(tmp_path):
+    return ArchiveCache(str(tmp_path / "cache"), max_size=1000)
+
+
+@pytest.fixture
+def make_archive(tmp_path):
+    def make_archive(name: str, size: int) -> str:
+        path = str(tmp_path / f"{name}.tar.gz")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        return path
+
+    return make_archive
+
+
+def put(archive_cache, make_archive, key: str, size: int, last_used: float) -> str:
+    path = archive_cache.put(key, make_archive(key, size), "/submission", CODEC)
+    os.utime(path, (last_used, last_used))
+    return path
+
+
+def test_put_and_get(archive_cache, make_archive):
+    source = make_archive("a", 100)
+    path = archive_cache.put("a", source, "/submission", CODEC, "digest")
+
+    # The archive is moved into the cache
+    assert not os.path.exists(source)
+
+    entry = archive_cache.get("a")
+    assert entry.path == path and entry.size == 100
+    assert entry.directory == "/submission" and entry.codec == "gzip:1"
+    assert entry.sha256 == "digest"
+    assert archive_cache.get("b") is None
+
+
+def test_put_keeping_the_source_links_it(archive_cache, make_archive):
+    source = make_archive("a", 100)
+    path = archive_cache.put("a", source, "/submission", CODEC, keep_source=True)
+
+    assert os.path.samefile(source, path)
+
+
+def test_archive_too_large_to_cache(archive_cache, make_archive):
+    source = make_archive("a", 1001)
+
+    assert archive_cache.put("a", source, "/submission", CODEC) is None
+    assert os.path.exists(source)
+    assert archive_cache.entries() == []
+
+
+def test_least_recently_used_archives_are_evicted(archive_cache, make_archive):
+    put(archive_cache, make_archive, "a", 400, 1000)
+    put(archive_cache, make_archive, "b", 400, 2000)
+
+    # Using an archive makes it the most recently used
+    assert archive_cache.get("a") is not None
+
+    put(archive_cache, make_archive, "c", 400, time.time())
+    assert [entry.key for entry in archive_cache.entries()] == ["c", "a"]
+    assert not os.path.exists(os.path.join(archive_cache.directory, "b.json"))
+
+
+def test_prune(archive_cache, make_archive):
+    for i, key in enumerate("abc"):
+        put(archive_cache, make_archive, key, 300, time.time() - 3600 * i)
+
+    removed = archive_cache.prune(1000, max_age=5400)
+    assert [entry.key for entry in removed] == ["c"]
+
+    removed = archive_cache.prune(300)
+    assert [entry.key for entry in removed] == ["b"]
+    assert [entry.key for entry in archive_cache.entries()] == ["a"]
+
+
+def test_prune_without_cache(archive_cache):
+    assert archive_cache.prune(0) == []
+    assert not os.path.exists(archive_cache.directory)
+
+
+def test_prune_takes_the_cache_lock(archive_cache, make_archive):
+    put(archive_cache, make_archive, "a", 100, time.time())
+
+    with FileLock(os.path.join(archive_cache.directory, CACHE_LOCK_NAME)):
+        thread = threading.Thread(target=archive_cache.prune, args=(0,))
+        thread.start()
+        thread.join(0.2)
+
+        assert thread.is_alive()
+        assert archive_cache.get("a") is not None
+
+    thread.join()
+    assert archive_cache.get("a") is None
+
+
+@pytest.mark.parametrize(
+    "free_space, size",
+    [
+        (0, MINIMUM_CACHE_SIZE),
+        (3 * MINIMUM_CACHE_SIZE, 3 * MINIMUM_CACHE_SIZE // 2),
+        (100 * DEFAULT_CACHE_SIZE, DEFAULT_CACHE_SIZE),
+    ],
+)
+def test_default_cache_size(tmp_path, monkeypatch, free_space, size):
+    checked = []
+
+    def disk_usage(path):
+        checked.append(path)
+        return types.SimpleNamespace(total=free_space, used=0, free=free_space)
+
+    monkeypatch.setattr(cache.shutil, "disk_usage", disk_usage)
+
+    # The free space is that of the nearest directory that exists
+    assert get_default_cache_size(str(tmp_path / "config" / "cache")) == size
+    assert checked == [str(tmp_path)]
+
+
+def test_fingerprint(tmp_path):
+    directory = tmp_path / "submission"
+    directory.mkdir()
+    (directory / "run.py").write_text("print('hello')\n")
+
+    def fingerprint(ignore_files=(), codec=CODEC, store_policy=None) -> str:
+        scan = scan_submission(str(directory), list(ignore_files))
+        return get_fingerprint(scan, codec, store_policy)
+
+    original = fingerprint()
+    assert fingerprint() == original
+
+    # Any setting that changes the archive changes the fingerprint
+    assert fingerprint(ignore_files=["*.txt"]) != original
+    assert fingerprint(codec=parse_codec("gzip:9")) != original
+    assert fingerprint(store_policy=StorePolicy(store=["*.py"])) != original
+    assert fingerprint(store_policy=StorePolicy()) == original
+
+    # As does any change to the files, other than those that are ignored
+    os.utime(directory / "run.py", (1, 1))
+    changed = fingerprint()
+    assert changed != original
+
+    ignored = fingerprint(ignore_files=["*.txt"])
+    (directory / "data.txt").write_text("")
+    assert fingerprint(ignore_files=["*.txt"]) == ignored
+    assert fingerprint() != changed
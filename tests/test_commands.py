@@ -0,0 +1,17 @@
+import importlib
+import inspect
+
+import pytest
+
+from doxa_cli import DoxaGroup
+
+
+@pytest.mark.parametrize("name", DoxaGroup.lazy_commands)
+def test_lazy_command_help_matches_docstring(name):
+    # `doxa --help` lists the summaries in `lazy_commands` without importing the
+    # commands, so they must be kept in step with the commands' own docstrings
+    lazy_command = DoxaGroup.lazy_commands[name]
+    module = importlib.import_module(lazy_command.module)
+    callback = getattr(module, lazy_command.attribute)
+
+    assert lazy_command.help == (inspect.getdoc(callback) or "")
@@ -0,0 +1,224 @@
+import gzip
+import io
+import os
+import tarfile
+
+import pytest
+
+from doxa_cli.compression import (
+    ZSTD_BLOCK_SIZE,
+    ZSTD_MAGIC,
+    ParallelGzipWriter,
+    SegmentedWriter,
+    StorePolicy,
+    ZstdStoreWriter,
+    is_zstd_available,
+    parse_codec,
+)
+from doxa_cli.scanner import scan_submission
+from doxa_cli.submission import compress_submission_directory
+
+BLOCK_SIZE = 64 * 1024
+
+
+def make_data(size: int) -> bytes:
+    # Half random and half repetitive, so that blocks compress by different amounts
+    return (os.urandom(size // 2) + b"doxa" * size)[:size]
+
+
+def write_in_chunks(writer, data: bytes, chunk_size: int) -> None:
+    for i in range(0, len(data), chunk_size):
+        writer.write(data[i : i + chunk_size])
+    writer.close()
+
+
+@pytest.mark.parametrize("size", [0, 1, BLOCK_SIZE, BLOCK_SIZE + 1, 5 * BLOCK_SIZE])
+@pytest.mark.parametrize("jobs", [1, 2, 4])
+def test_parallel_gzip_round_trip(size, jobs):
+    data = make_data(size)
+    output = io.BytesIO()
+    write_in_chunks(ParallelGzipWriter(output, jobs, 6, BLOCK_SIZE), data, 7777)
+
+    assert not output.closed
+    assert gzip.decompress(output.getvalue()) == data
+
+
+def test_parallel_gzip_output_is_independent_of_jobs_and_writes():
+    data = make_data(10 * BLOCK_SIZE + 123)
+
+    outputs = set()
+    for jobs, chunk_size in ((1, len(data)), (2, 1000), (8, BLOCK_SIZE)):
+        output = io.BytesIO()
+        write_in_chunks(
+            ParallelGzipWriter(output, jobs, 6, BLOCK_SIZE), data, chunk_size
+        )
+        outputs.add(output.getvalue())
+
+    assert len(outputs) == 1
+
+
+def test_parallel_gzip_rejects_writes_once_closed():
+    writer = ParallelGzipWriter(io.BytesIO(), 2)
+    writer.close()
+
+    with pytest.raises(ValueError):
+        writer.write(b"data")
+
+
+def make_submission(directory) -> None:
+    files = {
+        "run.py": b"print('hello')\n" * 100,
+        "agent/model.py": make_data(200 * 1024),
+        "agent/weights.bin": os.urandom(300 * 1024),
+        "empty.txt": b"",
+    }
+    for name, content in files.items():
+        path = os.path.join(directory, "submission", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+def build_archive(directory, spec: str, jobs: int = 1) -> tuple[bytes, str]:
+    scan = scan_submission(str(directory / "submission"), [])
+    path = directory / "submission.tar"
+    with open(path, "wb") as f:
+        digest = compress_submission_directory(
+            f, scan, show_progress=False, codec=parse_codec(spec), jobs=jobs
+        )
+
+    return path.read_bytes(), digest
+
+
+@pytest.mark.parametrize("spec", ["gzip:1", "gzip:9", "xz:1", "none"])
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_archive_is_reproducible(tmp_path, spec, jobs):
+    make_submission(tmp_path)
+    archive, digest = build_archive(tmp_path, spec, jobs)
+
+    # Neither the modification times of the files nor the time of the build matter
+    for name in ("run.py", "agent/model.py"):
+        os.utime(tmp_path / "submission" / name, (1, 1))
+
+    assert build_archive(tmp_path, spec, jobs) == (archive, digest)
+
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:*") as tar:
+        assert sorted(tar.getnames()) == [
+            "agent",
+            "agent/model.py",
+            "agent/weights.bin",
+            "empty.txt",
+            "run.py",
+        ]
+        assert (
+            tar.extractfile("run.py").read()
+            == (tmp_path / "submission/run.py").read_bytes()
+        )
+        assert (
+            tar.extractfile("agent/weights.bin").read()
+            == (tmp_path / "submission/agent/weights.bin").read_bytes()
+        )
+
+
+def test_archive_digest_is_independent_of_codec(tmp_path):
+    make_submission(tmp_path)
+    digests = {build_archive(tmp_path, spec)[1] for spec in ("gzip:1", "xz:1", "none")}
+
+    assert len(digests) == 1
+
+
+def write_segments(codec, segments: list[tuple[bool, bytes]], jobs: int = 1) -> bytes:
+    output = io.BytesIO()
+    writer = SegmentedWriter(output, codec, jobs)
+    for storing, data in segments:
+        writer.set_storing(storing)
+        writer.write(data)
+    writer.close()
+
+    assert not output.closed
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_segmented_gzip_round_trip(jobs):
+    compressible = b"doxa" * 50000
+    segments = [(False, compressible), (True, compressible), (False, b"end")]
+    archive = write_segments(parse_codec("gzip:6"), segments, jobs)
+
+    assert gzip.decompress(archive) == b"".join(data for _, data in segments)
+
+    # The stored segment is written as it is, so it is not shrunk at all
+    compressed = write_segments(parse_codec("gzip:6"), segments[:1], jobs)
+    assert len(archive) > len(compressed) + len(compressible)
+
+
+def test_segmented_gzip_empty_stream():
+    assert gzip.decompress(write_segments(parse_codec("gzip"), [])) == b""
+
+
+def read_zstd_raw_frames(data: bytes) -> bytes:
+    """Decodes zstd frames made only of raw blocks, as `ZstdStoreWriter` writes."""
+
+    content = bytearray()
+    i = 0
+    while i < len(data):
+        assert data[i : i + 4] == ZSTD_MAGIC
+        assert data[i + 4] == 0x00  # no content size, checksum or dictionary
+        window_size = 1 << (10 + (data[i + 5] >> 3))
+        i += 6
+
+        last = False
+        while not last:
+            header = int.from_bytes(data[i : i + 3], "little")
+            last, block_type, size = header & 1, header >> 1 & 3, header >> 3
+            assert block_type == 0 and size <= min(window_size, ZSTD_BLOCK_SIZE)
+            content += data[i + 3 : i + 3 + size]
+            i += 3 + size
+
+    return bytes(content)
+
+
+@pytest.mark.parametrize("size", [0, 1, ZSTD_BLOCK_SIZE, ZSTD_BLOCK_SIZE + 1, 10**6])
+def test_zstd_store_writer_frames(size):
+    data = os.urandom(size)
+    output = io.BytesIO()
+    write_in_chunks(ZstdStoreWriter(output), data, 10000)
+
+    assert read_zstd_raw_frames(output.getvalue()) == data
+
+    # A 6 byte frame header, then a 3 byte header for each block
+    blocks = max(-(-size // ZSTD_BLOCK_SIZE), 1)
+    assert len(output.getvalue()) == 6 + 3 * blocks + size
+
+
+@pytest.mark.skipif(not is_zstd_available(), reason="zstandard is not installed")
+def test_segmented_zstd_round_trip():
+    import zstandard
+
+    segments = [(False, b"doxa" * 50000), (True, os.urandom(300000)), (False, b"end")]
+    archive = write_segments(parse_codec("zstd:3"), segments)
+
+    reader = zstandard.ZstdDecompressor().stream_reader(
+        io.BytesIO(archive), read_across_frames=True
+    )
+    assert reader.read() == b"".join(data for _, data in segments)
+
+
+@pytest.mark.parametrize(
+    "arcname, size, content, stored",
+    [
+        ("empty.pt", 0, b"", False),
+        ("small.bin", 1024, os.urandom(1024), False),
+        ("model.safetensors", 10**6, b"\0" * 1024, True),
+        ("data.bin", 10**6, os.urandom(1024), True),
+        ("data.csv", 10**6, b"1,2,3\n" * 1000, False),
+        ("checkpoints/step.bin", 10**6, b"\0" * 1024, True),
+        ("weights.npz", 10**6, b"\0" * 1024, False),
+    ],
+)
+def test_store_policy(arcname, size, content, stored):
+    policy = StorePolicy(store=["checkpoints/"], compress=["*.npz"])
+
+    f = io.BytesIO(content)
+    assert policy.should_store(arcname, size, f) == stored
+    assert f.tell() == 0
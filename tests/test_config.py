@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from doxa_cli import config
+from doxa_cli.config import Config
+
+
+@pytest.fixture
+def config_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "config"
+    monkeypatch.setattr(config, "CONFIG_DIRECTORY", str(directory))
+    monkeypatch.setattr(config, "CONFIG_PATH", str(directory / "config.json"))
+    monkeypatch.setattr(config, "CONFIG_LOCK_PATH", str(directory / "config.json.lock"))
+    monkeypatch.setenv("DOXA_CONFIG_DIRECTORY", str(directory))
+    return directory
+
+
+def test_update_is_read_by_other_instances(config_directory):
+    Config().update({"access_token": "a", "cache_size": 10})
+
+    other = Config()
+    assert other.get("access_token") == "a"
+    assert other.get("cache_size") == 10
+    assert other.get("missing", "default") == "default"
+    assert not [path for path in config_directory.iterdir() if path.suffix == ".tmp"]
+
+
+def test_compare_and_swap_rejects_stale_values(config_directory):
+    first, second = Config(), Config()
+    first.update({"refresh_token": "r1"})
+    assert second.get("refresh_token") == "r1"
+
+    # Another process replaces the token, so a swap expecting the old one fails
+    assert first.compare_and_swap({"refresh_token": "r1"}, {"refresh_token": "r2"})
+    assert not second.compare_and_swap(
+        {"refresh_token": "r1"}, {"refresh_token": "stale"}
+    )
+
+    # The failed swap still brings the cached configuration up to date
+    assert second.get("refresh_token") == "r2"
+    assert Config().get("refresh_token") == "r2"
+
+
+def test_invalid_file_is_replaced(config_directory):
+    os.makedirs(config_directory)
+    (config_directory / "config.json").write_text("{not json")
+
+    instance = Config()
+    assert instance.get("access_token") is None
+
+    instance.update({"access_token": "a"})
+    assert json.loads((config_directory / "config.json").read_text())["profiles"][
+        "default"
+    ] == {"access_token": "a"}
+
+
+def test_concurrent_updates_are_not_lost(config_directory):
+    # Each process increments a counter, retrying whenever another process got there
+    # first, so every increment must be counted
+    script = """
+from doxa_cli.config import CONFIG
+
+for _ in range(25):
+    while True:
+        count = CONFIG.get("count")
+        if CONFIG.compare_and_swap({"count": count}, {"count": (count or 0) + 1}):
+            break
+"""
+
+    processes = [
+        subprocess.Popen([sys.executable, "-c", script], env=os.environ.copy())
+        for _ in range(4)
+    ]
+    assert [process.wait(timeout=60) for process in processes] == [0] * 4
+
+    assert Config().get("count") == 100
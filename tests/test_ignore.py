@@ -0,0 +1,140 @@
+import os
+
+import pytest
+
+from doxa_cli.ignore import IgnoreSpec, compile_ignore_spec, parse_ignore_lines
+from doxa_cli.scanner import scan_submission
+
+CASES = [
+    # Patterns without a slash match at any depth
+    (["*.log"], "debug.log", False, True),
+    (["*.log"], "logs/deep/debug.log", False, True),
+    (["*.log"], "debug.log.txt", False, False),
+    (["data"], "src/data", True, True),
+    # A leading or inner slash anchors a pattern to the submission directory
+    (["/build"], "build", True, True),
+    (["/build"], "src/build", True, False),
+    (["docs/*.md"], "docs/index.md", False, True),
+    (["docs/*.md"], "src/docs/index.md", False, False),
+    (["docs/*.md"], "docs/api/index.md", False, False),
+    # `**` matches any number of directories
+    (["**/cache"], "cache", True, True),
+    (["**/cache"], "a/b/cache", True, True),
+    (["logs/**"], "logs/a/b.txt", False, True),
+    (["logs/**"], "logs", True, False),
+    (["a/**/b"], "a/b", True, True),
+    (["a/**/b"], "a/x/y/b", True, True),
+    (["a/**/b"], "x/a/b", True, False),
+    # `*`, `?` and character classes never match a slash
+    (["src/*.py"], "src/x/y.py", False, False),
+    (["file?.txt"], "file1.txt", False, True),
+    (["file?.txt"], "file/.txt", False, False),
+    (["[ab].txt"], "b.txt", False, True),
+    (["[!ab].txt"], "b.txt", False, False),
+    (["[!ab].txt"], "c.txt", False, True),
+    # A trailing slash only matches directories
+    (["out/"], "out", True, True),
+    (["out/"], "out", False, False),
+    # The last matching rule wins, and `!` re-includes a path
+    (["*.bin", "!keep.bin"], "keep.bin", False, False),
+    (["*.bin", "!keep.bin"], "drop.bin", False, True),
+    (["!keep.bin", "*.bin"], "keep.bin", False, True),
+    # Comments, blank lines and escapes
+    (["# comment", "", "   "], "# comment", False, False),
+    (["\\#notes"], "#notes", False, True),
+    (["\\!important"], "!important", False, True),
+    (["trailing   "], "trailing", False, True),
+]
+
+
+@pytest.mark.parametrize("patterns, path, is_dir, ignored", CASES)
+def test_is_ignored(patterns, path, is_dir, ignored):
+    spec = IgnoreSpec(parse_ignore_lines(patterns))
+    assert spec.is_ignored(path, is_dir) == ignored
+
+
+@pytest.mark.parametrize(
+    "patterns, path, is_dir, ignored",
+    [case for case in CASES if not any(line.startswith("!") for line in case[0])],
+)
+def test_combined_spec_matches_rules(patterns, path, is_dir, ignored):
+    # Without negated rules, every pattern is tested by one combined expression,
+    # which must agree with testing the rules one at a time
+    rules = parse_ignore_lines(patterns)
+    combined = IgnoreSpec(rules)
+    assert combined._combined is not None
+    expected = any(rule.matches(path, is_dir) for rule in rules)
+    assert combined.is_ignored(path, is_dir) == expected == ignored
+
+
+def test_default_exclusions():
+    spec = compile_ignore_spec()
+    assert spec.is_ignored("doxa.yaml", False)
+    assert not spec.is_ignored("agent/doxa.yaml", False)
+    assert spec.is_ignored("agent/__pycache__", True)
+    assert spec.is_ignored(".DS_Store", False)
+
+
+def make_files(directory, files: dict[str, str]) -> None:
+    for name, content in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def test_scan_prunes_ignored_directories(tmp_path, monkeypatch):
+    make_files(
+        tmp_path,
+        {
+            "doxa.yaml": "competition: demo\n",
+            "run.py": "",
+            "venv/lib/site.py": "",
+            "venv/keep.txt": "",
+            "models/a.pt": "",
+        },
+    )
+
+    scanned = []
+    scandir = os.scandir
+
+    def record_scandir(path):
+        scanned.append(os.path.relpath(path, tmp_path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", record_scandir)
+    scan = scan_submission(str(tmp_path), ["venv/", "!venv/keep.txt"])
+
+    # As with git, a file cannot be re-included if its directory is excluded
+    assert [entry.arcname for entry in scan.entries] == [
+        "models",
+        "run.py",
+        "models/a.pt",
+    ]
+    assert sorted(scanned) == [".", "models"]
+
+
+def test_scan_applies_nested_ignore_files(tmp_path):
+    make_files(
+        tmp_path,
+        {
+            ".doxaignore": "*.tmp\n",
+            "a.tmp": "",
+            "agent/.doxaignore": "/local.txt\n!keep.tmp\n",
+            "agent/local.txt": "",
+            "agent/keep.tmp": "",
+            "agent/drop.tmp": "",
+            "agent/sub/local.txt": "",
+            "other/local.txt": "",
+        },
+    )
+
+    scan = scan_submission(str(tmp_path), [])
+
+    assert [entry.arcname for entry in scan.files] == [
+        ".doxaignore",
+        "agent/.doxaignore",
+        "agent/keep.tmp",
+        "agent/sub/local.txt",
+        "other/local.txt",
+    ]
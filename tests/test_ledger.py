@@ -0,0 +1,66 @@
+import pytest
+
+from doxa_cli import ledger
+from doxa_cli.ledger import UploadLedger, get_layout_digest
+from doxa_cli.scanner import scan_submission
+
+
+@pytest.fixture
+def upload_ledger(tmp_path):
+    return UploadLedger(str(tmp_path / "ledger.json"))
+
+
+def test_find_matches_competition_environment_and_metadata(upload_ledger):
+    upload_ledger.record("abc", "demo", "cpu", {"entrypoint": "run.py"}, "/a", 10)
+
+    assert upload_ledger.find("abc", "demo", "cpu", {"entrypoint": "run.py"})
+    assert not upload_ledger.find("abd", "demo", "cpu", {"entrypoint": "run.py"})
+    assert not upload_ledger.find("abc", "other", "cpu", {"entrypoint": "run.py"})
+    assert not upload_ledger.find("abc", "demo", "gpu", {"entrypoint": "run.py"})
+    assert not upload_ledger.find("abc", "demo", "cpu", {"entrypoint": "main.py"})
+
+
+def test_find_returns_the_latest_upload(upload_ledger):
+    upload_ledger.record("abc", "demo", None, {}, "/a", 10)
+    upload_ledger.record("abc", "demo", None, {}, "/b", 10)
+
+    assert upload_ledger.find("abc", "demo", None, {})["directory"] == "/b"
+
+
+def test_has_layout(tmp_path, upload_ledger):
+    (tmp_path / "submission").mkdir()
+    (tmp_path / "submission" / "run.py").write_text("print('hello')\n")
+    layout = get_layout_digest(scan_submission(str(tmp_path / "submission"), []))
+
+    assert not upload_ledger.has_layout(layout, "demo", None, {})
+
+    upload_ledger.record("abc", "demo", None, {}, "/a", 10, layout)
+    assert upload_ledger.has_layout(layout, "demo", None, {})
+    assert not upload_ledger.has_layout("other", "demo", None, {})
+    assert not upload_ledger.has_layout(layout, "other", None, {})
+
+    # Entries recorded without a layout may match any submission
+    upload_ledger.record("abd", "demo", None, {}, "/a", 10)
+    assert upload_ledger.has_layout("other", "demo", None, {})
+
+
+def test_only_recent_uploads_are_kept(upload_ledger, monkeypatch):
+    monkeypatch.setattr(ledger, "LEDGER_SIZE", 3)
+    for i in range(5):
+        upload_ledger.record(str(i), "demo", None, {}, "/a", 10)
+
+    assert [bool(upload_ledger.find(str(i), "demo", None, {})) for i in range(5)] == [
+        False,
+        False,
+        True,
+        True,
+        True,
+    ]
+
+
+def test_invalid_ledger_is_ignored(tmp_path, upload_ledger):
+    (tmp_path / "ledger.json").write_text("[1, 2")
+    assert upload_ledger.find("abc", "demo", None, {}) is None
+
+    upload_ledger.record("abc", "demo", None, {}, "/a", 10)
+    assert upload_ledger.find("abc", "demo", None, {})
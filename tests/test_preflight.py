@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from doxa_cli.compression import parse_codec
+from doxa_cli.preflight import estimate_archive_size, get_tar_size
+from doxa_cli.scanner import scan_submission
+from doxa_cli.submission import compress_submission_directory
+
+TREES = {
+    "short names": {"run.py": 100, "model/weights.bin": 5000, "empty.txt": 0},
+    "block sizes": {f"{size}.bin": size for size in (511, 512, 513, 10240, 10241)},
+    "long names": {
+        "a" * 99: 1,
+        "b" * 100: 2,
+        "c" * 101: 3,
+        f"{'d' * 120}/{'e' * 150}.py": 700,
+        "/".join(["nested"] * 40): 10,
+    },
+    "non-ascii names": {
+        "données.csv": 300,
+        "モデル/重み.bin": 2048,
+        f"{'é' * 60}.txt": 1,
+        f"{'ü' * 120}/x": 9,
+        **{f"résumé-{i}.txt": 10 for i in range(30)},
+    },
+}
+
+
+def make_tree(directory: str, files: dict[str, int]) -> None:
+    for name, size in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+
+
+@pytest.mark.parametrize("tree", TREES)
+def test_tar_size_matches_archive(tmp_path, tree):
+    directory = tmp_path / "submission"
+    make_tree(str(directory), TREES[tree])
+    scan = scan_submission(str(directory), [])
+
+    archive_path = tmp_path / "submission.tar"
+    with open(archive_path, "wb") as f:
+        compress_submission_directory(
+            f, scan, show_progress=False, codec=parse_codec("none")
+        )
+
+    size = os.path.getsize(archive_path)
+    estimate = estimate_archive_size(scan, parse_codec("none"))
+    assert get_tar_size(scan) == size
+    assert estimate.archive_size == estimate.minimum_size == size
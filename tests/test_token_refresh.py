@@ -0,0 +1,97 @@
+import datetime
+import json
+
+import pytest
+
+GET_ACCESS_TOKEN = """
+from doxa_cli.errors import DoxaError
+from doxa_cli.utils import get_access_token
+
+try:
+    print(get_access_token())
+except DoxaError as e:
+    print(type(e).__name__)
+"""
+
+GET_ACCESS_TOKEN_IN_THREADS = """
+import concurrent.futures
+from doxa_cli.utils import get_access_token
+
+with concurrent.futures.ThreadPoolExecutor(8) as executor:
+    tokens = [executor.submit(get_access_token) for _ in range(8)]
+    print("\\n".join(future.result() for future in tokens))
+"""
+
+
+def get_outputs(processes) -> set[str]:
+    outputs = set()
+    for process in processes:
+        stdout, _ = process.communicate(timeout=60)
+        assert process.returncode == 0
+        outputs.update(stdout.split())
+
+    return outputs
+
+
+def expiring_in(seconds: float) -> datetime.datetime:
+    return datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+
+
+@pytest.mark.parametrize("expires_in", [60, -60], ids=["expiring", "expired"])
+def test_only_one_process_refreshes_the_token(
+    server, write_config, run_python, expires_in
+):
+    server.refresh_tokens.add("r0")
+    write_config(
+        access_token="a0", refresh_token="r0", expires_at=expiring_in(expires_in)
+    )
+
+    tokens = get_outputs([run_python(GET_ACCESS_TOKEN) for _ in range(6)])
+
+    # Refresh tokens may only be used once, so a second refresh would have failed
+    assert server.responses[400] == 0
+    assert len(server.refresh_tokens) == 1 and "r0" not in server.refresh_tokens
+
+    # Every process uses the access token of the one refresh
+    assert len(tokens) == 1 and tokens <= set(server.access_tokens)
+
+
+def test_only_one_thread_refreshes_the_token(server, write_config, run_python):
+    server.refresh_tokens.add("r0")
+    write_config(access_token="a0", refresh_token="r0", expires_at=expiring_in(60))
+
+    tokens = get_outputs([run_python(GET_ACCESS_TOKEN_IN_THREADS)])
+
+    assert server.responses[400] == 0
+    assert len(tokens) == 1 and tokens <= set(server.access_tokens)
+
+
+def test_valid_token_is_not_refreshed(server, write_config, run_python):
+    server.refresh_tokens.add("r0")
+    write_config(access_token="a0", refresh_token="r0", expires_at=expiring_in(3600))
+
+    assert get_outputs([run_python(GET_ACCESS_TOKEN) for _ in range(2)]) == {"a0"}
+    assert server.refresh_tokens == {"r0"}
+
+
+def test_expired_session_signs_out(server, write_config, run_python, config_directory):
+    # The server does not know this refresh token, e.g. because it has expired
+    write_config(access_token="a0", refresh_token="r0", expires_at=expiring_in(-60))
+
+    outputs = get_outputs([run_python(GET_ACCESS_TOKEN) for _ in range(3)])
+
+    # The first process to fail signs out, and the others then find no credentials
+    assert outputs <= {"SessionExpiredError", "SignedOutError"}
+    assert "SessionExpiredError" in outputs
+
+    with open(config_directory / "config.json") as f:
+        profile = json.load(f)["profiles"]["default"]
+    assert profile["access_token"] is None and profile["refresh_token"] is None
+
+
+def test_token_about_to_expire_is_kept_when_refresh_fails(
+    server, write_config, run_python
+):
+    write_config(access_token="a0", refresh_token="r0", expires_at=expiring_in(60))
+
+    assert get_outputs([run_python(GET_ACCESS_TOKEN)]) == {"a0"}
@@ -0,0 +1,288 @@
+import datetime
+import glob
+import json
+import os
+import signal
+import subprocess
+import sys
+import tarfile
+import time
+
+import pytest
+
+from doxa_cli.resumable import CHUNK_SIZE
+
+
+@pytest.fixture(autouse=True)
+def logged_in(write_config):
+    write_config(
+        access_token="token",
+        refresh_token="refresh",
+        expires_at=datetime.datetime.now() + datetime.timedelta(days=1),
+    )
+
+
+def write_files(directory, files: dict[str, bytes]) -> None:
+    for name, content in files.items():
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def submission(tmp_path):
+    directory = tmp_path / "submission"
+    write_files(
+        directory,
+        {
+            "doxa.yaml": b"competition: demo\nenvironment: cpu\n",
+            "run.py": b"print('hello')\n" * 100,
+            "agent/weights.bin": os.urandom(2 * CHUNK_SIZE + 12345),
+        },
+    )
+    return directory
+
+
+def read_upload(upload: dict) -> dict[str, bytes]:
+    with tarfile.open(upload["path"], "r:*") as tar:
+        return {
+            member.name: tar.extractfile(member).read()
+            for member in tar
+            if member.isfile()
+        }
+
+
+def read_submission(directory) -> dict[str, bytes]:
+    files = {}
+    for path in glob.glob(f"{directory}/**", recursive=True):
+        name = os.path.relpath(path, directory).replace(os.sep, "/")
+        if os.path.isfile(path) and name != "doxa.yaml":
+            with open(path, "rb") as f:
+                files[name] = f.read()
+
+    return files
+
+
+def read_trace(path) -> dict[str, dict]:
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+
+    return {event["name"]: event.get("args", {}) for event in events}
+
+
+def get_acknowledged_chunks(environment: dict) -> list[int]:
+    uploads = os.path.join(environment["DOXA_CONFIG_DIRECTORY"], "uploads")
+    for path in glob.glob(os.path.join(uploads, "*.json")):
+        try:
+            with open(path) as f:
+                return json.load(f)["acknowledged"]
+        except (OSError, ValueError):
+            pass  # the checkpoint is being written
+
+    return []
+
+
+def test_upload(server, run_cli, submission):
+    result = run_cli("upload", str(submission), "-z", "gzip:1")
+
+    assert result["ok"] and result["uploaded"]
+    assert result["competition"] == "demo" and result["environment"] == "cpu"
+
+    (upload,) = server.uploads
+    assert upload["competition"] == "demo" and upload["compression"] == "gzip"
+    assert os.path.getsize(upload["path"]) == result["size"]
+    assert read_upload(upload) == read_submission(submission)
+
+
+@pytest.mark.parametrize("changed", [False, True])
+def test_resume_interrupted_upload(
+    server, cli_environment, run_cli, submission, tmp_path, changed
+):
+    # The upload is slowed down, so that it can be interrupted after its first chunk
+    server.stream_rate = CHUNK_SIZE
+    process = subprocess.Popen(
+        [sys.executable, "-m", "doxa_cli", "upload", str(submission)]
+        + ["--chunked", "-z", "none"],
+        env=cli_environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 60
+    while not get_acknowledged_chunks(cli_environment):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+
+    process.send_signal(signal.SIGINT)
+    assert process.wait(timeout=60) != 0
+    assert server.uploads == []
+
+    if changed:
+        write_files(submission, {"run.py": b"print('changed')\n"})
+
+    server.stream_rate = None
+    trace_path = tmp_path / "trace.json"
+    result = run_cli(
+        "--trace", str(trace_path), "upload", str(submission), "--resume", "-z", "none"
+    )
+
+    assert result["ok"] and result["uploaded"]
+    (upload,) = server.uploads
+    assert read_upload(upload) == read_submission(submission)
+
+    # Only the chunks that had not been received are sent again, unless the
+    # submission has changed, in which case a new upload is started
+    chunks = -(-result["size"] // CHUNK_SIZE)
+    transfer = read_trace(trace_path)["transfer"]
+    if changed:
+        assert transfer["chunks"] == chunks
+    else:
+        assert 0 < transfer["chunks"] < chunks
+
+    # Nothing is left behind once the upload has completed
+    uploads = os.path.join(cli_environment["DOXA_CONFIG_DIRECTORY"], "uploads")
+    assert os.listdir(uploads) == []
+
+
+def test_resume_without_interrupted_upload(server, run_cli, submission):
+    result = run_cli("upload", str(submission), "--resume", "-z", "none")
+
+    assert result["ok"] and result["uploaded"]
+    (upload,) = server.uploads
+    assert read_upload(upload) == read_submission(submission)
+
+
+@pytest.mark.parametrize("connections", [1, 3])
+def test_chunked_upload(server, run_cli, submission, tmp_path, connections):
+    trace_path = tmp_path / "trace.json"
+    result = run_cli(
+        "--trace",
+        str(trace_path),
+        "upload",
+        str(submission),
+        "--chunked",
+        "--connections",
+        str(connections),
+        "-z",
+        "gzip:1",
+    )
+
+    assert result["ok"] and result["uploaded"]
+    (upload,) = server.uploads
+    assert os.path.getsize(upload["path"]) == result["size"]
+    assert read_upload(upload) == read_submission(submission)
+
+    transfer = read_trace(trace_path)["transfer"]
+    assert transfer["connections"] == connections
+    assert transfer["chunks"] == -(-result["size"] // CHUNK_SIZE) == 3
+
+
+def test_delta_upload(server, run_cli, submission):
+    result = run_cli("upload", str(submission), "--delta", "-z", "gzip:1")
+    assert result["ok"] and result["uploaded"]
+    assert result["files"] == result["missing_files"] == 2
+
+    # Only the changed & new files are sent the second time
+    write_files(submission, {"run.py": b"print('changed')\n", "agent/new.txt": b"new"})
+    result = run_cli("upload", str(submission), "--delta", "-z", "gzip:1")
+    assert result["ok"] and result["uploaded"]
+    assert result["files"] == 3 and result["missing_files"] == 2
+    assert [upload["blobs"] for upload in server.uploads] == [2, 2]
+
+    # The platform can rebuild the whole submission from the files it holds
+    files = {}
+    for entry in server.uploads[-1]["manifest"]["files"]:
+        with open(os.path.join(server.blobs_directory, entry["sha256"]), "rb") as f:
+            files[entry["path"]] = f.read()
+
+    assert files == read_submission(submission)
+
+
+def test_identical_upload_is_skipped(server, run_cli, submission):
+    assert run_cli("upload", str(submission), "-z", "gzip:1")["uploaded"]
+
+    # Identical files are skipped whichever codec they are compressed with, as the
+    # ledger records the digest of the uncompressed archive
+    result = run_cli("upload", str(submission), "-z", "none")
+    assert result["ok"] and result["skipped"] and not result["uploaded"]
+    assert len(server.uploads) == 1
+
+    result = run_cli("upload", str(submission), "-z", "none", "--force")
+    assert result["ok"] and result["uploaded"]
+    assert len(server.uploads) == 2
+
+    # The same files are uploaded to another competition or environment
+    for args in (["-c", "other"], ["-e", "gpu"]):
+        assert run_cli("upload", str(submission), "-z", "gzip:1", *args)["uploaded"]
+    assert len(server.uploads) == 4
+
+    # A changed submission is uploaded again
+    write_files(submission, {"run.py": b"print('changed')\n"})
+    assert run_cli("upload", str(submission), "-z", "gzip:1")["uploaded"]
+    assert len(server.uploads) == 5
+
+
+def test_cached_archive_is_reused(server, run_cli, submission, tmp_path):
+    def upload(*args: str) -> tuple[dict, bool]:
+        trace_path = tmp_path / "trace.json"
+        result = run_cli("--trace", str(trace_path), "upload", str(submission), *args)
+        return result, read_trace(trace_path)["cache_lookup"]["hit"]
+
+    result, hit = upload("-z", "gzip:1")
+    assert result["uploaded"] and not hit
+
+    result, hit = upload("-z", "gzip:1", "--force")
+    assert result["uploaded"] and hit
+
+    result, hit = upload("-z", "gzip:1", "--force", "--no-cache")
+    assert result["uploaded"] and not hit
+
+    # The cached archive is the same as one compressed afresh
+    archives = set()
+    for upload in server.uploads:
+        with open(upload["path"], "rb") as f:
+            archives.add(f.read())
+    assert len(archives) == 1
+
+
+def test_batch_upload(server, run_cli, submission, tmp_path):
+    other = tmp_path / "other"
+    write_files(other, {"doxa.yaml": b"competition: other\n", "main.py": b"pass\n"})
+
+    result = run_cli("upload", str(submission), str(other), "-z", "gzip:1")
+    assert result["ok"]
+    assert [item["uploaded"] for item in result["submissions"]] == [True, True]
+    assert sorted(upload["competition"] for upload in server.uploads) == [
+        "demo",
+        "other",
+    ]
+
+    # Submissions already uploaded are skipped, as when uploaded one at a time
+    write_files(other, {"main.py": b"pass  # changed\n"})
+    result = run_cli("upload", str(submission), str(other), "-z", "gzip:1")
+    assert result["ok"]
+    assert [item["skipped"] for item in result["submissions"]] == [True, False]
+    assert [item["uploaded"] for item in result["submissions"]] == [False, True]
+    assert len(server.uploads) == 3
+
+    result = run_cli("upload", str(submission), str(other), "-z", "gzip:1", "-f")
+    assert [item["uploaded"] for item in result["submissions"]] == [True, True]
+    assert len(server.uploads) == 5
+    assert read_upload(server.uploads[-1]) == read_submission(
+        submission if server.uploads[-1]["competition"] == "demo" else other
+    )
+
+
+def test_batch_upload_checks_size_limits(server, run_cli, submission, tmp_path):
+    server.max_submission_size = 1000
+    other = tmp_path / "other"
+    write_files(other, {"doxa.yaml": b"competition: other\n", "main.py": b"pass\n"})
+
+    result = run_cli("upload", str(submission), str(other), "-z", "gzip:1")
+
+    assert not result["ok"]
+    first, second = result["submissions"]
+    assert not first["uploaded"] and "over the 1.0 kB limit" in first["error"]
+    assert second["uploaded"]
+    assert [upload["competition"] for upload in server.uploads] == ["other"]